@@ -0,0 +1,53 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.getcwd())
+
+from fake_surfline import FakeSurfline, write_fake_db
+from surfsup.dto.forecast_parser import ForecastFetcher
+from surfsup.utils import joinpath
+
+
+def bench(label: str, fetch, names: list[str]) -> None:
+    stime = time.time()
+    forecasts = fetch(names)
+    elapsed = time.time() - stime
+    print(
+        f"{label:<24} {len(forecasts):>5}/{len(names)} spots "
+        + f"in {elapsed:6.2f}s -- {len(forecasts) / elapsed:8.1f} spots/sec"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the threaded runner with the asyncio runner against a local fake Surfline."
+    )
+    parser.add_argument("--spots", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--connections", type=int, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir, FakeSurfline(args.latency) as fake:
+        db_path = joinpath(tmp_dir, "bench_spots.csv")
+        names = write_fake_db(db_path, fake.base_url, args.spots)
+        print(f"[ {args.spots} spots, {args.latency * 1000:.0f}ms upstream latency ]")
+
+        # fresh fetchers for every run so no run is served from the spot_check cache
+        threaded = ForecastFetcher(db_path, nthreads=args.threads)
+        bench(f"runner ({args.threads} threads)", threaded.runner, names)
+
+        asynchronous = ForecastFetcher(db_path, max_connections=args.connections)
+        bench(
+            f"arunner ({args.connections} conns)",
+            lambda n: asyncio.run(asynchronous.arunner(n)),
+            names,
+        )
+
+
+if __name__ == "__main__":
+    main()
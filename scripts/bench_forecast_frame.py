@@ -0,0 +1,106 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.getcwd())
+
+import numpy as np
+import pandas as pd
+
+from surfsup.dto.forecast_batch import ForecastBatch
+from surfsup.dto.forecast_dto import (
+    ConditionRecord,
+    ForecastRecord,
+    SwellRecord,
+    WaveHeightRecord,
+    WindRecord,
+)
+from surfsup.dto.forecast_frame import forecast_frame
+from surfsup.dto.scoring import CONDITIONS_ORDER
+
+
+def synthetic_records(nspots: int, rng) -> dict[str, ForecastRecord]:
+    out = {}
+    for i in range(nspots):
+        wave_min = int(rng.integers(0, 8))
+        out[f"spot-{i}"] = ForecastRecord(
+            "",
+            ConditionRecord(True, str(rng.choice(CONDITIONS_ORDER[1:])), False),
+            WindRecord(int(rng.integers(0, 40)), round(float(rng.uniform(0, 360)), 2)),
+            [SwellRecord(1.5, int(rng.integers(4, 20)), 260.0, 250.0)],
+            WaveHeightRecord(True, wave_min, wave_min + 1, None, "", False),
+            None,
+            None,
+        )
+    return out
+
+
+def list_of_lists(forecast_infos: dict[str, ForecastRecord]) -> pd.DataFrame:
+    """The previous to_df: a python list per row and inferred dtypes."""
+    data = []
+    for (spot_name, fcst) in forecast_infos.items():
+        data.append(
+            [
+                spot_name,
+                fcst.conditions.value,
+                fcst.wind.speed,
+                fcst.wind.direction,
+                fcst.wave_height.min,
+                fcst.wave_height.max,
+                fcst.wave_height.occasional,
+                fcst.swells[0].direction,
+                fcst.swells[0].height,
+                fcst.swells[0].period,
+            ]
+        )
+    return pd.DataFrame(
+        data,
+        columns=[
+            "name",
+            "conditions",
+            "wind_speed",
+            "wind_dir",
+            "wave_min",
+            "wave_max",
+            "wave_occ",
+            "swell_dir",
+            "swell_ht",
+            "swell_pd",
+        ],
+    )
+
+
+def timed(fn, repeat: int = 5) -> tuple[float, pd.DataFrame]:
+    best = float("inf")
+    for _ in range(repeat):
+        stime = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - stime)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time building the to_df frame from records and from a ForecastBatch."
+    )
+    parser.add_argument("--sizes", type=int, nargs="*", default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(13)
+    for nspots in args.sizes:
+        records = synthetic_records(nspots, rng)
+        batch = ForecastBatch.from_records(records)
+        slow, old = timed(lambda: list_of_lists(records))
+        fast, new = timed(lambda: forecast_frame(records))
+        columnar, _ = timed(batch.to_frame)
+        print(
+            f"{nspots:>6} spots -- list of lists {slow * 1e3:7.2f}ms "
+            + f"({old.memory_usage(deep=True).sum() / 1024:.0f}KiB) -- "
+            + f"typed {fast * 1e3:6.2f}ms ({new.memory_usage(deep=True).sum() / 1024:.0f}KiB) -- "
+            + f"from batch {columnar * 1e3:5.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
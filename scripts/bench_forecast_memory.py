@@ -0,0 +1,107 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.getcwd())
+
+import numpy as np
+
+from surfsup.dto.forecast_batch import ForecastBatch
+from surfsup.dto.forecast_parser import parse_forecast_info
+from surfsup.dto.scoring import CONDITIONS_ORDER
+
+
+def synthetic_forecast_json(rng) -> dict:
+    wave_min = float(rng.integers(0, 8))
+
+    def tide(kind: str) -> dict:
+        return {
+            "type": kind,
+            "height": round(float(rng.uniform(-1, 6)), 2),
+            "timestamp": int(rng.integers(1.6e9, 1.7e9)),
+            "utcOffset": -7,
+        }
+
+    return {
+        "note": "",
+        "conditions": {
+            "human": True,
+            "value": str(rng.choice(CONDITIONS_ORDER)),
+            "expired": False,
+        },
+        "wind": {
+            "speed": int(rng.integers(0, 40)),
+            "direction": round(float(rng.uniform(0, 360)), 2),
+        },
+        "swells": [
+            {
+                "index": i,
+                "height": round(float(rng.uniform(0, 6)), 2),
+                "period": int(rng.integers(4, 20)),
+                "direction": round(float(rng.uniform(0, 360)), 2),
+                "directionMin": round(float(rng.uniform(0, 360)), 2),
+            }
+            for i in range(6)
+        ],
+        "waveHeight": {
+            "human": True,
+            "min": wave_min,
+            "max": wave_min + 1,
+            "occasional": None,
+            "humanRelation": "Waist to chest",
+            "plus": False,
+        },
+        "tide": {
+            "previous": tide("LOW"),
+            "current": tide("NORMAL"),
+            "next": tide("HIGH"),
+        },
+        "waterTemp": {"min": 60, "max": 62},
+        "weather": {"temperature": 70, "condition": "CLEAR"},
+    }
+
+
+def measured(fn):
+    """Result of fn, the bytes it left allocated and the seconds it took."""
+    tracemalloc.start()
+    stime = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - stime
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Memory held by a fetch run as ForecastRecords against a ForecastBatch."
+    )
+    parser.add_argument("--spots", type=int, default=10000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(5)
+    payloads = [synthetic_forecast_json(rng) for _ in range(args.spots)]
+
+    records, records_size, _ = measured(
+        lambda: {f"spot-{i}": parse_forecast_info(p) for (i, p) in enumerate(payloads)}
+    )
+    batch, batch_size, to_batch = measured(lambda: ForecastBatch.from_records(records))
+    stime = time.perf_counter()
+    assert batch.to_records() == records
+    to_records = time.perf_counter() - stime
+
+    print(f"{args.spots} spots, 6 swells each")
+    print(f"  records {records_size / 2**20:7.2f}MiB")
+    print(
+        f"  batch   {batch_size / 2**20:7.2f}MiB ({batch.nbytes / 2**20:.2f}MiB of arrays) "
+        + f"-- {records_size / batch_size:.1f}x smaller"
+    )
+    print(
+        f"  from_records {to_batch * 1e3:.1f}ms -- to_records {to_records * 1e3:.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
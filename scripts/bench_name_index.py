@@ -0,0 +1,109 @@
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.append(os.getcwd())
+
+from surfsup.surfline.name_index import NameIndex
+
+SYLLABLES = ["la", "jol", "sho", "res", "bla", "ck", "pi", "pe", "li", "ne", "san"]
+SYLLABLES += ["ta", "cruz", "ma", "ri", "bu", "oce", "an", "be", "ach", "po", "int"]
+
+
+def synthetic_names(nnames: int, rng: random.Random) -> list[str]:
+    """Unique spot names of one to three words, like "La Jolla Shores"."""
+
+    def word() -> str:
+        return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+    names: set[str] = set()
+    while len(names) < nnames:
+        names.add(" ".join(word().title() for _ in range(rng.randint(1, 3))))
+    return sorted(names)
+
+
+def with_typo(name: str, rng: random.Random) -> str:
+    """name with one random substitution, insertion or deletion."""
+    i = rng.randrange(len(name))
+    edit = rng.choice(["sub", "ins", "del"])
+    if edit == "sub":
+        return name[:i] + rng.choice(string.ascii_lowercase) + name[i + 1 :]
+    if edit == "ins":
+        return name[:i] + rng.choice(string.ascii_lowercase) + name[i:]
+    return name[:i] + name[i + 1 :]
+
+
+def legacy_suggester(names: list[str]):
+    """The previous partial_name: pyspellchecker candidates mapped back to names."""
+    try:
+        from spellchecker import SpellChecker
+    except ImportError:
+        return None
+
+    speller = SpellChecker(case_sensitive=True)
+    speller.word_frequency.dictionary.clear()
+    speller.word_frequency.load_words(names)
+
+    def partial_name(spot_name: str, num_back: int = 5) -> list[str]:
+        options = list(speller.candidates(spot_name) or [])[:num_back]
+        out: list[str] = []
+        for op in options:
+            nms = list(map(lambda x: x.lower(), names))
+            if op in nms:
+                out.append(names[nms.index(op)])
+        return out
+
+    return partial_name
+
+
+def run(label: str, suggest, queries: list[tuple[str, str]]) -> None:
+    found = 0
+    stime = time.perf_counter()
+    for (query, name) in queries:
+        found += name in suggest(query)
+    elapsed = time.perf_counter() - stime
+    print(
+        f"{label:<16} {elapsed / len(queries) * 1e6:9.1f}us/query -- "
+        + f"suggested the name {found}/{len(queries)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time spot name suggestions against the previous spellchecker path."
+    )
+    parser.add_argument("--names", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    names = synthetic_names(args.names, rng)
+    queries = [(with_typo(name, rng), name) for name in rng.sample(names, args.queries)]
+    prefixes = [name[: rng.randint(2, 5)] for (_, name) in queries]
+
+    stime = time.perf_counter()
+    index = NameIndex(names)
+    print(
+        f"NameIndex over {len(names)} names built in {time.perf_counter() - stime:.2f}s"
+    )
+    run("name index", index.suggest, queries)
+
+    stime = time.perf_counter()
+    for prefix in prefixes:
+        index.complete(prefix)
+    elapsed = time.perf_counter() - stime
+    print(f"{'completion':<16} {elapsed / len(prefixes) * 1e6:9.1f}us/query")
+
+    legacy = legacy_suggester(names)
+    if legacy is None:
+        print("pyspellchecker is not installed, skipping the previous path")
+    else:
+        run("spellchecker", legacy, queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.append(os.getcwd())
+
+from requests_html import HTML
+from fake_surfline import build_report_page
+from surfsup.surfline.api import SurflineAPI
+from surfsup.surfline.report_extract import extract_report_data
+from surfsup.utils import joinpath
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time the DOM report parser against the targeted extractor on report pages."
+    )
+    parser.add_argument(
+        "pages",
+        nargs="*",
+        default=[joinpath("test", "testfiles", "report_page.html")],
+        help="report pages (html), e.g. saved from surfline.com; the default is "
+        + "a synthetic page from fake_surfline.build_report_page",
+    )
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    surfline = SurflineAPI(joinpath("test", "testfiles", "init_fake_db.csv"))
+    pages = []
+    for fname in args.pages:
+        with open(fname, "rb") as f:
+            pages.append((os.path.basename(fname), f.read()))
+    # real report pages carry a few hundred KB of markup around the page state
+    pages.append(
+        ("synthetic-256kb", build_report_page("Blacks", filler_kb=256).encode("utf-8"))
+    )
+
+    for (label, content) in pages:
+        assert extract_report_data(content) == surfline.format_report_html(
+            HTML(session=surfline.dom_session, html=content)
+        )
+        dom = timeit.timeit(
+            lambda: surfline.format_report_html(
+                HTML(session=surfline.dom_session, html=content)
+            ),
+            number=args.number,
+        )
+        fast = timeit.timeit(lambda: extract_report_data(content), number=args.number)
+        print(
+            f"{label:<24} {len(content) / 1024:7.1f}KB -- "
+            + f"dom {dom / args.number * 1e6:9.1f}us -- "
+            + f"extractor {fast / args.number * 1e6:8.1f}us -- {dom / fast:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
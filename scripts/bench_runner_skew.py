@@ -0,0 +1,95 @@
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+sys.path.append(os.getcwd())
+
+from fake_surfline import fake_report_data, write_fake_db
+from surfsup.dto.fetch_report import FetchReport
+from surfsup.dto.forecast_parser import ForecastFetcher
+from surfsup.utils import joinpath
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    rank = max(1, int(math.ceil(pct / 100.0 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def static_runner(fetcher: ForecastFetcher, names: list[str]) -> dict:
+    """The previous runner: one fixed contiguous slice of names per thread."""
+    n = int(math.ceil(len(names) / fetcher.nthreads))
+    chunks = [names[i : i + n] for i in range(0, len(names), n)]
+    spot_forecast: dict = dict()
+    report = FetchReport(len(names))
+    with ThreadPoolExecutor(max_workers=fetcher.nthreads) as pool:
+        for chunk in chunks:
+            pool.submit(fetcher.retrieve_forecast, chunk, spot_forecast, report)
+    return spot_forecast
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run time percentiles of static slices vs the shared work queue on a skewed workload."
+    )
+    parser.add_argument("--spots", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--fast", type=float, default=0.005)
+    parser.add_argument("--slow", type=float, default=0.25)
+    parser.add_argument("--slow-ratio", type=float, default=0.05)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    delays: dict[str, float] = {}
+
+    def fake_spot_check(name: str) -> dict:
+        time.sleep(delays[name])
+        return fake_report_data(name)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = joinpath(tmp_dir, "bench_spots.csv")
+        names = write_fake_db(db_path, "http://127.0.0.1", args.spots)
+        fetcher = ForecastFetcher(db_path, nthreads=args.threads)
+
+        timings: dict[str, list[float]] = {"static slices": [], "work queue": []}
+        spot_p99: list[float] = []
+        with patch("surfsup.surfline.api.SurflineAPI.spot_check") as mock_obj:
+            mock_obj.side_effect = fake_spot_check
+            for _ in range(args.runs):
+                # the slow spots (e.g. ones stuck in retries) move around every run
+                delays.clear()
+                for name in names:
+                    slow = rng.random() < args.slow_ratio
+                    delays[name] = args.slow if slow else args.fast
+
+                for (label, run) in [
+                    ("static slices", lambda: static_runner(fetcher, names)),
+                    ("work queue", lambda: fetcher.runner(names)),
+                ]:
+                    stime = time.perf_counter()
+                    forecasts = run()
+                    timings[label].append(time.perf_counter() - stime)
+                    assert len(forecasts) == len(names)
+                spot_p99.append(fetcher.last_report.percentile(99))
+
+    print(
+        f"[ {args.spots} spots, {args.threads} threads, {args.runs} runs, "
+        + f"{args.slow_ratio:.0%} of spots take {args.slow}s instead of {args.fast}s ]"
+    )
+    for (label, values) in timings.items():
+        print(
+            f"{label:<14} run time p50 {percentile(values, 50):.3f}s "
+            + f"p99 {percentile(values, 99):.3f}s max {max(values):.3f}s"
+        )
+    print(f"work queue per-spot p99 {percentile(spot_p99, 50):.3f}s (median over runs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.getcwd())
+
+import numpy as np
+import pandas as pd
+
+from surfsup.dto.scoring import CONDITIONS_ORDER, score_forecasts, score_row, top_k
+
+
+def synthetic_forecasts(nspots: int, rng) -> pd.DataFrame:
+    wave_min = rng.integers(0, 8, nspots).astype(float)
+    return pd.DataFrame(
+        {
+            "name": [f"spot-{i}" for i in range(nspots)],
+            "conditions": rng.choice(CONDITIONS_ORDER, nspots),
+            "wind_speed": rng.integers(0, 40, nspots),
+            "wind_dir": rng.uniform(0, 360, nspots),
+            "wave_min": wave_min,
+            "wave_max": wave_min + rng.integers(0, 5, nspots),
+            "wave_occ": np.where(
+                rng.random(nspots) < 0.7, np.nan, rng.integers(0, 14, nspots)
+            ),
+            "swell_dir": rng.uniform(0, 360, nspots),
+            "swell_ht": rng.uniform(0, 6, nspots),
+            "swell_pd": rng.integers(4, 20, nspots),
+        }
+    )
+
+
+def row_wise(df: pd.DataFrame, max_height: int, n: int) -> pd.DataFrame:
+    """The previous top_sorted: df.apply per row and a full sort."""
+    df = df.copy()
+    df["sortable"] = df.apply(lambda row: score_row(row, max_height), axis=1)
+    df.sort_values(by="sortable", ascending=False, inplace=True, kind="stable")
+    return df.head(n)
+
+
+def vectorized(df: pd.DataFrame, max_height: int, n: int) -> pd.DataFrame:
+    df = df.copy()
+    df["sortable"] = score_forecasts(df, max_height)
+    return df.iloc[top_k(df["sortable"].to_numpy(), n)]
+
+
+def timed(fn) -> tuple[float, pd.DataFrame]:
+    stime = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - stime, result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time top_sorted scoring row-wise against the vectorized engine."
+    )
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10000, 100000])
+    parser.add_argument("--max-height", type=int, default=6)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(11)
+    for nspots in args.sizes:
+        df = synthetic_forecasts(nspots, rng)
+        slow, expected = timed(lambda: row_wise(df, args.max_height, args.top))
+        fast, actual = timed(lambda: vectorized(df, args.max_height, args.top))
+        assert list(expected["name"]) == list(actual["name"])
+        print(
+            f"{nspots:>7} spots -- row-wise {slow * 1e3:8.1f}ms -- "
+            + f"vectorized {fast * 1e3:6.2f}ms -- {slow / fast:6.1f}x -- same top {args.top}"
+        )
+
+
+if __name__ == "__main__":
+    main()
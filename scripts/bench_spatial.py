@@ -0,0 +1,83 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.getcwd())
+
+import numpy as np
+import pandas as pd
+
+from surfsup.maps import Location, distance_miles
+from surfsup.surfline.spatial import SpatialIndex
+
+
+def full_scan(table: pd.DataFrame, loc: Location, max_radius: float) -> pd.DataFrame:
+    """The previous by_loc lookup: row-wise haversine, full sort, row-wise filter."""
+    df = table.copy()
+    df["distance"] = df.apply(
+        lambda row: distance_miles(loc, Location(row["latitude"], row["longitude"])),
+        axis=1,
+    )
+    df.sort_values(by="distance", inplace=True)
+    in_range = df.apply(lambda row: row["distance"] <= max_radius, axis=1)
+    return df[in_range]
+
+
+def synthetic_catalogue(nspots: int, rng) -> pd.DataFrame:
+    """Spots clustered along a few hundred stretches of 'coastline'."""
+    centers = rng.uniform([-60, -180], [70, 180], size=(300, 2))
+    picks = centers[rng.integers(0, len(centers), nspots)]
+    coords = picks + rng.normal(0, 1.5, size=(nspots, 2))
+    return pd.DataFrame(
+        {
+            "name": [f"spot-{i}" for i in range(nspots)],
+            "latitude": np.clip(coords[:, 0], -89.9, 89.9),
+            "longitude": (coords[:, 1] + 180) % 360 - 180,
+        }
+    )
+
+
+def timed(fn, number: int) -> float:
+    stime = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return (time.perf_counter() - stime) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time radius lookups with the spatial index against the previous full scan."
+    )
+    parser.add_argument("--sizes", type=int, nargs="*", default=[1000, 10000, 100000])
+    parser.add_argument("--radius", type=float, default=50)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    for nspots in args.sizes:
+        table = synthetic_catalogue(nspots, rng)
+        stime = time.perf_counter()
+        index = SpatialIndex(table["latitude"], table["longitude"])
+        build = time.perf_counter() - stime
+
+        # query from real spots so most lookups find something in range
+        queries = [
+            Location(table["latitude"].iloc[i], table["longitude"].iloc[i])
+            for i in rng.integers(0, nspots, args.queries)
+        ]
+        it = iter(queries)
+        radius = timed(lambda: index.within_radius(next(it), args.radius), len(queries))
+        it = iter(queries)
+        nearest = timed(lambda: index.k_nearest(next(it), 5), len(queries))
+        scan = timed(lambda: full_scan(table, queries[0], args.radius), 1)
+
+        print(
+            f"{nspots:>7} spots -- build {build * 1e3:7.1f}ms -- "
+            + f"within_radius {radius * 1e6:7.1f}us -- k_nearest {nearest * 1e6:7.1f}us -- "
+            + f"full scan {scan * 1e3:8.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.getcwd())
+
+from surfsup.maps import Location
+from surfsup.surfline.database import SurflineSpotDB
+from surfsup.surfline.spot_catalogue import SpotCatalogue, write_catalogue
+from surfsup.utils import joinpath
+
+from scripts.bench_spot_db_ingest import synthetic_records
+
+
+def timed(fn, number: int = 1) -> float:
+    stime = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return (time.perf_counter() - stime) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time opening and querying the CSV catalogue against the compiled one."
+    )
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10000, 100000])
+    parser.add_argument("--lookups", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for nspots in args.sizes:
+            records = synthetic_records(nspots)
+            csv_name = joinpath(tmp_dir, f"spots-{nspots}.csv")
+            catalogue_name = joinpath(tmp_dir, f"spots-{nspots}.spotcat")
+            database = SurflineSpotDB(csv_name)
+            database.bulk_add(records)
+            database.flush()
+            write_catalogue(catalogue_name, records)
+
+            names = [records[i].name for i in range(0, nspots, nspots // args.lookups)]
+            loc = Location(records[0].latitude, records[0].longitude)
+            for (label, backend, path) in [
+                ("csv", SurflineSpotDB, csv_name),
+                ("spotcat", SpotCatalogue, catalogue_name),
+            ]:
+                opened = timed(lambda: backend(path), 5)
+                database = backend(path)
+                database.spatial_index()
+                database.select(names[0])
+                select = timed(lambda: database.select_many(names)) / len(names)
+                radius = timed(lambda: database.within_radius(loc, 50), 20)
+                print(
+                    f"{nspots:>7} spots {label:>8} -- open {opened * 1e3:8.2f}ms -- "
+                    + f"select {select * 1e6:6.1f}us -- within_radius {radius * 1e3:6.2f}ms"
+                )
+            print(
+                f"{'':>7} file sizes -- csv {os.path.getsize(csv_name) / 1e6:.1f}MB -- "
+                + f"spotcat {os.path.getsize(catalogue_name) / 1e6:.1f}MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
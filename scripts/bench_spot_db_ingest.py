@@ -0,0 +1,87 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.getcwd())
+
+import pandas as pd
+
+from surfsup.surfline.database import SpotRecord, SurflineSpotDB
+from surfsup.utils import joinpath
+
+
+def synthetic_records(nspots: int) -> list[SpotRecord]:
+    return [
+        SpotRecord(
+            f"spot-{i}",
+            f"{i:024x}",
+            30.0 + (i % 900) / 100,
+            -120.0 + (i % 700) / 100,
+            f"Spot {i}",
+            f"https://www.surfline.com/surf-report/spot-{i}/{i:024x}",
+        )
+        for i in range(nspots)
+    ]
+
+
+def legacy_ingest(db_name: str, records: list[SpotRecord]) -> None:
+    """The previous add_record: DataFrame.append and a full CSV rewrite per record."""
+    table = pd.DataFrame(columns=SpotRecord.preferred_order())
+    for record in records:
+        table = pd.concat([table, pd.DataFrame([record.__dict__])], ignore_index=True)
+        table.to_csv(db_name, index=False)
+
+
+def journaled_ingest(db_name: str, records: list[SpotRecord]) -> None:
+    database = SurflineSpotDB(db_name)
+    for record in records:
+        database.add_record(record)
+    database.flush()
+
+
+def bulk_ingest(db_name: str, records: list[SpotRecord]) -> None:
+    database = SurflineSpotDB(db_name)
+    database.bulk_add(records)
+    database.flush()
+
+
+def timed(fn, db_name: str, records: list[SpotRecord]) -> float:
+    stime = time.perf_counter()
+    fn(db_name, records)
+    return time.perf_counter() - stime
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time spot ingestion per-record rewrites against the journal."
+    )
+    parser.add_argument("--sizes", type=int, nargs="*", default=[1000, 5000, 50000])
+    parser.add_argument(
+        "--legacy-max",
+        type=int,
+        default=5000,
+        help="skip the quadratic legacy ingest above this size",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for nspots in args.sizes:
+            records = synthetic_records(nspots)
+            timings = []
+            for (label, fn) in [
+                ("legacy", legacy_ingest),
+                ("journaled", journaled_ingest),
+                ("bulk", bulk_ingest),
+            ]:
+                if fn is legacy_ingest and nspots > args.legacy_max:
+                    continue
+                db_name = joinpath(tmp_dir, f"{label}-{nspots}.csv")
+                elapsed = timed(fn, db_name, records)
+                timings.append(f"{label} {elapsed:7.2f}s")
+            print(f"{nspots:>7} spots -- " + " -- ".join(timings))
+
+
+if __name__ == "__main__":
+    main()
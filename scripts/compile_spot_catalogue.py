@@ -0,0 +1,33 @@
+import argparse
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from surfsup.surfline.backends import compile_catalogue
+from surfsup.utils import joinpath
+
+
+def main():
+    cwd = os.getcwd()
+    parser = argparse.ArgumentParser(
+        description="Compile the spot catalogue into a memory-mapped .spotcat file."
+    )
+    parser.add_argument(
+        "--source",
+        default=joinpath(cwd, "data", "spot_lookups.csv"),
+        help="CSV or SQLite spot catalogue",
+    )
+    parser.add_argument(
+        "--output",
+        default=joinpath(cwd, "data", "spot_lookups.spotcat"),
+        help="compiled catalogue, replaced atomically when it exists",
+    )
+    args = parser.parse_args()
+
+    compiled = compile_catalogue(args.source, args.output)
+    print(f"compiled {compiled} spots from {args.source} into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+import pandas as pd
+
+from surfsup.surfline.database import SurflineSpotDB
+
+
+def fake_report_data(name: str) -> dict:
+    """Build a report payload shaped like the one Surfline embeds in a report page."""
+    return {
+        "spot": {
+            "name": name,
+            "lat": 32.877231,
+            "lon": -117.25303,
+            "subregion": {"_id": "58581a836630e24c44878fd6"},
+        },
+        "report": {"timestamp": 1633892448, "body": "<p>Clean and fun.</p>"},
+        "forecast": {
+            "note": None,
+            "conditions": {"human": True, "value": "FAIR", "expired": False},
+            "wind": {"speed": 6, "direction": 252.95666},
+            "waveHeight": {
+                "human": True,
+                "min": 2,
+                "max": 3,
+                "occasional": None,
+                "humanRelation": "Thigh to waist high",
+                "plus": False,
+            },
+            "tide": {
+                "previous": {
+                    "type": "HIGH",
+                    "height": 5.8,
+                    "timestamp": 1633892412,
+                    "utcOffset": -7,
+                },
+                "current": {
+                    "type": "NORMAL",
+                    "height": 4.9,
+                    "timestamp": 1633899348,
+                    "utcOffset": -7,
+                },
+                "next": {
+                    "type": "LOW",
+                    "height": 0,
+                    "timestamp": 1633920095,
+                    "utcOffset": -7,
+                },
+            },
+            "waterTemp": {"min": 62, "max": 63},
+            "weather": {"temperature": 70, "condition": "CLEAR"},
+            "swells": [
+                {
+                    "height": 1.3,
+                    "period": 13,
+                    "direction": 273.5434,
+                    "directionMin": 266.80191,
+                    "index": 0,
+                },
+                {
+                    "height": 1.1,
+                    "period": 20,
+                    "direction": 198.76959,
+                    "directionMin": 195.717255,
+                    "index": 1,
+                },
+            ],
+        },
+    }
+
+
+def build_report_page(name: str, filler_kb: int = 64) -> str:
+    """Render a page laid out like a Surfline report.
+
+    The page state lives in the 14th script and, like on surfline.com, is
+    serialized with '<' escaped so it can not close the script tag early.
+    """
+    page_state = {"spot": {"report": {"data": fake_report_data(name)}}}
+    filler = "<div>" + "x" * 1024 + "</div>"
+    scripts = [f"<script>var s{i} = {i};</script>" for i in range(13)]
+    return (
+        "<!DOCTYPE html><html><head><title>"
+        + name
+        + "</title>"
+        + "".join(scripts)
+        + "</head><body>"
+        + filler * filler_kb
+        + "<script>window.__DATA__ = "
+        + json.dumps(page_state).replace("<", "\\u003c")
+        + "</script></body></html>"
+    )
+
+
+class _FakeServer(ThreadingHTTPServer):
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class FakeSurfline:
+    """Local HTTP server answering every report url with a canned report page.
+
+    latency -- seconds to wait before answering, or a function of the request path
+    """
+
+    def __init__(self, latency=0.0, filler_kb: int = 64):
+        self.latency: Callable[[str], float] = (
+            latency if callable(latency) else (lambda path: latency)
+        )
+        self.filler_kb = filler_kb
+        self.server: Optional[ThreadingHTTPServer] = None
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]  # type: ignore
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                time.sleep(fake.latency(self.path))
+                name = self.path.rstrip("/").split("/")[-2]
+                body = build_report_page(name, fake.filler_kb).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = _FakeServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()  # type: ignore
+        self.server.server_close()  # type: ignore
+        return False
+
+
+def write_fake_db(db_name: str, base_url: str, nspots: int) -> list[str]:
+    """Write a spot database whose report urls all point at a FakeSurfline."""
+    names = [f"spot-{i}" for i in range(nspots)]
+    database = SurflineSpotDB(db_name)
+    database.table = pd.DataFrame(
+        {
+            "name": names,
+            "spot_id": [f"id{i}" for i in range(nspots)],
+            "latitude": [32.0 + i * 0.001 for i in range(nspots)],
+            "longitude": [-117.0 - i * 0.001 for i in range(nspots)],
+            "formal_name": names,
+            "url": [f"{base_url}/surf-report/{n}/id{i}" for (i, n) in enumerate(names)],
+        }
+    )
+    database.flush()
+    return names
@@ -1,20 +1,119 @@
+import argparse
 import os
+import sys
 from pprint import PrettyPrinter
+
+sys.path.append(os.getcwd())
+
+from surfsup.surfline.collector import Collector
+from surfsup.dto.forecast_history import ForecastHistory
 from surfsup.dto.forecast_parser import ForecastFetcher
+from surfsup.surfline.api import SurflineAPI
+from surfsup.surfline.rate_limit import SHARED_REQUESTS_PER_MINUTE, use_shared_budget
 from surfsup.utils import joinpath
 
 
-def main():
+def collect_once(db_path: str, history: ForecastHistory, args) -> None:
     pp = PrettyPrinter(indent=2)
-    # set up surfline api
+    spots = args.spots
+    fcst_fetcher = ForecastFetcher(db_path, hedge_ratio=args.hedge)
+    forecast_results = fcst_fetcher.runner(spots)
+
+    pp.pprint(forecast_results.get(spots[0])) if len(spots) > 0 else None
+    history.append(forecast_results)
+
+
+def collect_forever(db_path: str, history: ForecastHistory, args) -> None:
+    surfline = SurflineAPI(db_path, cache_path=args.cache)
+    collector = Collector(
+        surfline.refresh_spot,
+        surfline.get_spot_names,
+        history,
+        cache=surfline.cache,
+        interval=args.interval * 60,
+        max_age=args.max_age * 60 if args.max_age is not None else None,
+        # the collector paces itself on the budget its requests draw from
+        budget=surfline.limiter.bucket,
+        jitter=args.jitter,
+        verbose=1,
+    )
+    try:
+        collector.run(args.cycles)
+    except KeyboardInterrupt:
+        print("Stopping collector")
+    finally:
+        surfline.checkpoint()
+
+
+def main():
     cwd = os.getcwd()
-    print(cwd)
-    db_path = joinpath(cwd, "data", "spot_lookups.csv")
-    fcst_fetcher = ForecastFetcher(db_path, 16)
-    forecast_results = fcst_fetcher.runner(["Blacks", "Blackies", "La Jolla Shores"])
+    parser = argparse.ArgumentParser(
+        description="Collect spot forecasts into the forecast history."
+    )
+    parser.add_argument(
+        "spots",
+        nargs="*",
+        default=[],
+        help="spots to collect once, every spot when none are given; "
+        + "ignored with --daemon",
+    )
+    parser.add_argument("--db", default=joinpath(cwd, "data", "spot_lookups.csv"))
+    parser.add_argument("--history", default=joinpath(cwd, "data", "forecast_history"))
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="keep collecting every spot in the database",
+    )
+    parser.add_argument(
+        "--interval", type=float, default=30, help="minutes between cycles"
+    )
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=None,
+        help="minutes a collected spot stays fresh (default half the interval)",
+    )
+    parser.add_argument(
+        "--budget",
+        default=joinpath(cwd, "data", "upstream_budget.sqlite3"),
+        help="requests budget shared with the bot and the crawler",
+    )
+    parser.add_argument(
+        "--rpm",
+        type=float,
+        default=SHARED_REQUESTS_PER_MINUTE,
+        help="requests per minute of the shared budget",
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.5, help="fraction of a slot to jitter by"
+    )
+    parser.add_argument("--cycles", type=int, default=None, help="stop after N cycles")
+    parser.add_argument("--cache", default=None, help="forecast cache file")
+    parser.add_argument(
+        "--csv",
+        default=None,
+        help="append the forecasts to this csv (gzipped if it ends in .gz) instead",
+    )
+    parser.add_argument(
+        "--hedge",
+        type=float,
+        default=None,
+        help="fraction of slow spot requests to hedge with a second request",
+    )
+    args = parser.parse_args()
+
+    use_shared_budget(args.budget, args.rpm)
+    if args.csv is not None:
+        fcst_fetcher = ForecastFetcher(args.db, hedge_ratio=args.hedge)
+        rows = fcst_fetcher.export(args.csv, args.spots)
+        print(f"Exported {rows} forecasts to {args.csv}")
+        return None
 
-    pp.pprint(forecast_results["Blacks"])
-    fcst_fetcher.to_csv(forecast_results)
+    history = ForecastHistory(args.history)
+    if args.daemon:
+        collect_forever(args.db, history, args)
+    else:
+        collect_once(args.db, history, args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,31 @@
+import argparse
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from surfsup.surfline.backends import migrate_to_sqlite
+from surfsup.utils import joinpath
+
+
+def main():
+    cwd = os.getcwd()
+    parser = argparse.ArgumentParser(
+        description="One-shot copy of the CSV spot catalogue into SQLite."
+    )
+    parser.add_argument(
+        "--csv", default=joinpath(cwd, "data", "spot_lookups.csv"), help="source CSV"
+    )
+    parser.add_argument(
+        "--sqlite",
+        default=joinpath(cwd, "data", "spot_lookups.sqlite3"),
+        help="target SQLite file, created when missing",
+    )
+    args = parser.parse_args()
+
+    copied = migrate_to_sqlite(args.csv, args.sqlite)
+    print(f"copied {copied} spots from {args.csv} to {args.sqlite}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,14 @@
+import argparse
 import os
+import sys
 
-import requests
-from bs4 import BeautifulSoup
+sys.path.append(os.getcwd())
 
 from surfsup.surfline.api import SurflineAPI
+from surfsup.surfline.crawler import Crawler, CrawlState, Page, canonicalize_url
 from surfsup.surfline.database import SpotRecord
+from surfsup.surfline.page_store import PageStore
+from surfsup.surfline.rate_limit import use_shared_budget
 from surfsup.utils import joinpath
 
 
@@ -16,27 +20,8 @@ def is_valid_region_url(link: str) -> bool:
     return "/surf-reports-forecasts-cams/" in link
 
 
-def gather_spot_urls(resp: requests.Response) -> list[str]:
-    soup = BeautifulSoup(resp.text, "html.parser")
-    all_a = soup.find_all("a")
-
-    hrefs = []
-    for link in all_a:
-        tag_str = str(link)
-        if "href" in tag_str and (
-            is_valid_report_url(tag_str) or is_valid_region_url(tag_str)
-        ):
-            href = link["href"]  # type: ignore
-            hrefs.append(href)
-
-    return hrefs
-
-
-def generate_link_from_href(possible_href: str) -> str:
-    if possible_href.startswith("/"):
-        return "https://www.surfline.com" + possible_href
-
-    return possible_href
+def is_surfline_url(link: str) -> bool:
+    return link.startswith("https://www.surfline.com/")
 
 
 def report_data_to_record(link: str, data: dict):
@@ -52,58 +37,130 @@ def report_data_to_record(link: str, data: dict):
 
 
 def populate_spot_database(
-    db_name: str, starting_link: str = "https://www.surfline.com"
+    db_name: str,
+    starting_link: str = "https://www.surfline.com",
+    checkpoint_path: str = "crawl_checkpoint.json",
+    page_store_path: str = "crawl_pages.sqlite3",
+    incremental: bool = False,
+    **crawler_kwargs,
 ) -> list[str]:
-    """BFS for new surf report urls.
+    """Concurrent BFS for new surf report urls.
 
     Search for new surf report urls and add them to the supplied database.
+    The crawl is checkpointed to checkpoint_path and resumed from it when
+    it exists. Every visited page is recorded in page_store_path; an
+    incremental crawl revisits known report pages with conditional requests
+    and only re-parses the pages which changed, updating their records.
+    A full crawl skips the report pages already in the database, except
+    the ones missing from the page store: those are fetched once to record
+    their validators for the next incremental crawl.
     Returns a list of urls which could not be processed.
 
     Keyword arguments:
     starting_link -- the url link to the starting page (default https://www.surfline.com)
+    checkpoint_path -- crawl state file, removed once the crawl completes
+    incremental -- refresh the known pages instead of only looking for new ones (default False)
     """
     surfline = SurflineAPI(db_name)
-    queue = [starting_link]
-
-    seen = dict.fromkeys([str(u) for u in surfline.database.table["url"]], True)
-    errors = []
-    count = 0
-    while len(queue) > 0:
-        print(
-            "queue at: {}; seen: {}; report-hits: {}".format(
-                len(queue), len(seen), count
-            )
+    database = surfline.database
+    page_store = PageStore(page_store_path)
+
+    def follow(link: str) -> bool:
+        return is_surfline_url(link) and (
+            is_valid_report_url(link) or is_valid_region_url(link)
+        )
+
+    def on_report(page: Page) -> None:
+        # the page was fetched once, parse the report from the same content
+        record = report_data_to_record(
+            page.url, surfline.format_report_content(page.content)
         )
-        curr_href = queue.pop(0)
-        link = generate_link_from_href(curr_href)
-
-        try:
-            if link in seen:
-                continue
-
-            if is_valid_report_url(link):
-                surfline.database.add_record(
-                    report_data_to_record(link, surfline.spot_check(link))
-                )
-                count += 1
-
-            resp = requests.get(link)
-            sub_hrefs = gather_spot_urls(resp)
-            queue.extend(sub_hrefs)
-            seen[link] = True
-        except Exception:
-            print("Exception caught: {}".format(link))
-            errors.append(link)
-
-    return errors
-
-
-"""Main"""
-cwd = os.getcwd()
-database_name = joinpath(cwd, "data", "spot_lookups.csv")
-errors = populate_spot_database(database_name, "https://www.surfline.com/surf-report/")
-
-# print errors to a file
-with open("error_urls.txt", "a+") as fname:
-    for err_url in errors:
-        fname.write(err_url + "\n")
+        if not database.contains(page.url, by_att="url"):
+            database.add_record(record)
+            return None
+
+        existing = database.select(page.url, by_att="url")
+        if existing != record:
+            with database.transaction():
+                # names are not unique, the url is
+                database.del_record(existing, by_att="url")
+                database.add_record(record)
+
+    crawler = Crawler.resume(
+        checkpoint_path,
+        is_report=is_valid_report_url,
+        follow=follow,
+        on_report=on_report,
+        page_store=page_store,
+        incremental=incremental,
+        limiter=surfline.limiter,
+        sessions=surfline.sessions,
+        verbose=1,
+        **crawler_kwargs,
+    )
+    if len(crawler.state.seen) == 0:
+        if not incremental:
+            stored = page_store.urls()
+            for url in map(canonicalize_url, database.table["url"]):
+                if url is None:
+                    continue
+                if url in stored:
+                    crawler.state.seen.add(url)
+                else:
+                    crawler.state.enqueue(url)
+        crawler.state.enqueue(canonicalize_url(starting_link))
+
+    state = crawler.run()
+    database.flush()
+    os.remove(checkpoint_path)
+    return state.errors
+
+
+def main():
+    cwd = os.getcwd()
+    parser = argparse.ArgumentParser(
+        description="Crawl surfline.com for surf report pages and add them to the spot database."
+    )
+    parser.add_argument("--db", default=joinpath(cwd, "data", "spot_lookups.csv"))
+    parser.add_argument("--start", default="https://www.surfline.com/surf-report/")
+    parser.add_argument(
+        "--checkpoint", default=joinpath(cwd, "data", "crawl_checkpoint.json")
+    )
+    parser.add_argument("--pages", default=joinpath(cwd, "data", "crawl_pages.sqlite3"))
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="revisit known pages with conditional requests and update changed spots",
+    )
+    parser.add_argument(
+        "--budget",
+        default=joinpath(cwd, "data", "upstream_budget.sqlite3"),
+        help="requests budget shared with the bot and the collector",
+    )
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--per-host", type=int, default=4)
+    parser.add_argument(
+        "--delay", type=float, default=0.25, help="seconds between requests to a host"
+    )
+    args = parser.parse_args()
+
+    use_shared_budget(args.budget)
+    errors = populate_spot_database(
+        args.db,
+        args.start,
+        args.checkpoint,
+        args.pages,
+        args.incremental,
+        max_workers=args.workers,
+        max_per_host=args.per_host,
+        delay=args.delay,
+    )
+
+    # print errors to a file
+    with open("error_urls.txt", "a+") as fname:
+        for err_url in errors:
+            fname.write(err_url + "\n")
+
+
+if __name__ == "__main__":
+    main()
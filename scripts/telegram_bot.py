@@ -1,4 +1,7 @@
+import atexit
 import os
+import signal
+import threading
 import time
 import traceback
 import telebot
@@ -9,6 +12,7 @@ sys.path.append(os.getcwd())
 
 from surfsup.comm.message_builder import MessageBuilder
 from surfsup.maps import Location
+from surfsup.surfline.rate_limit import use_shared_budget
 from surfsup.user import ShortboardPreferences, User, Activity, export_users, read_users
 from surfsup.comm.str_constants import (
     SURFSUP_WELCOME_MSG,
@@ -31,6 +35,28 @@ def give_tmp_storage(uid):
 my_secret = os.environ["TELEGRAM_KEY"]
 bot = telebot.TeleBot(my_secret, threaded=True, num_threads=4)
 messenger = MessageBuilder()
+use_shared_budget("data/upstream_budget.sqlite3")
+messenger.forecast_fetcher.surfline.start_prefetcher()
+
+# checkpoint the forecast cache on exit; docker stop sends SIGTERM, which
+# skips atexit unless it is turned into SystemExit
+atexit.register(messenger.forecast_fetcher.surfline.checkpoint)
+signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+CHECKPOINT_EVERY = 60 * 5
+
+
+def checkpoint_periodically():
+    # a kill -9 or a crash loses at most CHECKPOINT_EVERY seconds of cache
+    while True:
+        time.sleep(CHECKPOINT_EVERY)
+        try:
+            messenger.forecast_fetcher.surfline.checkpoint()
+        except Exception:
+            print(traceback.format_exc(limit=1))
+
+
+threading.Thread(target=checkpoint_periodically, name="Checkpoint", daemon=True).start()
 
 
 @bot.message_handler(commands=["start"])
@@ -274,6 +300,7 @@ while 1:
     print("Exception occured, exporting users to json file...")
     export_users("data/user_information.json", user_information)
     export_users("data/user_information_backup.json", user_information)
+    messenger.forecast_fetcher.surfline.checkpoint()
 
     print("You have 5 seconds to quit with ^C...")
     time.sleep(5)
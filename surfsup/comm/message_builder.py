@@ -3,15 +3,29 @@ from surfsup.comm.str_constants import SURFSUP_USAGE_MSG
 from surfsup.utils import joinpath
 from surfsup.maps import Location
 import math
+from typing import Optional
 from surfsup.comm.markdown import gen_link, fmt_text
 
 
+def fmt_number(val) -> str:
+    """val as the bot shows it: to_df measurements are floats, so integral
+    ones drop the trailing .0 (2.0 reads 2, 2.5 stays 2.5).
+    """
+    return f"{val:g}" if isinstance(val, float) else str(val)
+
+
 class MessageBuilder:
     forecast_fetcher: ForecastFetcher
 
-    def __init__(self):
+    def __init__(self, hedge_ratio: Optional[float] = 0.05):
+        """Up to hedge_ratio of the slow spot requests are hedged, None turns
+        hedging off.
+        """
         db_path = joinpath("data", "spot_lookups.csv")
-        self.forecast_fetcher = ForecastFetcher(db_path)
+        cache_path = joinpath("data", "forecast_cache.sqlite3")
+        self.forecast_fetcher = ForecastFetcher(
+            db_path, cache_path=cache_path, hedge_ratio=hedge_ratio
+        )
 
     def is_spot(self, spot_name: str) -> bool:
         """Return if message text indicates a spot name."""
@@ -33,7 +47,7 @@ class MessageBuilder:
         if not self.is_spot(spot_name):
             if spot_name.lower() == "help":
                 return SURFSUP_USAGE_MSG
-            possible_corrections = self.forecast_fetcher.partial_name(spot_name)
+            possible_corrections = self.possible_corrections(spot_name)
             return (
                 f"ERROR: {spot_name} was invalid. Possible corrections:\n"
                 + "\n".join(possible_corrections)
@@ -45,6 +59,12 @@ class MessageBuilder:
         new_message = self.clean(report_data["forecast"])
         return new_message
 
+    def possible_corrections(self, spot_name: str, n: int = 5) -> list[str]:
+        """Spot names spot_name is the start of, then the ones it misspells."""
+        completions = self.forecast_fetcher.complete_name(spot_name, n)
+        suggestions = self.forecast_fetcher.partial_name(spot_name, n)
+        return list(dict.fromkeys(completions + suggestions))[:n]
+
     def spot_message_fmt(self, obj):
         return (
             self.__format_nameline(obj)
@@ -143,8 +163,10 @@ class MessageBuilder:
         return fmt_text(f"ScoreValue: {val}\n")
 
     def __format_conditionsline(self, obj):
-        emoji = self.get_emoji(obj["conditions"])
-        conds = obj["conditions"].lower() if obj["conditions"] else "None"
+        # missing conditions are a missing category, NaN once out of the frame
+        condition = obj["conditions"] if isinstance(obj["conditions"], str) else None
+        emoji = self.get_emoji(condition)
+        conds = condition.lower() if condition else "None"
         return fmt_text(f"Cond: {emoji} {conds}\n")
 
     def __format_wavesizeline(self, obj):
@@ -153,20 +175,20 @@ class MessageBuilder:
 
         occ = "\n"
         if obj["wave_occ"] and not math.isnan(obj["wave_occ"]):
-            occ = f" (occ. {obj['wave_occ']})\n"
+            occ = f" (occ. {fmt_number(obj['wave_occ'])})\n"
 
-        wave_range = f"{obj['wave_min']}-{obj['wave_max']}"
+        wave_range = f"{fmt_number(obj['wave_min'])}-{fmt_number(obj['wave_max'])}"
         return fmt_text(f"Wave size: {emoji} {wave_range}{occ}")
 
     def __format_windline(self, obj):
-        speed = obj["wind_speed"]
+        speed = fmt_number(obj["wind_speed"])
         emoji = self.get_approx_direction(obj["wind_dir"])
-        direction = round(obj["wind_dir"], 2)
+        direction = fmt_number(round(obj["wind_dir"], 2))
         return fmt_text(f"Wind: {speed}mph {emoji} {direction}\n")
 
     def __format_swellline(self, obj):
-        height = round(obj["swell_ht"], 2)
-        period = obj["swell_pd"]
+        height = fmt_number(round(obj["swell_ht"], 2))
+        period = fmt_number(obj["swell_pd"])
         emoji = self.get_approx_direction(obj["wind_dir"])
-        direction = round(obj["swell_dir"], 2)
+        direction = fmt_number(round(obj["swell_dir"], 2))
         return fmt_text(f"Swell: {height}ft at {period}s {emoji} {direction}\n")
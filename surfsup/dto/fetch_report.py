@@ -0,0 +1,45 @@
+from dataclasses import dataclass, field
+import math
+
+
+@dataclass
+class FetchProgress:
+    succeeded: int
+    failed: int
+    in_flight: int
+
+
+@dataclass
+class FetchReport:
+    """Outcome of a single forecast retrieval run."""
+
+    requested: int
+    succeeded: int = 0
+    errors: dict[str, str] = field(default_factory=dict)
+    latencies: dict[str, float] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def failed(self) -> int:
+        return len(self.errors)
+
+    def record_success(self) -> None:
+        self.succeeded += 1
+
+    def record_failure(self, spot_name: str, reason: str) -> None:
+        self.errors[spot_name] = reason
+
+    def progress(self) -> FetchProgress:
+        done = self.succeeded + self.failed
+        return FetchProgress(self.succeeded, self.failed, self.requested - done)
+
+    def record_latency(self, spot_name: str, seconds: float) -> None:
+        self.latencies[spot_name] = seconds
+
+    def percentile(self, pct: float) -> float:
+        """Nearest-rank percentile of the per-spot retrieval times, in seconds."""
+        if len(self.latencies) == 0:
+            return 0.0
+        ordered = sorted(self.latencies.values())
+        rank = max(1, int(math.ceil(pct / 100.0 * len(ordered))))
+        return ordered[rank - 1]
@@ -0,0 +1,286 @@
+import math
+from typing import Any, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from surfsup.dto.forecast_dto import (
+    ConditionRecord,
+    ForecastRecord,
+    SwellRecord,
+    TideCollectionRecord,
+    TideRecord,
+    WaveHeightRecord,
+    WeatherRecord,
+    WindRecord,
+)
+from surfsup.dto.forecast_frame import frame_from_columns
+
+# sub-records stored column-wise: part -> (record type, field -> dtype), where
+# "f8" is a number, "?" a bool, "U" a string and "C" a string from a small
+# vocabulary stored as codes into its categories
+PARTS: dict[str, tuple[type, dict[str, str]]] = {
+    "conditions": (ConditionRecord, {"human": "?", "value": "C", "expired": "?"}),
+    "wind": (WindRecord, {"speed": "f8", "direction": "f8"}),
+    "wave_height": (
+        WaveHeightRecord,
+        {
+            "human": "?",
+            "min": "f8",
+            "max": "f8",
+            "occasional": "f8",
+            "human_relation": "C",
+            "plus": "?",
+        },
+    ),
+    "weather": (
+        WeatherRecord,
+        {"water_min": "f8", "water_max": "f8", "temperature": "f8", "condition": "C"},
+    ),
+}
+TIDES = ("previous", "current", "next")
+TIDE_FIELDS = {"type_": "C", "height": "f8", "timestamp": "f8", "utc_offset": "f8"}
+SWELL_FIELDS = {
+    "height": "f8",
+    "period": "f8",
+    "direction": "f8",
+    "direction_min": "f8",
+}
+
+Column = Union[np.ndarray, pd.Categorical]
+
+
+def _number(val: Any) -> float:
+    try:
+        return float(val) if val is not None else math.nan
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _column(vals: list, dtype: str) -> Column:
+    if dtype == "C":
+        return pd.Categorical(vals)
+    if dtype == "f8":
+        return np.array([_number(val) for val in vals], dtype=np.float64)
+    if dtype == "?":
+        return np.array([bool(val) for val in vals], dtype=bool)
+    return np.array([str(val) if val is not None else "" for val in vals], dtype=str)
+
+
+def _mask(vals: list, dtype: str) -> Optional[np.ndarray]:
+    """The cells a column cannot tell apart on its own, None when there are none.
+
+    Numbers are stored as floats, so the mask marks the ones that were
+    ints; bools and strings have no missing value, so it marks the Nones.
+    Categoricals and NaN keep None by themselves.
+    """
+    if dtype == "C":
+        return None
+    if dtype == "f8":
+        mask = [isinstance(val, int) and not isinstance(val, bool) for val in vals]
+    else:
+        mask = [val is None for val in vals]
+    return np.array(mask, dtype=bool) if any(mask) else None
+
+
+def _values(col: Column, dtype: str, mask: Optional[np.ndarray]) -> list:
+    if isinstance(col, pd.Categorical):
+        cats = col.categories.tolist()
+        return [cats[code] if code >= 0 else None for code in col.codes.tolist()]
+    vals = col.tolist()
+    if dtype == "f8":
+        vals = [None if math.isnan(val) else val for val in vals]
+        if mask is not None:
+            vals = [
+                int(val) if is_int else val
+                for (is_int, val) in zip(mask.tolist(), vals)
+            ]
+    elif mask is not None:
+        vals = [None if null else val for (null, val) in zip(mask.tolist(), vals)]
+    return vals
+
+
+def _present(subs: list) -> np.ndarray:
+    return np.array([sub is not None for sub in subs], dtype=bool)
+
+
+class ForecastBatch:
+    """Struct-of-arrays form of the forecasts of one fetch run.
+
+    Every scalar of a ForecastRecord is kept in a typed numpy column named
+    "part.field", next to a boolean column per part (and per tide) marking
+    which spots have it. Strings from a small vocabulary (conditions, tide
+    types, ...) are pandas Categoricals. Swells are variable length, so
+    their columns are flat and swell_offsets[i]:swell_offsets[i + 1] are the
+    swells of spot i.
+
+    Numbers are float64 columns where NaN is None; masks keeps, for the
+    columns that need one, which numbers were ints and which bools or
+    strings were None, so to_records gives back the records it was built
+    from.
+    """
+
+    names: np.ndarray
+    notes: np.ndarray
+    columns: dict[str, Column]
+    swell_offsets: np.ndarray
+    swells: dict[str, Column]
+    masks: dict[str, np.ndarray]
+
+    def __init__(
+        self,
+        names: np.ndarray,
+        notes: np.ndarray,
+        columns: dict[str, Column],
+        swell_offsets: np.ndarray,
+        swells: dict[str, Column],
+        masks: Optional[dict[str, np.ndarray]] = None,
+    ):
+        self.names = names
+        self.notes = notes
+        self.columns = columns
+        self.swell_offsets = swell_offsets
+        self.swells = swells
+        self.masks = masks if masks is not None else {}
+
+    @classmethod
+    def from_records(cls, forecasts: dict[str, ForecastRecord]):
+        records = list(forecasts.values())
+        masks: dict[str, np.ndarray] = {}
+
+        def fill(prefix: str, subs: list, fields: dict[str, str]) -> dict:
+            """Column per field of subs, a None sub leaves a None cell."""
+            cols = {}
+            for (att, dtype) in fields.items():
+                vals = [getattr(sub, att) if sub is not None else None for sub in subs]
+                cols[att] = _column(vals, dtype)
+                mask = _mask(vals, dtype)
+                if mask is not None:
+                    masks[f"{prefix}.{att}"] = mask
+            return cols
+
+        columns: dict[str, Column] = {}
+        for (part, (_, fields)) in PARTS.items():
+            subs = [getattr(rec, part) for rec in records]
+            columns[part] = _present(subs)
+            for (att, col) in fill(part, subs, fields).items():
+                columns[f"{part}.{att}"] = col
+
+        tides = [rec.tide for rec in records]
+        columns["tide"] = _present(tides)
+        for which in TIDES:
+            subs = [
+                getattr(tide, which) if tide is not None else None for tide in tides
+            ]
+            columns[f"tide.{which}"] = _present(subs)
+            for (att, col) in fill(f"tide.{which}", subs, TIDE_FIELDS).items():
+                columns[f"tide.{which}.{att}"] = col
+
+        columns["swells"] = _present([rec.swells for rec in records])
+        counts = [len(rec.swells) if rec.swells else 0 for rec in records]
+        swell_offsets = np.zeros(len(records) + 1, dtype=np.int64)
+        np.cumsum(counts, out=swell_offsets[1:])
+        flat = [swell for rec in records if rec.swells for swell in rec.swells]
+
+        notes = [rec.note for rec in records]
+        note_mask = _mask(notes, "U")
+        if note_mask is not None:
+            masks["note"] = note_mask
+        return cls(
+            _column(list(forecasts.keys()), "U"),
+            _column(notes, "U"),
+            columns,
+            swell_offsets,
+            fill("swells", flat, SWELL_FIELDS),
+            masks,
+        )
+
+    def to_records(self) -> dict[str, ForecastRecord]:
+        parts = {
+            part: self._build(part, record_type, fields)
+            for (part, (record_type, fields)) in PARTS.items()
+        }
+        tides = [
+            TideCollectionRecord(*tide) if present else None
+            for (present, *tide) in zip(
+                self.columns["tide"].tolist(),
+                *[
+                    self._build(f"tide.{which}", TideRecord, TIDE_FIELDS)
+                    for which in TIDES
+                ],
+            )
+        ]
+
+        flat = [
+            SwellRecord(*row)
+            for row in zip(
+                *[
+                    _values(self.swells[att], dtype, self.masks.get(f"swells.{att}"))
+                    for (att, dtype) in SWELL_FIELDS.items()
+                ]
+            )
+        ]
+        offsets = self.swell_offsets.tolist()
+        has_swells = self.columns["swells"].tolist()
+        notes = _values(self.notes, "U", self.masks.get("note"))
+
+        out = {}
+        for (i, (name, note)) in enumerate(zip(self.names.tolist(), notes)):
+            out[name] = ForecastRecord(
+                note,
+                parts["conditions"][i],
+                parts["wind"][i],
+                flat[offsets[i] : offsets[i + 1]] if has_swells[i] else None,
+                parts["wave_height"][i],
+                tides[i],
+                parts["weather"][i],
+            )
+        return out
+
+    def _build(self, part: str, record_type: type, fields: dict[str, str]) -> list:
+        """Records of part from its columns, None where the spot has none."""
+        cols = [
+            _values(
+                self.columns[f"{part}.{att}"], dtype, self.masks.get(f"{part}.{att}")
+            )
+            for (att, dtype) in fields.items()
+        ]
+        return [
+            record_type(*row) if has else None
+            for (has, row) in zip(self.columns[part].tolist(), zip(*cols))
+        ]
+
+    def to_frame(self) -> pd.DataFrame:
+        """The to_df frame of the batch, built from its columns directly."""
+        has_swell = self.swell_offsets[1:] > self.swell_offsets[:-1]
+        first = self.swell_offsets[:-1][has_swell]
+
+        def first_swell(att: str) -> np.ndarray:
+            out = np.full(len(self), np.nan, dtype=np.float64)
+            out[has_swell] = self.swells[att][first]
+            return out
+
+        conditions = self.columns["conditions.value"]
+        if "" in conditions.categories:
+            conditions = conditions.remove_categories("")
+        numbers = {
+            "wind_speed": self.columns["wind.speed"],
+            "wind_dir": self.columns["wind.direction"],
+            "wave_min": self.columns["wave_height.min"],
+            "wave_max": self.columns["wave_height.max"],
+            "wave_occ": self.columns["wave_height.occasional"],
+            "swell_dir": first_swell("direction"),
+            "swell_ht": first_swell("height"),
+            "swell_pd": first_swell("period"),
+        }
+        return frame_from_columns(self.names.tolist(), conditions, numbers)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self.names, self.notes, self.swell_offsets]
+        arrays += list(self.columns.values()) + list(self.swells.values())
+        arrays += list(self.masks.values())
+        return sum(arr.nbytes for arr in arrays)
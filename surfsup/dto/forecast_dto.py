@@ -1,9 +1,14 @@
 from dataclasses import dataclass
 from typing import Any
 
+# __slots__ are declared by hand, dataclass(slots=True) needs python 3.10;
+# thousands of records are held at once and a __dict__ each adds up
+
 
 @dataclass
 class ConditionRecord:
+    __slots__ = ("human", "value", "expired")
+
     human: bool
     value: str
     expired: bool
@@ -14,6 +19,8 @@ class ConditionRecord:
 
 @dataclass
 class WindRecord:
+    __slots__ = ("speed", "direction")
+
     speed: int
     direction: float
 
@@ -23,6 +30,8 @@ class WindRecord:
 
 @dataclass
 class WaveHeightRecord:
+    __slots__ = ("human", "min", "max", "occasional", "human_relation", "plus")
+
     human: bool
     min: float
     max: int
@@ -36,6 +45,8 @@ class WaveHeightRecord:
 
 @dataclass
 class SwellRecord:
+    __slots__ = ("height", "period", "direction", "direction_min")
+
     height: float
     period: int
     direction: float
@@ -47,6 +58,8 @@ class SwellRecord:
 
 @dataclass
 class TideRecord:
+    __slots__ = ("type_", "height", "timestamp", "utc_offset")
+
     type_: str
     height: float
     timestamp: int
@@ -58,6 +71,8 @@ class TideRecord:
 
 @dataclass
 class TideCollectionRecord:
+    __slots__ = ("previous", "current", "next")
+
     previous: TideRecord
     current: TideRecord
     next: TideRecord
@@ -70,6 +85,8 @@ class TideCollectionRecord:
 
 @dataclass
 class WeatherRecord:
+    __slots__ = ("water_min", "water_max", "temperature", "condition")
+
     water_min: int
     water_max: int
     temperature: int
@@ -83,6 +100,16 @@ class WeatherRecord:
 
 @dataclass
 class ForecastRecord:
+    __slots__ = (
+        "note",
+        "conditions",
+        "wind",
+        "swells",
+        "wave_height",
+        "tide",
+        "weather",
+    )
+
     note: str
     conditions: Any
     wind: Any
@@ -92,15 +119,16 @@ class ForecastRecord:
     weather: Any
 
     def as_csv(self, sep: str = ",") -> str:
+        """Values of the forecast, with empty columns for any missing part."""
         return sep.join(
             [
-                self.conditions.as_csv(sep) if self.conditions != None else "",
-                self.wind.as_csv(sep) if self.wind != None else ",",
-                self.wave_height.as_csv(sep) if self.wave_height != None else ",,",
-                self.swells[0].as_csv(sep) if self.swells[0] != None else ",,",
-                self.tide.as_csv(sep) if self.tide != None else ",,,,,",
-                self.weather.as_csv(sep),
+                self.conditions.as_csv(sep) if self.conditions is not None else "",
+                self.wind.as_csv(sep) if self.wind is not None else sep,
+                self.wave_height.as_csv(sep)
+                if self.wave_height is not None
+                else sep * 2,
+                self.swells[0].as_csv(sep) if self.swells else sep * 2,
+                self.tide.as_csv(sep) if self.tide is not None else sep * 5,
+                self.weather.as_csv(sep) if self.weather is not None else sep * 2,
             ]
-            if self.weather != None
-            else ",,"
         )
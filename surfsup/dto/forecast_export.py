@@ -0,0 +1,98 @@
+import csv
+import gzip
+import io
+import math
+import os
+import time
+from typing import Any, Iterable, Optional
+
+from surfsup.dto.forecast_dto import ForecastRecord
+from surfsup.dto.forecast_schema import FORECAST_COLUMNS, flatten_forecast
+
+
+def csv_value(val: Any, null: str = "") -> str:
+    """Text of a flattened forecast value; NaN and None are written as null."""
+    if val is None:
+        return null
+    if isinstance(val, float):
+        if math.isnan(val):
+            return null
+        return str(int(val)) if val.is_integer() else repr(val)
+    return str(val)
+
+
+class ForecastCSVWriter:
+    """Streaming CSV export of forecasts in the FORECAST_SCHEMA columns.
+
+    Rows are buffered and written batch_size at a time, so a whole fetch
+    run is never held in memory. Every row has every column, with null for
+    missing values, and the header is only written when the file is new
+    or empty, so appending runs keeps one header. A path ending in .gz is
+    gzip compressed; appending to it adds a gzip member, which readers
+    decompress as one stream.
+
+    Use as a context manager, or call close, to flush the last batch.
+    """
+
+    path: str
+    batch_size: int
+    written: int
+
+    def __init__(
+        self,
+        path: str,
+        append: bool = True,
+        compress: Optional[bool] = None,
+        batch_size: int = 500,
+        null: str = "",
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.null = null
+        self.written = 0
+        self.pending: list[list[str]] = []
+
+        compress = compress if compress is not None else path.endswith(".gz")
+        mode = "ab" if append else "wb"
+        new_file = not append or not os.path.exists(path) or os.path.getsize(path) == 0
+        raw = gzip.open(path, mode) if compress else open(path, mode)
+        self.fout = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+        self.writer = csv.writer(self.fout)
+        if new_file:
+            self.writer.writerow(FORECAST_COLUMNS)
+
+    def write(
+        self, name: str, fcst: ForecastRecord, fetched_at: Optional[float] = None
+    ) -> None:
+        fetched_at = fetched_at if fetched_at is not None else time.time()
+        row = flatten_forecast(name, fcst, fetched_at)
+        self.pending.append(
+            [csv_value(row[col], self.null) for col in FORECAST_COLUMNS]
+        )
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def write_all(self, forecasts: Iterable[tuple[str, ForecastRecord]]) -> int:
+        """Write (name, forecast) pairs as they are produced, returning the count."""
+        before = self.written + len(self.pending)
+        for (name, fcst) in forecasts:
+            self.write(name, fcst)
+        return self.written + len(self.pending) - before
+
+    def flush(self) -> None:
+        self.writer.writerows(self.pending)
+        self.written += len(self.pending)
+        self.pending = []
+        self.fout.flush()
+
+    def close(self) -> None:
+        if self.fout.closed:
+            return None
+        self.flush()
+        self.fout.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
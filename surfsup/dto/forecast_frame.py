@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+from surfsup.dto.forecast_dto import ForecastRecord
+from surfsup.dto.forecast_schema import number_or_nan
+
+# numeric to_df columns, all float64 so a missing value is NaN
+FRAME_NUMBERS = [
+    "wind_speed",
+    "wind_dir",
+    "wave_min",
+    "wave_max",
+    "wave_occ",
+    "swell_dir",
+    "swell_ht",
+    "swell_pd",
+]
+FRAME_COLUMNS = ["name", "conditions"] + FRAME_NUMBERS
+
+
+def frame_from_columns(
+    names: list[str], conditions: pd.Categorical, numbers: dict[str, np.ndarray]
+) -> pd.DataFrame:
+    """Wrap typed columns into a to_df frame.
+
+    The dict is built in FRAME_COLUMNS order rather than passing columns=,
+    which has pandas reindex the dict and is most of the time at bot sized
+    inputs.
+    """
+    data = {"name": names, "conditions": conditions}
+    data.update({col: numbers[col] for col in FRAME_NUMBERS})
+    return pd.DataFrame(data)
+
+
+def _numbers(fcst: ForecastRecord) -> tuple:
+    """FRAME_NUMBERS of one forecast, None where a part is missing."""
+    wind, wave = fcst.wind, fcst.wave_height
+    swell = fcst.swells[0] if fcst.swells else None
+    return (
+        wind.speed if wind is not None else None,
+        wind.direction if wind is not None else None,
+        wave.min if wave is not None else None,
+        wave.max if wave is not None else None,
+        wave.occasional if wave is not None else None,
+        swell.direction if swell is not None else None,
+        swell.height if swell is not None else None,
+        swell.period if swell is not None else None,
+    )
+
+
+def forecast_frame(forecasts: dict[str, ForecastRecord]) -> pd.DataFrame:
+    """One row per spot: categorical conditions and float64 measurements.
+
+    The measurements go into a single float64 array in one conversion, so
+    no per-cell objects are kept; missing wind, swell or wave data becomes
+    NaN and missing conditions a missing category.
+    """
+    rows = [_numbers(fcst) for fcst in forecasts.values()]
+    try:
+        values = np.array(rows, dtype=np.float64).reshape(-1, len(FRAME_NUMBERS))
+    except (TypeError, ValueError):
+        # a value that is not a number, convert cell by cell
+        values = np.array(
+            [[number_or_nan(val) for val in row] for row in rows], dtype=np.float64
+        ).reshape(-1, len(FRAME_NUMBERS))
+    # column-major so every column is a contiguous view
+    values = np.asfortranarray(values)
+    numbers = {col: values[:, i] for (i, col) in enumerate(FRAME_NUMBERS)}
+
+    conditions = pd.Categorical(
+        [
+            fcst.conditions.value
+            if fcst.conditions is not None and fcst.conditions.value
+            else None
+            for fcst in forecasts.values()
+        ]
+    )
+    return frame_from_columns(list(forecasts.keys()), conditions, numbers)
@@ -0,0 +1,139 @@
+import os
+import time
+from datetime import date, datetime, timezone
+from glob import glob
+from os.path import basename, isdir
+from typing import Any, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from surfsup.dto.forecast_dto import ForecastRecord
+from surfsup.dto.forecast_schema import (
+    FORECAST_COLUMNS,
+    FORECAST_SCHEMA,
+    flatten_forecast,
+    forecast_columns,
+)
+from surfsup.excepts import InvalidSchemaException
+from surfsup.utils import joinpath
+
+
+def utc_day(timestamp: float) -> date:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).date()
+
+
+class ForecastHistory:
+    """Forecast history kept as compressed, typed columnar files.
+
+    Rows follow FORECAST_SCHEMA and are partitioned by the UTC day they
+    were fetched: each append writes one .npz part under
+    root/day=YYYY-MM-DD/. Reads only open the partitions in the requested
+    date range, and a spot filter only decompresses the name column of
+    parts holding none of the spots.
+    """
+
+    root: str
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def append(
+        self, forecasts: dict[str, ForecastRecord], fetched_at: Optional[float] = None
+    ) -> int:
+        """Store a fetch run, returning the rows written."""
+        fetched_at = fetched_at if fetched_at is not None else time.time()
+        rows = [flatten_forecast(n, f, fetched_at) for (n, f) in forecasts.items()]
+        return self.append_rows(rows)
+
+    def append_rows(self, rows: Iterable[dict[str, Any]]) -> int:
+        by_day: dict[date, list] = {}
+        for row in rows:
+            by_day.setdefault(utc_day(row["fetched_at"]), []).append(row)
+        for (day, day_rows) in by_day.items():
+            self._write_part(day, forecast_columns(day_rows))
+        return sum(len(day_rows) for day_rows in by_day.values())
+
+    def days(self) -> list[date]:
+        """Every day holding at least one partition, oldest first."""
+        out = []
+        for path in glob(joinpath(self.root, "day=*")):
+            out.append(date.fromisoformat(basename(path)[len("day=") :]))
+        return sorted(out)
+
+    def read(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        spots: Optional[Iterable[str]] = None,
+        columns: Optional[list[str]] = None,
+    ) -> pd.DataFrame:
+        """Rows fetched from start to end (inclusive UTC days), optionally only
+        for the given spots and columns.
+        """
+        columns = columns if columns is not None else FORECAST_COLUMNS
+        wanted = np.array(sorted(set(spots)), dtype=str) if spots is not None else None
+        parts: list[dict[str, np.ndarray]] = []
+        for day in self.days():
+            if (start is not None and day < start) or (end is not None and day > end):
+                continue
+            for path in sorted(glob(joinpath(self._day_dir(day), "*.npz"))):
+                part = self._read_part(path, columns, wanted)
+                if part is not None:
+                    parts.append(part)
+
+        return pd.DataFrame(
+            {
+                col: np.concatenate([part[col] for part in parts])
+                if len(parts) > 0
+                else np.array([], dtype=FORECAST_SCHEMA[col])
+                for col in columns
+            }
+        )
+
+    def compact(self, day: date) -> None:
+        """Merge the parts of a day into one file."""
+        paths = sorted(glob(joinpath(self._day_dir(day), "*.npz")))
+        if len(paths) < 2:
+            return None
+        merged = self.read(day, day)
+        self._write_part(
+            day,
+            {
+                # pandas holds text as objects, which np.load refuses to unpickle
+                col: merged[col].to_numpy(dtype=str if dtype == "U" else dtype)
+                for (col, dtype) in FORECAST_SCHEMA.items()
+            },
+        )
+        for path in paths:
+            os.remove(path)
+
+    def _day_dir(self, day: date) -> str:
+        return joinpath(self.root, f"day={day.isoformat()}")
+
+    def _write_part(self, day: date, arrays: dict[str, np.ndarray]) -> None:
+        day_dir = self._day_dir(day)
+        if not isdir(day_dir):
+            os.makedirs(day_dir, exist_ok=True)
+        name = f"part-{time.time_ns()}-{os.getpid()}.npz"
+        tmp_path = joinpath(day_dir, "." + name + ".tmp")
+        with open(tmp_path, "wb") as fout:
+            np.savez_compressed(fout, **arrays)
+        # readers never see a half-written part
+        os.replace(tmp_path, joinpath(day_dir, name))
+
+    @staticmethod
+    def _read_part(
+        path: str, columns: list[str], wanted: Optional[np.ndarray]
+    ) -> Optional[dict[str, np.ndarray]]:
+        with np.load(path, allow_pickle=False) as npz:
+            if sorted(npz.files) != sorted(FORECAST_COLUMNS):
+                raise InvalidSchemaException
+            # members of an npz are decompressed only when accessed
+            if wanted is None:
+                return {col: npz[col] for col in columns}
+            mask = np.isin(npz["name"], wanted)
+            if not mask.any():
+                return None
+            return {col: npz[col][mask] for col in columns}
@@ -1,13 +1,29 @@
-import math
+import asyncio
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from itertools import islice
 from pprint import PrettyPrinter
+import queue
 import threading
 import time
 import traceback
+from typing import Callable, Iterator, Optional, Union
 import pandas as pd
-from surfsup.maps import Location, distance_miles
-from spellchecker import SpellChecker
+from surfsup.maps import Location
 
 from surfsup.surfline.api import SurflineAPI
+from surfsup.surfline.hedging import Hedger
+from surfsup.surfline.name_index import NameIndex
+from surfsup.dto.fetch_report import FetchProgress, FetchReport
+from surfsup.dto.forecast_batch import ForecastBatch
+from surfsup.dto.forecast_export import ForecastCSVWriter
+from surfsup.dto.forecast_frame import forecast_frame
+from surfsup.dto.scoring import score_forecasts, top_k
 from surfsup.dto.forecast_dto import (
     ConditionRecord,
     WindRecord,
@@ -113,76 +129,160 @@ def parse_forecast_info(forecast_info):
 class ForecastFetcher:
     surfline: SurflineAPI
     lck: threading.Lock
-    err_tracker: list[str]
+    last_report: Optional[FetchReport]
     nthreads: int
     pp: PrettyPrinter = PrettyPrinter(indent=2)
     verbose: int
-    speller: SpellChecker
-
-    def __init__(self, db_path: str, nthreads: int = 16, verbose: int = 0):
-        self.surfline = SurflineAPI(db_path)
+    names: NameIndex
+    use_async: bool
+    max_connections: int
+
+    def __init__(
+        self,
+        db_path: str,
+        nthreads: Optional[int] = None,
+        verbose: int = 0,
+        use_async: bool = False,
+        max_connections: int = 64,
+        cache_path: Optional[str] = None,
+        hedge_ratio: Optional[float] = None,
+    ):
+        """With hedge_ratio, up to that fraction of spot requests slower than
+        the recent p95 are hedged with a second request.
+        """
+        hedger = Hedger(max_ratio=hedge_ratio) if hedge_ratio else None
+        self.surfline = SurflineAPI(db_path, cache_path=cache_path, hedger=hedger)
         self.lck = threading.Lock()
-        self.nthreads = nthreads
-        self.err_tracker = []
+        # by default enough threads for the highest concurrency the shared
+        # limiter may reach; the ones above its current limit wait in it
+        self.nthreads = (
+            nthreads if nthreads is not None else int(self.surfline.limiter.max_limit)
+        )
+        self.use_async = use_async
+        self.max_connections = max_connections
+        self.last_report = None
         self.verbose = verbose
 
-        # initialize speller: only include the valid spot names
-        self.speller = SpellChecker(case_sensitive=True)
-        self.speller.word_frequency.dictionary.clear()
-        self.speller.word_frequency.load_words(self.surfline.get_spot_names())
-
-    def retrieve_forecast(self, names, spot_forecast):
-        cnt: int = 0
+        # fuzzy matching over the valid spot names
+        self.names = NameIndex(self.surfline.get_spot_names())
+
+    def retrieve_forecast(
+        self,
+        names: list[str],
+        spot_forecast: dict,
+        report: Optional[FetchReport] = None,
+        on_progress: Optional[Callable[[FetchProgress], None]] = None,
+    ):
+        report = report if report is not None else FetchReport(len(names))
         for spot_name in names:
-            spot_data = {}
             try:
                 spot_data = self.surfline.spot_check(spot_name)
             except Exception as exc:
-                print(f"ERROR {exc}") if self.verbose > 0 else None
+                self._record_failure(spot_name, exc, report, on_progress)
+                continue
+
+            self._record_forecast(
+                spot_name, spot_data, spot_forecast, report, on_progress
+            )
+
+        self.pp.pprint(spot_forecast) if self.verbose > 1 else None
+        return spot_forecast
 
+    def drain_queue(
+        self,
+        work: queue.SimpleQueue,
+        spot_forecast: dict,
+        report: FetchReport,
+        on_progress: Optional[Callable[[FetchProgress], None]] = None,
+    ):
+        """Retrieve forecasts for spots pulled from work until it is empty."""
+        while True:
             try:
-                if not spot_data:
-                    print("Spot data is empty") if self.verbose > 0 else None
-                    continue
-
-                forecast_info = spot_data["forecast"]
-                fcst = parse_forecast_info(forecast_info)
-                with self.lck:
-                    spot_forecast[spot_name] = fcst
-                cnt += 1
-            except Exception as exc:
-                self.err_tracker.append(spot_name)
-                track = traceback.format_exc(limit=1)
-                print(
-                    f"[[Thread-{threading.currentThread().name}]] ERROR: {spot_name}:\n"
-                    + track
-                    + f"----------Current count: {cnt}"
-                ) if self.verbose > 0 else None
-
-        self.pp.pprint(spot_forecast) if self.verbose > 0 else None
+                spot_name = work.get_nowait()
+            except queue.Empty:
+                return spot_forecast
+
+            stime = time.perf_counter()
+            self.retrieve_forecast([spot_name], spot_forecast, report, on_progress)
+            with self.lck:
+                report.record_latency(spot_name, time.perf_counter() - stime)
+
+    async def aretrieve_forecast(
+        self,
+        session,
+        spot_name: str,
+        spot_forecast: dict,
+        report: FetchReport,
+        on_progress: Optional[Callable[[FetchProgress], None]] = None,
+    ):
+        stime = time.perf_counter()
+        try:
+            spot_data = await self.surfline.async_spot_check(session, spot_name)
+        except Exception as exc:
+            self._record_failure(spot_name, exc, report, on_progress)
+            spot_data = None
+
+        if spot_data is not None:
+            self._record_forecast(
+                spot_name, spot_data, spot_forecast, report, on_progress
+            )
+        report.record_latency(spot_name, time.perf_counter() - stime)
         return spot_forecast
 
-    def by_loc(self, loc: Location, max_radius: int):
-        # deep copy ? do we need to do this? maybe to do inplace sort?
-        df = self.surfline.database.table.copy()
+    def _record_forecast(
+        self,
+        spot_name: str,
+        spot_data: dict,
+        spot_forecast: dict,
+        report: FetchReport,
+        on_progress: Optional[Callable[[FetchProgress], None]],
+    ) -> None:
+        try:
+            if not spot_data:
+                raise ValueError("Spot data is empty")
+            fcst = parse_forecast_info(spot_data["forecast"])
+        except Exception as exc:
+            self._record_failure(spot_name, exc, report, on_progress)
+            return None
+
+        with self.lck:
+            spot_forecast[spot_name] = fcst
+            report.record_success()
+            progress = report.progress()
+        on_progress(progress) if on_progress is not None else None
+        return None
 
-        distance_fn = lambda row: distance_miles(
-            loc, Location(row["latitude"], row["longitude"])
-        )
+    def _record_failure(
+        self,
+        spot_name: str,
+        exc: Exception,
+        report: FetchReport,
+        on_progress: Optional[Callable[[FetchProgress], None]],
+    ) -> None:
+        print(
+            f"[[Thread-{threading.current_thread().name}]] ERROR: {spot_name}:\n"
+            + traceback.format_exc(limit=1)
+        ) if self.verbose > 0 else None
 
-        stime = time.time()
-        df["distance"] = df.apply(distance_fn, axis=1)
-        df.sort_values(by="distance", inplace=True)
-        print(f"Calculating distance from user and sorting took {time.time() - stime}")
-        print(df.head())
+        with self.lck:
+            report.record_failure(spot_name, repr(exc))
+            progress = report.progress()
+        on_progress(progress) if on_progress is not None else None
+        return None
 
+    def by_loc(self, loc: Location, max_radius: int):
         stime = time.time()
-        in_range = df.apply(lambda row: row["distance"] <= max_radius, axis=1)
-        df = df[in_range] if len(df[in_range]) > 0 else df.head()
-        print(f"Filtering took {time.time() - stime}: found {len(list(df['name']))}")
+        df = self.surfline.database.within_radius(loc, max_radius)
+        if len(df) == 0:
+            # nothing in range: fall back to the nearest few spots
+            df = self.surfline.database.k_nearest(loc, 5)
+        print(f"Finding spots took {time.time() - stime}: found {len(df)}")
 
         stime = time.time()
-        results_dict = self.runner(list(df["name"]))
+        if self.use_async:
+            results_dict = asyncio.run(self.arunner(list(df["name"])))
+        else:
+            results_dict = self.runner(list(df["name"]))
         print(f"Retrieval took {time.time() - stime}: found {len(df)}")
         # TODO so ugly
         return (
@@ -193,211 +293,204 @@ class ForecastFetcher:
 
     def top_sorted(self, forecasts: dict, max_height: int, n: int = 5):
         df = self.to_df(forecasts)
-
-        def conditions_score(c):
-            conditions_order = [
-                None,
-                "FLAT",
-                "VERY_POOR",
-                "POOR",
-                "POOR_TO_FAIR",
-                "FAIR",
-                "FAIR_TO_GOOD",
-                "GOOD",
-                "GOOD_TO_EPIC",
-                "EPIC",
-            ]
-            # returns a ratio (GOOD_TO_EPIC and EPIC deserver > 100% score)
-            return conditions_order.index(c) / (len(conditions_order) - 2)
-
-        def height_score(s, max_height: int = 8):
-            if s > max_height + 2:
-                s = 0
-            return s / max_height
-
-        def wind_score(speed, dir, swell_dir):
-            # is offshore: check against swell direction
-            opp_wind = (dir + 180) % 360
-
-            wind_score = -abs(opp_wind - swell_dir) / 180
-            if abs(wind_score) <= 0.5:
-                return wind_score + (self.__inside(speed, 25)) / 25
-            else:
-                return wind_score - (self.__inside(speed, 25)) / 25
-
-        def total_score(row):
-            return self.__average(
-                [
-                    conditions_score(row["conditions"]),
-                    height_score(row["wave_min"], max_height),
-                    height_score(
-                        row["wave_max"]
-                        if row["wave_occ"] == None
-                        else max(row["wave_max"], row["wave_occ"]),
-                        max_height,
-                    ),
-                    wind_score(row["wind_speed"], row["wind_dir"], row["swell_dir"]),
-                ]
-            )
-
-        df["sortable"] = df.apply(total_score, axis=1)
-        df.sort_values(by="sortable", ascending=False, inplace=True)
-        return df.head(n)
+        df["sortable"] = score_forecasts(df, max_height)
+        return df.iloc[top_k(df["sortable"].to_numpy(), n)]
 
     def partial_name(self, spot_name: str, num_back: int = 5) -> list[str]:
-        options = list(self.speller.candidates(spot_name))[:num_back]
-        out: list[str] = []
-        for op in options:
-            nms = list(map(lambda x: x.lower(), self.surfline.get_spot_names()))
-            idx = -1
-            try:
-                idx = nms.index(op)
-            except:
-                # Unable to find op in nms
-                pass
-            if idx >= 0:
-                out.append(self.surfline.get_spot_names()[idx])
-
-        return out
-
-    def to_df(self, forecast_infos: dict[str, ForecastRecord]):
-        data = []
-        for (spot_name, fcst) in forecast_infos.items():
-            data.append(
-                [
-                    spot_name,
-                    fcst.conditions.value,
-                    fcst.wind.speed,
-                    fcst.wind.direction,
-                    fcst.wave_height.min,
-                    fcst.wave_height.max,
-                    fcst.wave_height.occasional,
-                    fcst.swells[0].direction,
-                    fcst.swells[0].height,
-                    fcst.swells[0].period,
-                ]
-            )
-
-        return pd.DataFrame(
-            data,
-            columns=[
-                "name",
-                "conditions",
-                "wind_speed",
-                "wind_dir",
-                "wave_min",
-                "wave_max",
-                "wave_occ",
-                "swell_dir",
-                "swell_ht",
-                "swell_pd",
-            ],
-        )
+        """Valid spot names closest to a misspelled spot_name."""
+        return self.names.suggest(spot_name, num_back)
 
-    def to_csv(self, filename: str, forecast_infos: dict[str, ForecastRecord]) -> None:
-        with open(filename, "a+") as fname:
-            fname.write(
-                ",".join(
-                    [
-                        "name",
-                        "conditions",
-                        "wind_speed",
-                        "wind_dir",
-                        "wave_min",
-                        "wave_max",
-                        "wave_occ",
-                        "swell_ht",
-                        "swell_per",
-                        "swell_dir",
-                        "ptide_ht",
-                        "ptide_ts",
-                        "ctide_ht",
-                        "ctide_ts",
-                        "ntide_ht",
-                        "ntide_ts",
-                        "temp",
-                        "water_low",
-                        "water_high",
-                    ]
-                )
-                + "\n"
-            )
-            for (spot_name, fcst) in forecast_infos.items():
-                name = spot_name
-                fname.write(",".join([name, fcst.as_csv()]) + "\n")
+    def complete_name(self, prefix: str, num_back: int = 5) -> list[str]:
+        """Valid spot names with a word starting with prefix."""
+        return self.names.complete(prefix, num_back)
 
-        return None
+    def to_df(
+        self, forecast_infos: Union[dict[str, ForecastRecord], ForecastBatch]
+    ) -> pd.DataFrame:
+        if isinstance(forecast_infos, ForecastBatch):
+            return forecast_infos.to_frame()
+        return forecast_frame(forecast_infos)
 
-    def runner(self, names: list[str] = []):
+    def to_csv(self, filename: str, forecast_infos: dict[str, ForecastRecord]) -> None:
+        """Append forecast_infos to filename, see ForecastCSVWriter."""
+        with ForecastCSVWriter(filename) as out:
+            out.write_all(forecast_infos.items())
+
+    def export(self, filename: str, names: list[str] = []) -> int:
+        """Stream the forecasts of names (all spots if empty) into filename while
+        they are fetched, returning the number of rows written.
+        """
+        with ForecastCSVWriter(filename) as out:
+            return out.write_all(self.stream(names))
+
+    def runner(
+        self,
+        names: list[str] = [],
+        on_progress: Optional[Callable[[FetchProgress], None]] = None,
+    ) -> dict[str, ForecastRecord]:
+        """Retrieve the forecast for every spot in names (all spots if empty).
+
+        on_progress is called from the worker threads each time a spot
+        completes. The outcome of the run is kept in last_report.
+        """
         print(
             f"[ STARTING RUNNER - ForecastRetrieval {self.nthreads}-threads ]############"
         ) if self.verbose > 0 else None
-        if len(names) == 0:
-            names = self.surfline.get_spot_names()
-        else:
-            assert self.surfline.validate_names(names)
-
-        # Pull forecast for all spots and format to ForecastRecord
-        res_pool = dict()
-        thread_pool = list[threading.Thread]()
-        if len(names) < self.nthreads:
-            # if less than the number of threads just do on a single thread
-            res_pool[0] = dict()
-            self.retrieve_forecast(names, res_pool[0])
-        else:
-            # multithreading forecast_pull
-            n = int(math.ceil(len(names) / self.nthreads))
-            prev_i = 0
-            for i in range(self.nthreads):
-                res_pool[i] = dict()
-                next_i = self.__inside(prev_i + n, len(names))
-                p1 = names[prev_i:next_i]
-                prev_i = next_i
-
-                t = threading.Thread(
-                    target=self.retrieve_forecast, args=[p1, res_pool[i]], name=f"{i}"
-                )
-                t.start()
-                thread_pool.append(t)
-
-        # wait for threads giving updates
-        it = 1
-        while any(map(lambda x: x.is_alive(), thread_pool)):
-            s_cnt = self.__recursive_dict_len(res_pool)
-            f_cnt = len(self.err_tracker)
-            print(
-                f"[{it}] -- {len(threading.enumerate())-1} JOBS ALIVE -- {s_cnt} SUCCESSFUL -- {f_cnt} FAILURES"
-            ) if ((self.verbose > 0) and ((it - 1) % 10 == 0)) else None
-            it += 1
-            # time.sleep(5)
-
-        if len(self.err_tracker) > 0:
-            print("Showing Error Dictionary:") if self.verbose > 0 else None
-            self.pp.pprint(self.err_tracker) if self.verbose > 0 else None
+        names = self._resolve_names(names)
+        if on_progress is None and self.verbose > 0:
+            on_progress = self._print_progress
+
+        # Pull forecast for all spots and format to ForecastRecord: idle workers
+        # pull the next spot from a shared queue so one slow spot only holds
+        # up the worker fetching it
+        report = FetchReport(len(names))
+        spot_forecast: dict[str, ForecastRecord] = dict()
+        work = queue.SimpleQueue()
+        for name in names:
+            work.put(name)
+
+        stime = time.perf_counter()
+        nworkers = self.__inside(self.nthreads, len(names))
+        with ThreadPoolExecutor(
+            max_workers=max(1, nworkers), thread_name_prefix="ForecastRetrieval"
+        ) as pool:
+            futures = [
+                pool.submit(self.drain_queue, work, spot_forecast, report, on_progress)
+                for _ in range(nworkers)
+            ]
+            # block until every worker is done instead of polling them
+            for future in as_completed(futures):
+                future.result()
+        report.elapsed = time.perf_counter() - stime
 
-        master = dict()
-        for res in res_pool.values():
-            master = {**master, **res}
+        self.last_report = report
+        if report.failed > 0:
+            print("Showing Error Dictionary:") if self.verbose > 0 else None
+            self.pp.pprint(report.errors) if self.verbose > 0 else None
+        print(
+            f"Spot latency p50 {report.percentile(50):.3f}s -- p99 {report.percentile(99):.3f}s"
+        ) if self.verbose > 0 else None
 
         print(
-            f"Found a total of {len(master)} forecasts!!"
+            f"Found a total of {len(spot_forecast)} forecasts!!"
         ) if self.verbose > 0 else None
         print(
             f"[ COMPLETE - ForecastRetrieval {self.nthreads}-threads ]###################"
         ) if self.verbose > 0 else None
 
-        return master
+        return spot_forecast
+
+    def snapshot(
+        self,
+        names: list[str] = [],
+        on_progress: Optional[Callable[[FetchProgress], None]] = None,
+    ) -> ForecastBatch:
+        """runner packed into a ForecastBatch, to hold a whole catalogue run
+        in typed columns instead of one set of records per spot.
+        """
+        return ForecastBatch.from_records(self.runner(names, on_progress))
+
+    async def arunner(
+        self,
+        names: list[str] = [],
+        on_progress: Optional[Callable[[FetchProgress], None]] = None,
+    ) -> dict[str, ForecastRecord]:
+        """Asyncio counterpart of runner.
+
+        Every spot is fetched concurrently over a single connection pool which
+        holds at most max_connections connections to Surfline.
+        """
+        print(
+            f"[ STARTING ARUNNER - ForecastRetrieval {self.max_connections}-connections ]"
+        ) if self.verbose > 0 else None
+        names = self._resolve_names(names)
+        if on_progress is None and self.verbose > 0:
+            on_progress = self._print_progress
+
+        report = FetchReport(len(names))
+        spot_forecast: dict[str, ForecastRecord] = dict()
+        stime = time.perf_counter()
+        async with self.surfline.async_session(self.max_connections) as session:
+            await asyncio.gather(
+                *[
+                    self.aretrieve_forecast(
+                        session, n, spot_forecast, report, on_progress
+                    )
+                    for n in names
+                ]
+            )
+            # stale refreshes use the session, finish them before it closes
+            await self.surfline.cache.drain_refreshes()
+        report.elapsed = time.perf_counter() - stime
+        self.last_report = report
+
+        print(
+            f"Found a total of {len(spot_forecast)} forecasts!!"
+        ) if self.verbose > 0 else None
+        return spot_forecast
+
+    def stream(
+        self,
+        names: list[str] = [],
+        on_progress: Optional[Callable[[FetchProgress], None]] = None,
+    ) -> Iterator[tuple[str, ForecastRecord]]:
+        """Yield (name, forecast) for every spot in names (all spots if empty) as
+        it completes.
+
+        At most twice nthreads spots are fetched or waiting to be consumed
+        at once, so a full-catalogue run holds only a window of forecasts.
+        The outcome of the run is kept in last_report once it is exhausted.
+        """
+        names = self._resolve_names(names)
+        report = FetchReport(len(names))
+        remaining = iter(names)
+        window = 2 * max(1, self.nthreads)
+        in_flight: dict[Future, str] = {}
+
+        stime = time.perf_counter()
+        with ThreadPoolExecutor(
+            max_workers=max(1, self.nthreads), thread_name_prefix="ForecastStream"
+        ) as pool:
+            while True:
+                for name in islice(remaining, window - len(in_flight)):
+                    future = pool.submit(self._fetch_one, name, report, on_progress)
+                    in_flight[future] = name
+                if len(in_flight) == 0:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = in_flight.pop(future)
+                    fcst = future.result()
+                    if fcst is not None:
+                        yield (name, fcst)
+        report.elapsed = time.perf_counter() - stime
+        self.last_report = report
+
+    def _fetch_one(
+        self,
+        spot_name: str,
+        report: FetchReport,
+        on_progress: Optional[Callable[[FetchProgress], None]],
+    ) -> Optional[ForecastRecord]:
+        spot_forecast: dict[str, ForecastRecord] = {}
+        stime = time.perf_counter()
+        self.retrieve_forecast([spot_name], spot_forecast, report, on_progress)
+        with self.lck:
+            report.record_latency(spot_name, time.perf_counter() - stime)
+        return spot_forecast.get(spot_name)
+
+    def _resolve_names(self, names: list[str]) -> list[str]:
+        if len(names) == 0:
+            return self.surfline.get_spot_names()
+
+        assert self.surfline.validate_names(names)
+        return names
 
     def __inside(self, idx: int, length: int):
         return min(max(0, idx), length)
 
-    def __recursive_dict_len(self, pool: dict):
-        total_cnt: int = 0
-        for k in pool.keys():
-            res = pool[k]
-            total_cnt += len(res)
-        return total_cnt
-
-    def __average(self, iter):
-        n = len(iter)
-        return sum(iter) / n
+    def _print_progress(self, progress: FetchProgress) -> None:
+        done = progress.succeeded + progress.failed
+        print(
+            f"{progress.in_flight} IN FLIGHT -- {progress.succeeded} SUCCESSFUL -- {progress.failed} FAILURES"
+        ) if (done % 10 == 0 or progress.in_flight == 0) else None
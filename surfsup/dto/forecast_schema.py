@@ -0,0 +1,90 @@
+import math
+from typing import Any, Optional
+
+import numpy as np
+
+from surfsup.dto.forecast_dto import ForecastRecord
+
+# fixed column order and storage dtype of a flattened forecast
+FORECAST_SCHEMA: dict[str, str] = {
+    "name": "U",
+    "fetched_at": "f8",
+    "conditions": "U",
+    "wind_speed": "f4",
+    "wind_dir": "f4",
+    "wave_min": "f4",
+    "wave_max": "f4",
+    "wave_occ": "f4",
+    "swell_ht": "f4",
+    "swell_per": "f4",
+    "swell_dir": "f4",
+    "ptide_ht": "f4",
+    "ptide_ts": "f8",
+    "ctide_ht": "f4",
+    "ctide_ts": "f8",
+    "ntide_ht": "f4",
+    "ntide_ts": "f8",
+    "temp": "f4",
+    "water_low": "f4",
+    "water_high": "f4",
+}
+
+FORECAST_COLUMNS = list(FORECAST_SCHEMA.keys())
+
+
+def number_or_nan(val: Any) -> float:
+    try:
+        return float(val) if val is not None else math.nan
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _get(obj: Any, *path: str) -> Any:
+    for att in path:
+        if obj is None:
+            return None
+        obj = getattr(obj, att, None)
+    return obj
+
+
+def flatten_forecast(
+    name: str, fcst: ForecastRecord, fetched_at: float = math.nan
+) -> dict[str, Any]:
+    """One row of FORECAST_SCHEMA; missing parts of the forecast become NaN
+    (or "" for text) instead of raising.
+    """
+    swell = fcst.swells[0] if fcst.swells else None
+    tide = fcst.tide
+    conditions: Optional[str] = _get(fcst, "conditions", "value")
+    return {
+        "name": name,
+        "fetched_at": number_or_nan(fetched_at),
+        "conditions": conditions if conditions is not None else "",
+        "wind_speed": number_or_nan(_get(fcst, "wind", "speed")),
+        "wind_dir": number_or_nan(_get(fcst, "wind", "direction")),
+        "wave_min": number_or_nan(_get(fcst, "wave_height", "min")),
+        "wave_max": number_or_nan(_get(fcst, "wave_height", "max")),
+        "wave_occ": number_or_nan(_get(fcst, "wave_height", "occasional")),
+        "swell_ht": number_or_nan(_get(swell, "height")),
+        "swell_per": number_or_nan(_get(swell, "period")),
+        "swell_dir": number_or_nan(_get(swell, "direction")),
+        "ptide_ht": number_or_nan(_get(tide, "previous", "height")),
+        "ptide_ts": number_or_nan(_get(tide, "previous", "timestamp")),
+        "ctide_ht": number_or_nan(_get(tide, "current", "height")),
+        "ctide_ts": number_or_nan(_get(tide, "current", "timestamp")),
+        "ntide_ht": number_or_nan(_get(tide, "next", "height")),
+        "ntide_ts": number_or_nan(_get(tide, "next", "timestamp")),
+        "temp": number_or_nan(_get(fcst, "weather", "temperature")),
+        "water_low": number_or_nan(_get(fcst, "weather", "water_min")),
+        "water_high": number_or_nan(_get(fcst, "weather", "water_max")),
+    }
+
+
+def forecast_columns(rows: list[dict[str, Any]]) -> dict[str, np.ndarray]:
+    """Typed column arrays for flattened rows, in FORECAST_SCHEMA order."""
+    return {
+        col: np.array([row[col] for row in rows], dtype=dtype)
+        if dtype != "U"
+        else np.array([row[col] for row in rows], dtype=str)
+        for (col, dtype) in FORECAST_SCHEMA.items()
+    }
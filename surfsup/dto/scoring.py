@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+CONDITIONS_ORDER = [
+    None,
+    "FLAT",
+    "VERY_POOR",
+    "POOR",
+    "POOR_TO_FAIR",
+    "FAIR",
+    "FAIR_TO_GOOD",
+    "GOOD",
+    "GOOD_TO_EPIC",
+    "EPIC",
+]
+
+MAX_WIND_SPEED = 25
+
+
+def score_row(row, max_height: int) -> float:
+    """Score a single to_df row, one value at a time.
+
+    Reference for score_forecasts, which must rank spots the same way.
+    Unknown conditions score like missing ones.
+    """
+
+    def conditions_score(c):
+        idx = CONDITIONS_ORDER.index(c) if c in CONDITIONS_ORDER else 0
+        # returns a ratio (GOOD_TO_EPIC and EPIC deserver > 100% score)
+        return idx / (len(CONDITIONS_ORDER) - 2)
+
+    def height_score(s, max_height: int = 8):
+        if s > max_height + 2:
+            s = 0
+        return s / max_height
+
+    def wind_score(speed, dir, swell_dir):
+        # is offshore: check against swell direction
+        opp_wind = (dir + 180) % 360
+
+        wind_score = -abs(opp_wind - swell_dir) / 180
+        speed_score = min(max(0, speed), MAX_WIND_SPEED) / MAX_WIND_SPEED
+        if abs(wind_score) <= 0.5:
+            return wind_score + speed_score
+        else:
+            return wind_score - speed_score
+
+    scores = [
+        conditions_score(row["conditions"]),
+        height_score(row["wave_min"], max_height),
+        height_score(
+            row["wave_max"]
+            if row["wave_occ"] == None
+            else max(row["wave_max"], row["wave_occ"]),
+            max_height,
+        ),
+        wind_score(row["wind_speed"], row["wind_dir"], row["swell_dir"]),
+    ]
+    return sum(scores) / len(scores)
+
+
+def conditions_scores(conditions) -> np.ndarray:
+    # codes are -1 for missing or unknown conditions, which rank like None
+    codes = pd.Categorical(conditions, categories=CONDITIONS_ORDER[1:]).codes
+    return (codes.astype(np.float64) + 1) / (len(CONDITIONS_ORDER) - 2)
+
+
+def height_scores(heights: np.ndarray, max_height: int) -> np.ndarray:
+    return np.where(heights > max_height + 2, 0.0, heights) / max_height
+
+
+def wind_scores(
+    speed: np.ndarray, direction: np.ndarray, swell_dir: np.ndarray
+) -> np.ndarray:
+    opp_wind = (direction + 180) % 360
+    wind_score = -np.abs(opp_wind - swell_dir) / 180
+    speed_score = np.clip(speed, 0, MAX_WIND_SPEED) / MAX_WIND_SPEED
+    return np.where(
+        np.abs(wind_score) <= 0.5, wind_score + speed_score, wind_score - speed_score
+    )
+
+
+def score_forecasts(df: pd.DataFrame, max_height: int) -> np.ndarray:
+    """Score every to_df row at once; same result as score_row per row."""
+
+    def column(name: str) -> np.ndarray:
+        return pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=np.float64)
+
+    # an occasional height only counts when it is set
+    peak = np.fmax(column("wave_max"), column("wave_occ"))
+    scores = (
+        conditions_scores(df["conditions"])
+        + height_scores(column("wave_min"), max_height)
+        + height_scores(peak, max_height)
+        + wind_scores(column("wind_speed"), column("wind_dir"), column("swell_dir"))
+    )
+    return scores / 4
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest scores, best first, without a full sort.
+
+    Ties keep their original order and missing scores rank last.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    ranked = np.where(np.isnan(scores), -np.inf, scores)
+    candidates = np.argpartition(-ranked, k - 1)[:k]
+    # the partition may cut through a run of ties: pull in every tied value
+    threshold = ranked[candidates].min()
+    candidates = np.flatnonzero(ranked >= threshold)
+    order = np.lexsort((candidates, -ranked[candidates]))
+    return candidates[order][:k]
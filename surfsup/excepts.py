@@ -12,3 +12,19 @@ class InvalidSchemaException(Exception):
     """
 
     pass
+
+
+class ReadOnlyDatabaseException(Exception):
+    """
+    Database does not support writes.
+    """
+
+    pass
+
+
+class CircuitOpenError(Exception):
+    """
+    Upstream host is failing, requests to it are short-circuited.
+    """
+
+    pass
@@ -1,6 +1,8 @@
 from math import pi, cos, asin, sqrt
 from dataclasses import dataclass
 
+import numpy as np
+
 
 @dataclass
 class Location:
@@ -29,3 +31,21 @@ def distance_miles(location1: Location, location2: Location) -> float:
     return _distance_miles(
         location1.latitude, location1.longitude, location2.latitude, location2.longitude
     )
+
+
+def distance_miles_array(
+    location: Location, latitudes: np.ndarray, longitudes: np.ndarray
+) -> np.ndarray:
+    """Vectorized _distance_miles from location to every (latitude, longitude)."""
+    p = pi / 180.0
+    lat1, lon1 = location.latitude, location.longitude
+    a = (
+        0.5
+        - np.cos((latitudes - lat1) * p) / 2
+        + cos(lat1 * p)
+        * np.cos(latitudes * p)
+        * (1 - np.cos((longitudes - lon1) * p))
+        / 2
+    )
+
+    return 3958 * 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
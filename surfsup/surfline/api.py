@@ -1,26 +1,151 @@
+import asyncio
 import json
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlsplit
 
-from requests_html import HTMLResponse, HTMLSession
+import aiohttp
+import requests
+from requests_html import HTML, HTMLResponse, HTMLSession
+from surfsup.excepts import CircuitOpenError
 from surfsup.login_info import LoginInfo
-from surfsup.surfline.database import SurflineSpotDB
-from cachetools import cached, TTLCache
+from surfsup.surfline.cache_store import CacheStore
+from surfsup.surfline.backends import SpotDB, open_spot_db
+from surfsup.surfline.forecast_cache import ForecastCache
+from surfsup.surfline.hedging import Hedger
+from surfsup.surfline.prefetcher import Prefetcher
+from surfsup.surfline.rate_limit import AdaptiveLimiter, shared_limiter
+from surfsup.surfline.report_extract import extract_report_data
+from surfsup.surfline.resilience import Resilience, shared_resilience
+from surfsup.surfline.session_pool import SessionPool
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Whether a failed request may succeed when tried again: throttling,
+    server errors, timeouts and dropped connections.
+    """
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        status = exc.response.status_code
+    elif isinstance(exc, aiohttp.ClientResponseError):
+        status = exc.status
+    else:
+        return isinstance(
+            exc, (requests.ConnectionError, requests.Timeout, aiohttp.ClientError)
+        ) or isinstance(exc, asyncio.TimeoutError)
+    return status == 429 or status >= 500
 
 
 class SurflineAPI:
-    session: HTMLSession
-    database: SurflineSpotDB
+    sessions: SessionPool
+    database: SpotDB
+    cache: ForecastCache
+    cache_store: Optional[CacheStore]
+    prefetcher: Optional[Prefetcher]
+    limiter: AdaptiveLimiter
+    resilience: Resilience
+    hedger: Optional[Hedger]
+    timeout: tuple[float, float]
+
+    def __init__(
+        self,
+        db_name: str,
+        cache: Optional[ForecastCache] = None,
+        cache_path: Optional[str] = None,
+        limiter: Optional[AdaptiveLimiter] = None,
+        resilience: Optional[Resilience] = None,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 10,
+        hedger: Optional[Hedger] = None,
+        pool_size: Optional[int] = None,
+    ):
+        """Create a surlfine with a connected database.
+
+        The database backend is picked from the db_name extension, see
+        open_spot_db.
 
-    def __init__(self, db_name: str):
-        """Create a surlfine with a connected database."""
-        self.database = SurflineSpotDB(db_name)
-        self.session = HTMLSession()
+        When cache_path is given the forecast cache is warmed from it, call
+        checkpoint on shutdown to write it back.
+
+        Every request to Surfline goes through limiter, by default the one
+        shared by every SurflineAPI in this process. The bot, the collector
+        and the crawler run as separate processes, so each adapts on its
+        own. Failed requests are retried with backoff under resilience,
+        also shared within the process by default, whose circuit breaker
+        stops calling Surfline while it is down.
+
+        A request gives up after connect_timeout seconds without a
+        connection or read_timeout seconds without data, and is then
+        retried like any other connection error. With a hedger, spot
+        requests slower than the recent p95 are hedged; the limiter is
+        acquired once around both, and a hedge spends a token of its
+        budget.
+
+        Requests are sent from a pool of sessions holding up to pool_size
+        keep-alive connections, by default as many as the limiter lets run
+        at once.
+        """
+        self.database = open_spot_db(db_name)
+        self.cache = cache if cache is not None else ForecastCache()
+        self.cache_store = None
+        self.prefetcher = None
+        self.limiter = limiter if limiter is not None else shared_limiter()
+        self.resilience = resilience if resilience is not None else shared_resilience()
+        self.timeout = (connect_timeout, read_timeout)
+        self.hedger = hedger
+        self.sessions = SessionPool(
+            pool_size if pool_size is not None else int(self.limiter.max_limit),
+            factory=HTMLSession,
+        )
+        # HTML makes a session of its own when given none; parsing sends no
+        # request, so it gets one kept outside the pool
+        self.dom_session = HTMLSession()
+        # username -> (expires at, token) of authenticate_user
+        self.tokens: dict[str, tuple[float, dict]] = {}
+        self.tokens_lck = threading.Lock()
+        if cache_path is not None:
+            self.cache_store = CacheStore(cache_path)
+            self.cache.restore(self.cache_store.load())
 
     def __del__(self):
         """Close all connections to Surfline."""
-        self.session.close()
+        # __init__ may have failed before the sessions were made
+        if hasattr(self, "sessions"):
+            self.sessions.close()
+        if hasattr(self, "dom_session"):
+            self.dom_session.close()
+
+    def start_prefetcher(self, **kwargs) -> Prefetcher:
+        """Keep the most requested spots warm in the background.
+
+        kwargs are passed on to Prefetcher (hot_spots, lead_time,
+        requests_per_minute, ...).
+        """
+        if self.prefetcher is None:
+            self.prefetcher = Prefetcher(self.cache, self._fetch_spot, **kwargs)
+            self.prefetcher.start()
+        return self.prefetcher
+
+    def stop_prefetcher(self) -> None:
+        if self.prefetcher is not None:
+            self.prefetcher.stop()
+            self.prefetcher = None
+
+    def checkpoint(self) -> None:
+        """Write the servable forecast cache entries to the cache store."""
+        if self.cache_store is not None:
+            self.cache_store.save(self.cache.snapshot())
 
     def authenticate_user(self, login: LoginInfo):
-        """Authenticate the Surfline connection with a premium login."""
+        """Authenticate the Surfline connection with a premium login.
+
+        The token is cached until it expires and sent by every pooled session.
+        """
+        with self.tokens_lck:
+            cached = self.tokens.get(login.username)
+            if cached is not None and cached[0] > time.time():
+                return cached[1]
+
         url_path = "https://services.surfline.com/trusted/token?isShortLived=false"
         payload = {
             "grant_type": "password",
@@ -32,13 +157,23 @@ class SurflineAPI:
             "authorizationString": "Basic NWM1OWU3YzNmMGI2Y2IxYWQwMmJhZjY2OnNrX1FxWEpkbjZOeTVzTVJ1MjdBbWcz",
         }
 
-        resp = self.session.post(url_path, data=payload)
+        with self.sessions.session() as session:
+            resp = session.post(url_path, data=payload)
         assert resp.status_code == 200
 
-        return json.loads(resp.text)
+        token = json.loads(resp.text)
+        with self.tokens_lck:
+            expires_at = time.time() + token.get("expires_in", 0)
+            self.tokens[login.username] = (expires_at, token)
+        if "access_token" in token:
+            token_type = token.get("token_type", "Bearer")
+            self.sessions.set_header(
+                "Authorization", f"{token_type} {token['access_token']}"
+            )
+        return token
 
     def valid_name(self, name: str) -> bool:
-        return name in self.get_spot_names()
+        return self.database.contains(name)
 
     def validate_names(self, names: list[str]):
         """Check if the names list of spot names are valid"""
@@ -50,25 +185,135 @@ class SurflineAPI:
         return True
 
     def get_spot_names(self) -> list[str]:
-        return list(self.database.table["name"])
+        return self.database.names()
 
     def _build_spot_url(self, spot_name: str) -> str:
         spot_record = self.database.select(spot_name, by_att="name")
         return spot_record.url
 
-    @cached(cache=TTLCache(maxsize=1024, ttl=60 * 5))
     def spot_check(self, name: str) -> dict:
+        """Report of spot name, served from cache, however old, while the circuit
+        to Surfline is open.
+        """
+        if self.prefetcher is not None:
+            self.prefetcher.record_access(name)
+        try:
+            return self.cache.get(name, lambda: self._fetch_spot(name))
+        except CircuitOpenError as exc:
+            return self._serve_stale(name, exc)
+
+    def refresh_spot(self, name: str) -> dict:
+        """Fetch name from Surfline even if it is cached, updating the cache."""
+        return self.cache.refresh(name, lambda: self._fetch_spot(name))
+
+    def _serve_stale(self, name: str, exc: CircuitOpenError) -> dict:
+        spot_data = self.cache.last_value(name)
+        if spot_data is None:
+            raise exc
+        self.resilience.count("served_stale")
+        return spot_data
+
+    def _fetch_spot(self, name: str) -> dict:
         spot_url = self._build_spot_url(name)
-        resp: HTMLResponse = self.session.get(spot_url)
-        i = 0
-        while not resp.ok and i < 10:
-            resp: HTMLResponse = self.session.get(spot_url)
-            i += 1
+
+        resp: HTMLResponse = self.resilience.call(
+            urlsplit(spot_url).netloc,
+            lambda: self._limited_get(spot_url),
+            is_retryable,
+        )
         spot_data = self.format_report_response_data(resp)
         return spot_data
 
+    def _limited_get(self, url: str) -> HTMLResponse:
+        started = self.limiter.acquire()
+        status = None
+        try:
+            if self.hedger is not None:
+                resp = self.hedger.run(lambda: self._get(url), self._admit_hedge)
+            else:
+                resp = self._get(url)
+            status = resp.status_code
+        except requests.HTTPError as exc:
+            status = exc.response.status_code
+            raise
+        finally:
+            self.limiter.release(started, status)
+        return resp
+
+    def _get(self, url: str) -> HTMLResponse:
+        with self.sessions.session() as session:
+            resp = session.get(url, timeout=self.timeout)
+        if not resp.ok:
+            raise requests.HTTPError(f"status {resp.status_code}", response=resp)
+        return resp
+
+    def _admit_hedge(self) -> bool:
+        """Take a token of the limiter's budget for a hedge, False when there is none."""
+        bucket = self.limiter.bucket
+        return bucket is None or bucket.try_acquire()
+
+    def async_session(self, max_connections: int = 64) -> aiohttp.ClientSession:
+        """Create an asyncio session whose connection pool holds at most max_connections."""
+        connector = aiohttp.TCPConnector(
+            limit=max_connections, limit_per_host=max_connections
+        )
+        return aiohttp.ClientSession(
+            connector=connector, headers=dict(self.sessions.headers)
+        )
+
+    async def async_spot_check(self, session: aiohttp.ClientSession, name: str) -> dict:
+        """Asyncio counterpart of spot_check, sharing the caller's connection pool."""
+        if self.prefetcher is not None:
+            self.prefetcher.record_access(name)
+        try:
+            return await self.cache.aget(name, lambda: self._afetch_spot(session, name))
+        except CircuitOpenError as exc:
+            return self._serve_stale(name, exc)
+
+    async def _afetch_spot(self, session: aiohttp.ClientSession, name: str) -> dict:
+        spot_url = self._build_spot_url(name)
+        timeout = aiohttp.ClientTimeout(
+            sock_connect=self.timeout[0], sock_read=self.timeout[1]
+        )
+
+        async def get() -> tuple[int, bytes]:
+            async with session.get(spot_url, timeout=timeout) as resp:
+                resp.raise_for_status()
+                return (resp.status, await resp.read())
+
+        async def attempt() -> bytes:
+            started = await self.limiter.aacquire()
+            status = None
+            try:
+                if self.hedger is not None:
+                    (status, content) = await self.hedger.arun(get, self._admit_hedge)
+                else:
+                    (status, content) = await get()
+            except aiohttp.ClientResponseError as exc:
+                status = exc.status
+                raise
+            finally:
+                self.limiter.release(started, status)
+            return content
+
+        content = await self.resilience.acall(
+            urlsplit(spot_url).netloc, attempt, is_retryable
+        )
+        return self.format_report_content(content)
+
     def format_report_response_data(self, resp: HTMLResponse) -> dict:
-        scripts = resp.html.element("script")
+        return self.format_report_content(resp.content)
+
+    def format_report_content(self, content: bytes) -> dict:
+        spot_data = extract_report_data(content)
+        if spot_data is not None:
+            return spot_data
+
+        # the page layout changed: fall back to searching the full DOM
+        return self.format_report_html(HTML(session=self.dom_session, html=content))
+
+    def format_report_html(self, html: HTML) -> dict:
+        scripts = html.element("script")
         # with open("data/making_resp.html", "w+") as f:
         #     f.write(resp.text)
 
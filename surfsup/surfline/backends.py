@@ -0,0 +1,47 @@
+from os.path import splitext
+from typing import Union
+
+from surfsup.surfline.database import SurflineSpotDB
+from surfsup.surfline.spot_catalogue import SpotCatalogue, write_catalogue
+from surfsup.surfline.sqlite_spot_db import SQLiteSpotDB
+
+SQLITE_EXTENSIONS = [".db", ".sqlite", ".sqlite3"]
+CATALOGUE_EXTENSION = ".spotcat"
+
+SpotDB = Union[SurflineSpotDB, SQLiteSpotDB, SpotCatalogue]
+
+
+def open_spot_db(db_name: str) -> SpotDB:
+    """Open the spot catalogue with the backend matching its file extension.
+
+    SQLite files use SQLiteSpotDB, compiled .spotcat files the read-only
+    SpotCatalogue and anything else the CSV SurflineSpotDB.
+    """
+    extension = splitext(db_name)[1].lower()
+    if extension in SQLITE_EXTENSIONS:
+        return SQLiteSpotDB(db_name)
+    if extension == CATALOGUE_EXTENSION:
+        return SpotCatalogue(db_name)
+    return SurflineSpotDB(db_name)
+
+
+def migrate_to_sqlite(csv_name: str, sqlite_name: str) -> int:
+    """Copy a CSV spot catalogue into a SQLite one, returning the rows copied.
+
+    The SQLite catalogue must not hold any spots yet.
+    """
+    source = SurflineSpotDB(csv_name)
+    target = SQLiteSpotDB(sqlite_name)
+    try:
+        if len(target) > 0:
+            raise ValueError(f"{sqlite_name} already holds {len(target)} spots")
+        records = source.records()
+        target.bulk_add(records)
+        return len(records)
+    finally:
+        target.close()
+
+
+def compile_catalogue(db_name: str, catalogue_name: str) -> int:
+    """Compile any spot catalogue into a SpotCatalogue file."""
+    return write_catalogue(catalogue_name, open_spot_db(db_name).records())
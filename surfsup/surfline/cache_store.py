@@ -0,0 +1,36 @@
+import json
+import sqlite3
+from contextlib import closing
+
+
+class CacheStore:
+    """SQLite checkpoint of the spot reports held by a ForecastCache.
+
+    Each row keeps the report payload spot_check returned, from which the
+    ForecastRecords are parsed, along with the time it was fetched so the
+    cache TTLs still apply after a restart.
+    """
+
+    path: str
+
+    def __init__(self, path: str):
+        self.path = path
+        with closing(sqlite3.connect(self.path)) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS forecasts ("
+                + "spot TEXT PRIMARY KEY, fetched_at REAL NOT NULL, data TEXT NOT NULL)"
+            )
+
+    def load(self) -> list[tuple[str, dict, float]]:
+        with closing(sqlite3.connect(self.path)) as conn:
+            rows = conn.execute("SELECT spot, data, fetched_at FROM forecasts")
+            return [(spot, json.loads(data), at) for (spot, data, at) in rows]
+
+    def save(self, entries: list[tuple[str, dict, float]]) -> None:
+        """Replace the stored reports with entries in a single transaction."""
+        rows = [(spot, at, json.dumps(data)) for (spot, data, at) in entries]
+        with closing(sqlite3.connect(self.path)) as conn, conn:
+            conn.execute("DELETE FROM forecasts")
+            conn.executemany(
+                "INSERT INTO forecasts (spot, fetched_at, data) VALUES (?, ?, ?)", rows
+            )
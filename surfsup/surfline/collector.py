@@ -0,0 +1,219 @@
+import random
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from surfsup.dto.forecast_history import ForecastHistory, utc_day
+from surfsup.dto.forecast_parser import parse_forecast_info
+from surfsup.dto.forecast_schema import flatten_forecast
+from surfsup.surfline.forecast_cache import ForecastCache
+from surfsup.surfline.rate_limit import TokenBucket
+
+
+@dataclass
+class CycleStats:
+    """Outcome of one collection cycle; lag is how late requests started
+    compared to their slot in the schedule.
+    """
+
+    started_at: float
+    spots: int = 0
+    planned: int = 0
+    fetched: int = 0
+    from_cache: int = 0
+    skipped_fresh: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+    total_lag: float = 0.0
+    max_lag: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Spots fetched per minute over the cycle."""
+        return 60.0 * self.fetched / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def mean_lag(self) -> float:
+        attempts = self.fetched + self.failed
+        return self.total_lag / attempts if attempts > 0 else 0.0
+
+    def record_lag(self, lag: float) -> None:
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+
+
+class Collector:
+    """Long running collection of every spot's forecast into a ForecastHistory.
+
+    Each cycle the spots collected less than max_age seconds ago are
+    skipped, and spots with a fresh entry in cache are stored without a
+    request. The remaining requests are spaced evenly over interval, each
+    shifted by up to jitter of its slot, stalest spot first. budget is the
+    bucket fetch draws its tokens from, usually the limiter's of the
+    SurflineAPI: each request waits until it holds a token, so the cycle
+    stretches instead of queueing behind other requests when the budget
+    cannot cover it. Rows are written to history every flush_every spots.
+    """
+
+    interval: float
+    max_age: float
+    jitter: float
+    budget: Optional[TokenBucket]
+    history: ForecastHistory
+    last_stats: Optional[CycleStats]
+
+    def __init__(
+        self,
+        fetch: Callable[[str], dict],
+        names: Callable[[], list[str]],
+        history: ForecastHistory,
+        cache: Optional[ForecastCache] = None,
+        interval: float = 60 * 30,
+        max_age: Optional[float] = None,
+        budget: Optional[TokenBucket] = None,
+        jitter: float = 0.5,
+        flush_every: int = 100,
+        clock: Callable[[], float] = time.time,
+        sleep: Optional[Callable[[float], Any]] = None,
+        rng: Optional[random.Random] = None,
+        verbose: int = 0,
+    ):
+        self.fetch = fetch
+        self.names = names
+        self.history = history
+        self.cache = cache
+        self.interval = interval
+        self.max_age = max_age if max_age is not None else interval / 2
+        self.budget = budget
+        self.jitter = jitter
+        self.flush_every = flush_every
+        self.clock = clock
+        self.stopped = threading.Event()
+        self.sleep = sleep if sleep is not None else self.stopped.wait
+        self.rng = rng if rng is not None else random.Random()
+        self.verbose = verbose
+        self.last_stats = None
+        self.thread: Optional[threading.Thread] = None
+        self.compacted: set = set()
+        self.last_collected = self._recently_collected()
+
+    def run_cycle(self) -> CycleStats:
+        """Collect every spot once, returning the stats of the cycle."""
+        stats = CycleStats(self.clock())
+        rows: list[dict] = []
+        due = []
+        for name in self.names():
+            stats.spots += 1
+            if stats.started_at - self.last_collected.get(name, -1e18) < self.max_age:
+                stats.skipped_fresh += 1
+                continue
+            cached = self.cache.fresh(name) if self.cache is not None else None
+            if cached is not None and self._collect(name, cached, rows):
+                stats.from_cache += 1
+            else:
+                due.append(name)
+
+        due.sort(key=lambda n: self.last_collected.get(n, -1e18))
+        stats.planned = len(due)
+        slot = self.interval / max(1, len(due))
+        for (i, name) in enumerate(due):
+            if self.stopped.is_set():
+                break
+            target = stats.started_at + (i + self.jitter * self.rng.random()) * slot
+            self._wait_until(target)
+            if not self._wait_for_budget():
+                break
+            stats.record_lag(max(0.0, self.clock() - target))
+
+            try:
+                collected = self._collect(name, self.fetch(name), rows)
+            except Exception:
+                collected = False
+                print(traceback.format_exc(limit=1)) if self.verbose > 0 else None
+            if collected:
+                stats.fetched += 1
+            else:
+                stats.failed += 1
+            if len(rows) >= self.flush_every:
+                self.history.append_rows(rows)
+                rows = []
+
+        self.history.append_rows(rows)
+        self._compact_past_days()
+        stats.elapsed = self.clock() - stats.started_at
+        self.last_stats = stats
+        print(
+            f"cycle: {stats.fetched}/{stats.planned} fetched, {stats.from_cache} cached, "
+            + f"{stats.skipped_fresh} fresh, {stats.failed} failed in {stats.elapsed:.0f}s "
+            + f"({stats.throughput:.1f}/min) -- lag mean {stats.mean_lag:.1f}s max {stats.max_lag:.1f}s"
+        ) if self.verbose > 0 else None
+        return stats
+
+    def run(self, cycles: Optional[int] = None) -> None:
+        """Run cycles every interval seconds until stopped, or cycles times."""
+        done = 0
+        while not self.stopped.is_set() and (cycles is None or done < cycles):
+            stats = self.run_cycle()
+            done += 1
+            # an overrunning cycle is followed immediately by the next one
+            remaining = stats.started_at + self.interval - self.clock()
+            if remaining > 0 and (cycles is None or done < cycles):
+                self.sleep(remaining)
+
+    def start(self) -> None:
+        if self.thread is not None:
+            return None
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name="Collector", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def _collect(self, name: str, spot_data: dict, rows: list[dict]) -> bool:
+        if not spot_data:
+            return False
+        fetched_at = self.clock()
+        try:
+            fcst = parse_forecast_info(spot_data["forecast"])
+        except Exception:
+            print(traceback.format_exc(limit=1)) if self.verbose > 0 else None
+            return False
+        rows.append(flatten_forecast(name, fcst, fetched_at))
+        self.last_collected[name] = fetched_at
+        return True
+
+    def _wait_for_budget(self) -> bool:
+        """Wait until budget holds a token for fetch, False when stopped first."""
+        while not self.stopped.is_set():
+            wait = self.budget.wait_time() if self.budget is not None else 0.0
+            if wait <= 0:
+                return True
+            self.sleep(wait)
+        return False
+
+    def _wait_until(self, target: float) -> None:
+        while not self.stopped.is_set():
+            remaining = target - self.clock()
+            if remaining <= 0:
+                return None
+            self.sleep(remaining)
+
+    def _recently_collected(self) -> dict[str, float]:
+        """When each spot was last stored, so a restart does not refetch everything."""
+        since = utc_day(self.clock() - self.max_age)
+        df = self.history.read(start=since, columns=["name", "fetched_at"])
+        return df.groupby("name")["fetched_at"].max().to_dict() if len(df) > 0 else {}
+
+    def _compact_past_days(self) -> None:
+        # rows are flushed by now, so earlier days receive no more parts
+        today = utc_day(self.clock())
+        for day in self.history.days():
+            if day < today and day not in self.compacted:
+                self.history.compact(day)
+                self.compacted.add(day)
@@ -0,0 +1,301 @@
+import hashlib
+import json
+import os
+import time
+import traceback
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from os.path import exists
+from typing import Callable, Optional
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+import requests
+from bs4 import BeautifulSoup
+
+from surfsup.surfline.page_store import PageMeta, PageStore
+from surfsup.surfline.rate_limit import AdaptiveLimiter, HostThrottle
+from surfsup.surfline.session_pool import SessionPool
+
+DEFAULT_BASE_URL = "https://www.surfline.com"
+
+
+def canonicalize_url(href: str, base: str = DEFAULT_BASE_URL) -> Optional[str]:
+    """Absolute form of href used to deduplicate the crawl, None if not http(s).
+
+    Scheme and host are lower-cased, default ports, query strings,
+    fragments and trailing slashes are dropped.
+    """
+    parts = urlsplit(urljoin(base, href.strip()))
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not parts.hostname:
+        return None
+
+    host = parts.hostname.lower()
+    if parts.port is not None and parts.port != {"http": 80, "https": 443}[scheme]:
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((scheme, host, path, "", ""))
+
+
+def gather_links(content: bytes, base: str) -> list[str]:
+    """Every href on the page, canonicalized against base."""
+    if len(content) == 0:
+        return []
+    soup = BeautifulSoup(content, "html.parser")
+    links = [canonicalize_url(a["href"], base) for a in soup.find_all("a", href=True)]
+    return [link for link in links if link is not None]
+
+
+@dataclass
+class Page:
+    url: str
+    status: int
+    content: bytes
+    headers: dict[str, str] = field(default_factory=dict)
+
+    def header(self, name: str) -> Optional[str]:
+        for (key, val) in self.headers.items():
+            if key.lower() == name.lower():
+                return val
+        return None
+
+
+@dataclass
+class CrawlState:
+    """Everything needed to resume a crawl: pages still to visit, every url
+    ever queued, urls that failed and counts of the pages handled.
+    """
+
+    frontier: deque = field(default_factory=deque)
+    seen: set = field(default_factory=set)
+    errors: list[str] = field(default_factory=list)
+    reports: int = 0
+    pages: int = 0
+    unchanged: int = 0
+
+    def enqueue(self, url: str) -> bool:
+        if url in self.seen:
+            return False
+        self.seen.add(url)
+        self.frontier.append(url)
+        return True
+
+    def save(self, path: str) -> None:
+        state = {
+            "frontier": list(self.frontier),
+            "seen": sorted(self.seen),
+            "errors": self.errors,
+            "reports": self.reports,
+            "pages": self.pages,
+            "unchanged": self.unchanged,
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as fout:
+            json.dump(state, fout)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path) as fin:
+            state = json.load(fin)
+        return cls(
+            frontier=deque(state["frontier"]),
+            seen=set(state["seen"]),
+            errors=state["errors"],
+            reports=state["reports"],
+            pages=state["pages"],
+            unchanged=state.get("unchanged", 0),
+        )
+
+
+class Crawler:
+    """Concurrent, resumable breadth-first crawl.
+
+    Up to max_workers pages are fetched at once, subject to the per-host
+    HostThrottle. Every page is fetched exactly once: its content is handed
+    to on_report when is_report matches its url, and its links are queued
+    when follow accepts them. The state is checkpointed to checkpoint_path
+    every checkpoint_every pages, so an interrupted crawl resumes where it
+    stopped instead of starting over.
+
+    With a page_store every page's validators, content hash and links are
+    recorded. An incremental crawl then sends conditional requests, and a
+    page answering 304 or with the same content hash is neither parsed nor
+    passed to on_report; its stored links are followed instead.
+
+    A limiter shared with SurflineAPI keeps the crawl within the same
+    adaptive concurrency and request budget as every other caller, and
+    its sessions let the crawl reuse the same keep-alive connections. By
+    default the crawler has a SessionPool of its own with a session per
+    worker.
+    """
+
+    state: CrawlState
+    checkpoint_path: Optional[str]
+
+    def __init__(
+        self,
+        is_report: Callable[[str], bool],
+        follow: Callable[[str], bool],
+        on_report: Callable[[Page], None],
+        fetch: Optional[Callable[[str, dict[str, str]], Page]] = None,
+        state: Optional[CrawlState] = None,
+        checkpoint_path: Optional[str] = None,
+        checkpoint_every: int = 100,
+        max_workers: int = 8,
+        max_per_host: int = 4,
+        delay: float = 0.25,
+        page_store: Optional[PageStore] = None,
+        incremental: bool = False,
+        limiter: Optional[AdaptiveLimiter] = None,
+        sessions: Optional[SessionPool] = None,
+        verbose: int = 0,
+    ):
+        self.is_report = is_report
+        self.follow = follow
+        self.on_report = on_report
+        self.fetch = fetch if fetch is not None else self.http_fetch
+        self.state = state if state is not None else CrawlState()
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.max_workers = max_workers
+        self.throttle = HostThrottle(delay, max_per_host)
+        self.page_store = page_store
+        self.incremental = incremental
+        self.limiter = limiter
+        self.verbose = verbose
+        self.sessions = (
+            sessions
+            if sessions is not None
+            else SessionPool(max_workers, factory=requests.Session)
+        )
+
+    @classmethod
+    def resume(cls, checkpoint_path: str, **kwargs):
+        """Crawler continuing from checkpoint_path when it exists."""
+        state = CrawlState.load(checkpoint_path) if exists(checkpoint_path) else None
+        return cls(state=state, checkpoint_path=checkpoint_path, **kwargs)
+
+    def run(self, max_pages: Optional[int] = None) -> CrawlState:
+        """Crawl until the frontier is empty or max_pages more pages are handled."""
+        budget = max_pages if max_pages is not None else float("inf")
+        in_flight: dict[Future, str] = {}
+        handled = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while len(in_flight) > 0 or (
+                len(self.state.frontier) > 0 and handled < budget
+            ):
+                while (
+                    len(self.state.frontier) > 0
+                    and len(in_flight) < self.max_workers
+                    and handled + len(in_flight) < budget
+                ):
+                    url = self.state.frontier.popleft()
+                    in_flight[executor.submit(self._polite_fetch, url)] = url
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._handle(in_flight.pop(future), future)
+                    handled += 1
+                    if handled % self.checkpoint_every == 0:
+                        self.checkpoint(in_flight.values())
+
+        self.checkpoint()
+        return self.state
+
+    def checkpoint(self, in_flight=()) -> None:
+        if self.checkpoint_path is None:
+            return None
+        # pages still being fetched are put back so a resumed crawl redoes them
+        pending = list(in_flight)
+        self.state.frontier.extendleft(reversed(pending))
+        try:
+            self.state.save(self.checkpoint_path)
+        finally:
+            for _ in pending:
+                self.state.frontier.popleft()
+
+    def http_fetch(self, url: str, headers: dict[str, str]) -> Page:
+        with self.sessions.session() as session:
+            resp = session.get(url, headers=headers, timeout=30)
+        return Page(url, resp.status_code, resp.content, dict(resp.headers))
+
+    def _polite_fetch(self, url: str) -> Page:
+        headers = {}
+        meta = self._stored(url)
+        if meta is not None:
+            if meta.etag is not None:
+                headers["If-None-Match"] = meta.etag
+            if meta.last_modified is not None:
+                headers["If-Modified-Since"] = meta.last_modified
+
+        host = urlsplit(url).netloc
+        self.throttle.acquire(host)
+        started = self.limiter.acquire() if self.limiter is not None else None
+        status = None
+        try:
+            page = self.fetch(url, headers)
+            status = page.status
+            return page
+        finally:
+            if started is not None:
+                self.limiter.release(started, status)
+            self.throttle.release(host)
+
+    def _stored(self, url: str) -> Optional[PageMeta]:
+        if self.page_store is None or not self.incremental:
+            return None
+        return self.page_store.get(url)
+
+    def _handle(self, url: str, future: Future) -> None:
+        self.state.pages += 1
+        try:
+            page = future.result()
+            meta = self._stored(url)
+            if page.status == 304 and meta is not None:
+                links = meta.links
+                self.state.unchanged += 1
+            elif page.status != 200:
+                raise ValueError(f"status {page.status}")
+            else:
+                links = self._parse(url, page, meta)
+            for link in links:
+                if self.follow(link):
+                    self.state.enqueue(link)
+        except Exception:
+            print(f"Exception caught: {url}")
+            print(traceback.format_exc(limit=1)) if self.verbose > 0 else None
+            self.state.errors.append(url)
+
+        if self.verbose > 0:
+            print(
+                f"unchanged: {self.state.unchanged}; "
+                + f"frontier at: {len(self.state.frontier)}; "
+                + f"seen: {len(self.state.seen)}; "
+                + f"report-hits: {self.state.reports}"
+            )
+
+    def _parse(self, url: str, page: Page, meta: Optional[PageMeta]) -> list[str]:
+        content_hash = hashlib.sha256(page.content).hexdigest()
+        if meta is not None and meta.content_hash == content_hash:
+            # the server ignored the validators but the page is the same
+            self.state.unchanged += 1
+            return meta.links
+
+        links = gather_links(page.content, url)
+        if self.is_report(url):
+            self.on_report(page)
+            self.state.reports += 1
+        if self.page_store is not None:
+            self.page_store.put(
+                PageMeta(
+                    url,
+                    page.header("ETag"),
+                    page.header("Last-Modified"),
+                    content_hash,
+                    links,
+                    time.time(),
+                )
+            )
+        return links
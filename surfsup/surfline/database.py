@@ -1,10 +1,20 @@
+import csv
+import os
+import threading
+from contextlib import contextmanager
 from dataclasses import asdict, dataclass
 from os.path import exists
+from typing import Iterable, Optional
 
 from surfsup.excepts import InvalidSchemaException
+from surfsup.maps import Location
+from surfsup.surfline.spatial import SpatialIndex
 
 import pandas as pd
 
+# columns with a maintained value -> row position index
+INDEXED_FIELDS = ("name", "spot_id", "url")
+
 
 @dataclass
 class SpotRecord:
@@ -36,39 +46,255 @@ class SpotRecord:
 
 
 class SurflineSpotDB:
+    """Spot catalogue kept in a CSV file plus an append-only journal.
+
+    Writes append one line per record to <name>.journal instead of
+    rewriting the CSV; flush() compacts the journal into the main file.
+    That also happens automatically once the journal holds compact_every
+    ops and at least half as many ops as the table has rows.
+    Loading replays the journal on top of the CSV. Replay is idempotent, so
+    a crash between compacting and removing the journal loses nothing.
+    """
+
     name: str
-    table: pd.DataFrame
+    compact_every: int
 
-    def __init__(self, database_fname: str):
+    def __init__(self, database_fname: str, compact_every: int = 1000):
         self.name = database_fname
+        self.compact_every = compact_every
+        self._spatial: Optional[SpatialIndex] = None
+        self._indexes: dict[str, dict] = {}
+        self._indexed_rows = -1
+        self._lck = threading.RLock()
+        self._pending: list[dict] = []
+        self._uncommitted: list[list] = []
+        self._journaled = 0
+        self._depth = 0
+        self._snapshot: Optional[tuple] = None
         if exists(database_fname):
             self.table = pd.read_csv(
                 database_fname, sep=",", index_col=False, on_bad_lines="skip"
             )  # type: ignore
             if sorted(list(self.table.columns)) != SpotRecord.fields():
                 raise InvalidSchemaException
+            self.__replay()
+            self.spatial_index()
         else:
             self.table = pd.DataFrame(columns=SpotRecord.fields())
+            self.__replay()
             self.flush()
 
+    @property
+    def table(self) -> pd.DataFrame:
+        # rows added since the last read are merged with a single concat
+        if len(self._pending) > 0:
+            with self._lck:
+                if len(self._pending) > 0:
+                    added = pd.DataFrame(self._pending, columns=self._table.columns)
+                    self._table = pd.concat([self._table, added], ignore_index=True)
+                    self._pending = []
+        return self._table
+
+    @table.setter
+    def table(self, table: pd.DataFrame) -> None:
+        self._table = table
+        self._pending = []
+        self._indexed_rows = -1
+        self._spatial = None
+
+    @property
+    def journal_name(self) -> str:
+        return self.name + ".journal"
+
+    def __len__(self) -> int:
+        return len(self._table) + len(self._pending)
+
     def add_record(self, record: SpotRecord) -> None:
-        self.table = self.table.append(asdict(record), ignore_index=True)
+        self.bulk_add([record])
 
-        self.flush()
+    def bulk_add(self, records: Iterable[SpotRecord]) -> None:
+        """Add many records with a single journal write.
 
-    def del_record(self, record: SpotRecord) -> None:
-        idx = self.__get_idx(record.name)
-        self.table.drop([idx], inplace=True)
+        A record whose url is already in the catalogue is skipped, the same
+        rule replaying the journal applies, so a catalogue rebuilt from the
+        journal matches the one that wrote it.
+        """
+        with self.transaction():
+            for record in records:
+                if self.contains(record.url, by_att="url"):
+                    continue
+                self.__append(record)
+                self._uncommitted.append(["+"] + self.__row(record))
 
-        self.flush()
+    def del_record(self, record: SpotRecord, by_att: str = "name") -> None:
+        """Delete the first row whose by_att matches record's; names are not
+        unique, so delete by url to be sure of the row.
+        """
+        with self.transaction():
+            self.__remove(self.__get_idx(getattr(record, by_att), by_att))
+            # "-" alone is a delete by name, as journals before by_att have it
+            op = "-" if by_att == "name" else f"-{by_att}"
+            self._uncommitted.append([op] + self.__row(record))
+
+    @contextmanager
+    def transaction(self):
+        """Group writes into one journal append, undone if the block raises.
+
+        Transactions nest; only the outermost one writes.
+        """
+        if self._depth == 0:
+            # rows are only ever appended to _pending, so its length is enough
+            self._snapshot = (self._table, self._pending, len(self._pending))
+        self._depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._depth -= 1
+            if self._depth == 0:
+                table, pending, npending = self._snapshot
+                self.table = table
+                self._pending = pending[:npending]
+                self._uncommitted = []
+            raise
+        else:
+            self._depth -= 1
+            if self._depth == 0:
+                self.__commit()
 
     def select(self, val, by_att: str = "name") -> SpotRecord:
-        row_idx = self.__get_idx(val, by_att)
-        rec_dict = self.table.iloc[row_idx].to_dict()
-        return SpotRecord.from_dict(rec_dict)
+        return self.select_many([val], by_att)[0]
+
+    def select_many(self, vals, by_att: str = "name") -> list[SpotRecord]:
+        """Records for every value in vals, in the same order."""
+        positions = [self.__get_idx(val, by_att) for val in vals]
+        rows = self.table.iloc[positions][SpotRecord.preferred_order()]
+        return [SpotRecord(*row) for row in rows.itertuples(index=False, name=None)]
+
+    def records(self) -> list[SpotRecord]:
+        rows = self.table[SpotRecord.preferred_order()]
+        return [SpotRecord(*row) for row in rows.itertuples(index=False, name=None)]
+
+    def names(self) -> list[str]:
+        return list(self.table["name"])
+
+    def contains(self, val, by_att: str = "name") -> bool:
+        if by_att in INDEXED_FIELDS:
+            return val in self.indexes()[by_att]
+        return val in set(self.table[by_att])
+
+    def indexes(self) -> dict[str, dict]:
+        """Value -> row position maps, rebuilt after the table changes.
+
+        Duplicate values resolve to their first row, like a scan would.
+        """
+        if self._indexed_rows != len(self):
+            with self._lck:
+                if self._indexed_rows != len(self):
+                    self.__build_indexes()
+        return self._indexes
+
+    def __build_indexes(self) -> None:
+        # built aside and swapped in whole: concurrent readers never see a
+        # partial index
+        table = self.table
+        indexes: dict[str, dict] = {}
+        for att in INDEXED_FIELDS:
+            index: dict = {}
+            for (position, val) in enumerate(table[att]):
+                index.setdefault(val, position)
+            indexes[att] = index
+        self._indexes = indexes
+        self._indexed_rows = len(table)
+
+    def spatial_index(self) -> SpatialIndex:
+        """Spatial index over the table, rebuilt after the table changes."""
+        if self._spatial is None or len(self._spatial) != len(self.table):
+            self._spatial = SpatialIndex(
+                self.table["latitude"].astype(float).to_numpy(),
+                self.table["longitude"].astype(float).to_numpy(),
+            )
+        return self._spatial
+
+    def within_radius(self, loc: Location, miles: float) -> pd.DataFrame:
+        """Spots within miles of loc, nearest first, with a distance column."""
+        positions, distances = self.spatial_index().within_radius(loc, miles)
+        return self.__with_distance(positions, distances)
+
+    def k_nearest(self, loc: Location, k: int) -> pd.DataFrame:
+        """The k spots nearest to loc, nearest first, with a distance column."""
+        positions, distances = self.spatial_index().k_nearest(loc, k)
+        return self.__with_distance(positions, distances)
 
     def flush(self) -> None:
-        self.table[SpotRecord.preferred_order()].to_csv(self.name, index=False)
+        """Write the whole table to the main file and drop the journal."""
+        tmp_name = self.name + ".tmp"
+        self.table[SpotRecord.preferred_order()].to_csv(tmp_name, index=False)
+        os.replace(tmp_name, self.name)
+        if exists(self.journal_name):
+            os.remove(self.journal_name)
+        self._journaled = 0
+
+    def __append(self, record: SpotRecord) -> None:
+        indexes = self.indexes()
+        position = len(self)
+        self._pending.append(asdict(record))
+        for att in INDEXED_FIELDS:
+            indexes[att].setdefault(getattr(record, att), position)
+        self._indexed_rows = len(self)
+        self._spatial = None
+
+    def __remove(self, position: int) -> None:
+        table = self.table
+        # keep labels equal to positions; every later position shifted anyway
+        self._table = table.drop(table.index[position]).reset_index(drop=True)
+        self._indexed_rows = -1
+        self._spatial = None
+
+    def __commit(self) -> None:
+        if len(self._uncommitted) == 0:
+            return None
+        with open(self.journal_name, "a", newline="") as journal:
+            csv.writer(journal).writerows(self._uncommitted)
+        self._journaled += len(self._uncommitted)
+        self._uncommitted = []
+        # growing with the table keeps the cost of compaction linear overall
+        if self._journaled >= max(self.compact_every, len(self) // 2):
+            self.flush()
+
+    def __replay(self) -> None:
+        if not exists(self.journal_name):
+            return None
+        with open(self.journal_name, newline="") as journal:
+            ops = list(csv.reader(journal))
+        for op in ops:
+            # a torn last line from a crash mid-write is skipped
+            if len(op) != len(SpotRecord.preferred_order()) + 1:
+                continue
+            record = SpotRecord(*op[1:])
+            record.latitude = float(record.latitude)
+            record.longitude = float(record.longitude)
+            if op[0] == "+" and not self.contains(record.url, by_att="url"):
+                self.__append(record)
+            elif op[0].startswith("-"):
+                by_att = op[0][1:] or "name"
+                val = getattr(record, by_att)
+                if self.contains(val, by_att=by_att):
+                    self.__remove(self.__get_idx(val, by_att))
+        self._journaled = len(ops)
+
+    @staticmethod
+    def __row(record: SpotRecord) -> list:
+        return [getattr(record, att) for att in SpotRecord.preferred_order()]
+
+    def __with_distance(self, positions, distances) -> pd.DataFrame:
+        df = self.table.iloc[positions].copy()
+        df["distance"] = distances
+        return df
 
     def __get_idx(self, val, by_att: str = "name") -> int:
-        return self.table[by_att].to_list().index(val)
+        if by_att not in INDEXED_FIELDS:
+            return self.table[by_att].to_list().index(val)
+        try:
+            return self.indexes()[by_att][val]
+        except KeyError:
+            raise ValueError(f"{val!r} is not in {by_att}") from None
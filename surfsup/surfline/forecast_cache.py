@@ -0,0 +1,273 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+# outcomes of a cache lookup
+_HIT = "hit"
+_REFRESH = "refresh"
+_LEAD = "lead"
+_WAIT = "wait"
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    fetched_at: float
+    error: Optional[Exception] = None
+    retry_after: float = 0.0
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0
+    negative_hits: int = 0
+    coalesced: int = 0
+    refreshes: int = 0
+
+
+class ForecastCache:
+    """Stale-while-revalidate cache for spot reports, keyed by spot.
+
+    Entries younger than ttl are served as is. Entries older than ttl but
+    within stale_ttl after that are served stale while a single background
+    refresh runs, on a pool of max_refreshes threads. Concurrent misses for
+    the same spot wait on one upstream fetch, and failed fetches are cached
+    for negative_ttl.
+    """
+
+    ttl: float
+    stale_ttl: float
+    negative_ttl: float
+    maxsize: int
+    stats: CacheStats
+
+    def __init__(
+        self,
+        ttl: float = 60 * 5,
+        stale_ttl: float = 60 * 15,
+        negative_ttl: float = 30,
+        maxsize: int = 1024,
+        max_refreshes: int = 4,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        self.stats = CacheStats()
+        self.lck = threading.Lock()
+        self.entries: OrderedDict[Hashable, CacheEntry] = OrderedDict()
+        self.inflight: dict[Hashable, Future] = {}
+        # stale refreshes of get run here, at most max_refreshes at a time
+        self.refresher = ThreadPoolExecutor(
+            max_refreshes, thread_name_prefix="CacheRefresh"
+        )
+        self.refresh_tasks: set[asyncio.Task] = set()
+
+    def get(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        """Return the cached value for key, calling fetch when it is missing."""
+        (state, value, future) = self._lookup(key)
+        if state == _REFRESH:
+            self.refresher.submit(self._load, key, fetch, future, True)
+        elif state == _LEAD:
+            self._load(key, fetch, future, False)
+        if state in (_HIT, _REFRESH):
+            return value
+        return future.result()
+
+    async def aget(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Asyncio counterpart of get, sharing its in-flight fetches.
+
+        A stale refresh runs as a task on the running loop; await
+        drain_refreshes before closing what fetch uses.
+        """
+        (state, value, future) = self._lookup(key)
+        if state == _REFRESH:
+            task = asyncio.ensure_future(self._aload(key, fetch, future, True))
+            self.refresh_tasks.add(task)
+            task.add_done_callback(self.refresh_tasks.discard)
+        elif state == _LEAD:
+            await self._aload(key, fetch, future, False)
+        if state in (_HIT, _REFRESH):
+            return value
+        return await asyncio.wrap_future(future)
+
+    async def drain_refreshes(self) -> None:
+        """Wait for the stale refreshes aget started on the running loop."""
+        loop = asyncio.get_running_loop()
+        tasks = [task for task in self.refresh_tasks if task.get_loop() is loop]
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _lookup(self, key: Hashable) -> tuple[str, Any, Optional[Future]]:
+        """(state, value, future) of a get: a hit or a stale hit needing a
+        refresh has the value, a miss the future to lead or wait on.
+        """
+        with self.lck:
+            now = self.clock()
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                age = now - entry.fetched_at
+                if entry.error is not None:
+                    if age < self.negative_ttl:
+                        self.stats.negative_hits += 1
+                        raise entry.error
+                elif age < self.ttl:
+                    self.stats.hits += 1
+                    return (_HIT, entry.value, None)
+                elif age < self.ttl + self.stale_ttl:
+                    self.stats.stale += 1
+                    if key in self.inflight or now < entry.retry_after:
+                        return (_HIT, entry.value, None)
+                    self.stats.refreshes += 1
+                    self.inflight[key] = Future()
+                    return (_REFRESH, entry.value, self.inflight[key])
+
+            future = self.inflight.get(key)
+            if future is not None:
+                self.stats.coalesced += 1
+                return (_WAIT, None, future)
+            self.stats.misses += 1
+            self.inflight[key] = Future()
+            return (_LEAD, None, self.inflight[key])
+
+    def fresh(self, key: Hashable) -> Optional[Any]:
+        """Return the value for key only if it is within its ttl."""
+        with self.lck:
+            entry = self.entries.get(key)
+            if entry is None or entry.error is not None:
+                return None
+            if self.clock() - entry.fetched_at >= self.ttl:
+                return None
+            self.stats.hits += 1
+            return entry.value
+
+    def refresh(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        """Fetch key now even if it is cached, joining a fetch already in flight."""
+        with self.lck:
+            future = self.inflight.get(key)
+            leader = future is None
+            if leader:
+                self.stats.refreshes += 1
+                future = self.inflight[key] = Future()
+
+        if leader:
+            self._load(key, fetch, future, True)
+        return future.result()
+
+    def expires_in(self, key: Hashable) -> Optional[float]:
+        """Seconds until the entry for key leaves its ttl, None when not cached."""
+        with self.lck:
+            entry = self.entries.get(key)
+            if entry is None or entry.error is not None:
+                return None
+            return self.ttl - (self.clock() - entry.fetched_at)
+
+    def last_value(self, key: Hashable) -> Optional[Any]:
+        """The last value fetched for key however old it is, None if never fetched."""
+        with self.lck:
+            entry = self.entries.get(key)
+            return entry.value if entry is not None else None
+
+    def put(self, key: Hashable, value: Any, fetched_at: Optional[float] = None):
+        with self.lck:
+            fetched_at = self.clock() if fetched_at is None else fetched_at
+            self._store(key, CacheEntry(value, fetched_at))
+
+    def snapshot(self) -> list[tuple[Hashable, Any, float]]:
+        """List (key, value, fetched_at) for every entry which can still be served."""
+        with self.lck:
+            oldest = self.clock() - (self.ttl + self.stale_ttl)
+            return [
+                (key, entry.value, entry.fetched_at)
+                for (key, entry) in self.entries.items()
+                if entry.error is None and entry.fetched_at > oldest
+            ]
+
+    def restore(self, items: list[tuple[Hashable, Any, float]]) -> int:
+        """Load entries from a snapshot, skipping ones too old to serve."""
+        restored = 0
+        for (key, value, fetched_at) in sorted(items, key=lambda item: item[2]):
+            if self.clock() - fetched_at < self.ttl + self.stale_ttl:
+                self.put(key, value, fetched_at)
+                restored += 1
+        return restored
+
+    def invalidate(self, key: Hashable) -> None:
+        with self.lck:
+            self.entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.entries
+
+    def _load(self, key: Hashable, fetch, future: Future, refresh: bool) -> None:
+        try:
+            value = fetch()
+        except Exception as exc:
+            self._failed(key, exc, future, refresh)
+        else:
+            self._loaded(key, value, future)
+        finally:
+            self._abandon(key, future, refresh)
+
+    async def _aload(self, key: Hashable, fetch, future: Future, refresh: bool) -> None:
+        try:
+            value = await fetch()
+        except Exception as exc:
+            self._failed(key, exc, future, refresh)
+        else:
+            self._loaded(key, value, future)
+        finally:
+            self._abandon(key, future, refresh)
+
+    def _loaded(self, key: Hashable, value: Any, future: Future) -> None:
+        with self.lck:
+            self._store(key, CacheEntry(value, self.clock()))
+            del self.inflight[key]
+        future.set_result(value)
+
+    def _failed(
+        self, key: Hashable, exc: Exception, future: Future, refresh: bool
+    ) -> None:
+        with self.lck:
+            entry = self.entries.get(key)
+            if refresh and entry is not None:
+                # keep serving the stale value, but not refresh on every call
+                entry.retry_after = self.clock() + self.negative_ttl
+            else:
+                # the last good value stays around for last_value
+                value = entry.value if entry is not None else None
+                self._store(key, CacheEntry(value, self.clock(), error=exc))
+            del self.inflight[key]
+        future.set_exception(exc)
+
+    def _abandon(self, key: Hashable, future: Future, refresh: bool) -> None:
+        """Release the waiters of a fetch interrupted by a BaseException
+        (KeyboardInterrupt, a cancelled task), caching nothing. An interrupted
+        refresh backs off like a failed one.
+        """
+        if future.done():
+            return None
+        with self.lck:
+            if self.inflight.get(key) is future:
+                del self.inflight[key]
+            entry = self.entries.get(key)
+            if refresh and entry is not None:
+                entry.retry_after = self.clock() + self.negative_ttl
+        future.set_exception(RuntimeError(f"fetch of {key!r} was interrupted"))
+
+    def _store(self, key: Hashable, entry: CacheEntry) -> None:
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
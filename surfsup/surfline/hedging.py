@@ -0,0 +1,225 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures import wait
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Latencies of the last window successful requests."""
+
+    window: int
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.lck = threading.Lock()
+
+    def record(self, latency: float) -> None:
+        with self.lck:
+            self.latencies.append(latency)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The q quantile (0 to 1) of the window, None when it is empty."""
+        with self.lck:
+            ordered = sorted(self.latencies)
+        if len(ordered) == 0:
+            return None
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def __len__(self) -> int:
+        return len(self.latencies)
+
+
+@dataclass
+class HedgeStats:
+    requests: int = 0
+    hedged: int = 0
+    hedge_wins: int = 0
+    denied: int = 0
+
+
+_shared_pool: Optional[ThreadPoolExecutor] = None
+_shared_lck = threading.Lock()
+
+
+def shared_hedge_pool() -> ThreadPoolExecutor:
+    """The thread pool every Hedger in this process runs requests on by default.
+
+    Its threads are started on demand and live as long as the process.
+    """
+    global _shared_pool
+    with _shared_lck:
+        if _shared_pool is None:
+            _shared_pool = ThreadPoolExecutor(128, thread_name_prefix="Hedge")
+        return _shared_pool
+
+
+def _first(done: set, pending: set):
+    """The first successful future of done, or a failed one when none are left."""
+    for future in sorted(done, key=lambda f: f.exception() is not None):
+        if future.exception() is None or len(pending) == 0:
+            return future
+    return None
+
+
+class Hedger:
+    """Hedged requests: when a request has not answered after the quantile
+    latency of recent requests, a second identical one is fired and
+    whichever answers first wins.
+
+    At most max_ratio of requests are hedged, and at most max_in_flight
+    hedges are outstanding at once, so the extra load stays bounded when
+    upstream is slow across the board. Nothing is hedged until min_samples
+    latencies have been seen. admit, when given to run, is asked last
+    before a hedge is fired, e.g. for a token of the rate budget.
+
+    request should be the upstream call alone: its latency is what the
+    hedging delay is taken from, so anything queueing locally (a limiter)
+    belongs around run.
+
+    Blocking requests run on pool, by default the one shared by every
+    Hedger in the process, so the caller can take the first answer; the
+    losing request runs to completion in the background, bounded by its
+    own timeout. Asyncio losers are cancelled.
+    """
+
+    max_ratio: float
+    max_in_flight: int
+    quantile: float
+    min_samples: int
+    latencies: LatencyTracker
+    stats: HedgeStats
+
+    def __init__(
+        self,
+        max_ratio: float = 0.05,
+        max_in_flight: int = 4,
+        quantile: float = 0.95,
+        min_samples: int = 20,
+        window: int = 200,
+        pool: Optional[ThreadPoolExecutor] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_ratio = max_ratio
+        self.max_in_flight = max_in_flight
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.latencies = LatencyTracker(window)
+        self.clock = clock
+        self.stats = HedgeStats()
+        self.pool = pool if pool is not None else shared_hedge_pool()
+        # hedges fired that have not finished yet
+        self.in_flight = 0
+        self.lck = threading.Lock()
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, None while there are too few samples."""
+        if len(self.latencies) < self.min_samples:
+            return None
+        return self.latencies.quantile(self.quantile)
+
+    def run(
+        self, request: Callable[[], T], admit: Optional[Callable[[], bool]] = None
+    ) -> T:
+        delay = self._start()
+        if delay is None:
+            return self._timed(request)
+
+        primary = self.pool.submit(self._timed, request)
+        try:
+            return primary.result(timeout=delay)
+        except FutureTimeout:
+            pass
+        if not self._try_hedge(admit):
+            return primary.result()
+
+        hedge = self.pool.submit(self._timed, request)
+        hedge.add_done_callback(self._hedge_done)
+        pending = {primary, hedge}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = _first(done, pending)
+            if winner is not None:
+                return self._won(winner, hedge)
+
+    async def arun(
+        self,
+        request: Callable[[], Awaitable[T]],
+        admit: Optional[Callable[[], bool]] = None,
+    ) -> T:
+        """Asyncio counterpart of run."""
+        delay = self._start()
+        if delay is None:
+            return await self._atimed(request)
+
+        primary = asyncio.ensure_future(self._atimed(request))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if len(done) > 0 or not self._try_hedge(admit):
+            return await primary
+
+        hedge = asyncio.ensure_future(self._atimed(request))
+        hedge.add_done_callback(self._hedge_done)
+        pending = {primary, hedge}
+        try:
+            while True:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                winner = _first(done, pending)
+                if winner is not None:
+                    return self._won(winner, hedge)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _start(self) -> Optional[float]:
+        with self.lck:
+            self.stats.requests += 1
+        return self.delay()
+
+    def _try_hedge(self, admit: Optional[Callable[[], bool]]) -> bool:
+        with self.lck:
+            if (
+                self.stats.hedged + 1 > self.max_ratio * self.stats.requests
+                or self.in_flight >= self.max_in_flight
+            ):
+                self.stats.denied += 1
+                return False
+            self.stats.hedged += 1
+            self.in_flight += 1
+        if admit is None or admit():
+            return True
+        with self.lck:
+            self.stats.hedged -= 1
+            self.in_flight -= 1
+            self.stats.denied += 1
+        return False
+
+    def _hedge_done(self, hedge) -> None:
+        with self.lck:
+            self.in_flight -= 1
+
+    def _won(self, winner, hedge):
+        if winner is hedge and winner.exception() is None:
+            with self.lck:
+                self.stats.hedge_wins += 1
+        return winner.result()
+
+    def _timed(self, request: Callable[[], T]) -> T:
+        started = self.clock()
+        result = request()
+        self.latencies.record(self.clock() - started)
+        return result
+
+    async def _atimed(self, request: Callable[[], Awaitable[T]]) -> T:
+        started = self.clock()
+        result = await request()
+        self.latencies.record(self.clock() - started)
+        return result
@@ -0,0 +1,152 @@
+import re
+import unicodedata
+from bisect import bisect_left
+from itertools import islice
+from typing import Iterable
+
+import numpy as np
+
+# candidates sharing the most trigrams with a query are checked for edit distance
+MAX_CANDIDATES = 64
+
+
+def normalize_name(name: str) -> str:
+    """Lower-case, accent-free form of name with punctuation removed."""
+    decomposed = unicodedata.normalize("NFKD", str(name))
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    words = re.sub(r"[^\w\s]", "", stripped.casefold()).split()
+    return " ".join(words)
+
+
+def trigrams(normalized: str) -> set[str]:
+    padded = f"  {normalized} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Levenshtein distance of a and b, or max_distance + 1 once it is exceeded.
+
+    Only the diagonal band of width 2 * max_distance + 1 is computed; cells
+    outside it are already further apart than max_distance.
+    """
+    over = max_distance + 1
+    if abs(len(a) - len(b)) > max_distance:
+        return over
+    previous = [j if j <= max_distance else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        ca = a[i - 1]
+        current = [over] * (len(b) + 1)
+        current[0] = i if i <= max_distance else over
+        low, high = max(1, i - max_distance), min(len(b), i + max_distance)
+        for j in range(low, high + 1):
+            cost = previous[j - 1] + (ca != b[j - 1])
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost if cost < over else over
+        if min(current[low - 1 : high + 1]) >= over:
+            return over
+        previous = current
+    return previous[-1]
+
+
+class NameIndex:
+    """Prebuilt fuzzy matching and autocompletion over spot names.
+
+    Names are normalized once. Typo suggestions look up the query's
+    trigrams in an inverted index, rank the names sharing the most of them
+    and keep those within max_distance edits. Completions binary search a
+    sorted list of every word-start suffix, so "jol" finds "La Jolla Shores".
+    """
+
+    names: list[str]
+
+    def __init__(self, names: Iterable[str]):
+        self.names = []
+        self.normalized: list[str] = []
+        gram_counts: list[int] = []
+        postings: dict[str, list[int]] = {}
+        seen: set[str] = set()
+        for name in names:
+            if not isinstance(name, str):
+                continue
+            normalized = normalize_name(name)
+            # duplicates resolve to the first name, like a database select
+            if normalized in seen or len(normalized) == 0:
+                continue
+            seen.add(normalized)
+            name_id = len(self.names)
+            self.names.append(name)
+            self.normalized.append(normalized)
+            grams = trigrams(normalized)
+            gram_counts.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(name_id)
+
+        self.gram_counts = np.array(gram_counts, dtype=np.int64)
+        self.lengths = np.array([len(n) for n in self.normalized], dtype=np.int64)
+        self.postings: dict[str, np.ndarray] = {
+            gram: np.array(ids, dtype=np.int64) for (gram, ids) in postings.items()
+        }
+
+        self.suffixes = sorted(
+            (normalized[match.start() :], name_id)
+            for (name_id, normalized) in enumerate(self.normalized)
+            for match in re.finditer(r"\S+", normalized)
+        )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def suggest(self, query: str, k: int = 5, max_distance: int = 2) -> list[str]:
+        """Up to k names within max_distance edits of query, closest first."""
+        normalized = normalize_name(query)
+        grams = trigrams(normalized)
+        found = [self.postings[gram] for gram in grams if gram in self.postings]
+        if len(found) == 0:
+            return []
+        shared = np.bincount(np.concatenate(found), minlength=len(self.names))
+
+        # one edit changes at most three trigrams, so closer names share more
+        slack = 3 * max_distance
+        candidates = np.flatnonzero(
+            (shared > 0)
+            & (shared >= len(grams) - slack)
+            & (shared >= self.gram_counts - slack)
+            & (np.abs(self.lengths - len(normalized)) <= max_distance)
+        )
+        if len(candidates) > MAX_CANDIDATES:
+            best = np.argpartition(-shared[candidates], MAX_CANDIDATES - 1)
+            candidates = candidates[best[:MAX_CANDIDATES]]
+
+        ranked = []
+        for name_id in candidates.tolist():
+            distance = edit_distance(normalized, self.normalized[name_id], max_distance)
+            if distance <= max_distance:
+                ranked.append((distance, -shared[name_id], name_id))
+        return [self.names[name_id] for (_, _, name_id) in sorted(ranked)[:k]]
+
+    def complete(self, prefix: str, k: int = 5) -> list[str]:
+        """Up to k names with a word starting with prefix; whole-name matches first."""
+        normalized = normalize_name(prefix)
+        if len(normalized) == 0:
+            return []
+
+        start = bisect_left(self.suffixes, (normalized,))
+        whole, inner = [], []
+        for (suffix, name_id) in islice(self.suffixes, start, None):
+            if not suffix.startswith(normalized):
+                break
+            if suffix == self.normalized[name_id]:
+                whole.append(name_id)
+            else:
+                inner.append(name_id)
+
+        out = []
+        for name_id in whole + inner:
+            if name_id not in out:
+                out.append(name_id)
+            if len(out) == k:
+                break
+        return [self.names[name_id] for name_id in out]
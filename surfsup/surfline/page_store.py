@@ -0,0 +1,74 @@
+import json
+import sqlite3
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class PageMeta:
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_hash: str
+    links: list[str]
+    fetched_at: float
+
+
+class PageStore:
+    """SQLite record of every page a crawl visited.
+
+    Keeps the validators needed for conditional requests, a hash of the
+    content and the links found on the page, so an incremental crawl can
+    follow an unchanged page's links without downloading or parsing it.
+    """
+
+    path: str
+
+    def __init__(self, path: str):
+        self.path = path
+        with closing(sqlite3.connect(self.path)) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                + "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, "
+                + "content_hash TEXT NOT NULL, links TEXT NOT NULL, "
+                + "fetched_at REAL NOT NULL)"
+            )
+
+    def get(self, url: str) -> Optional[PageMeta]:
+        with closing(sqlite3.connect(self.path)) as conn:
+            row = conn.execute(
+                "SELECT url, etag, last_modified, content_hash, links, fetched_at "
+                + "FROM pages WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        (url, etag, last_modified, content_hash, links, fetched_at) = row
+        return PageMeta(
+            url, etag, last_modified, content_hash, json.loads(links), fetched_at
+        )
+
+    def put(self, meta: PageMeta) -> None:
+        with closing(sqlite3.connect(self.path)) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pages "
+                + "(url, etag, last_modified, content_hash, links, fetched_at) "
+                + "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    meta.url,
+                    meta.etag,
+                    meta.last_modified,
+                    meta.content_hash,
+                    json.dumps(meta.links),
+                    meta.fetched_at,
+                ),
+            )
+
+    def urls(self) -> set[str]:
+        with closing(sqlite3.connect(self.path)) as conn:
+            return {url for (url,) in conn.execute("SELECT url FROM pages")}
+
+    def __len__(self) -> int:
+        with closing(sqlite3.connect(self.path)) as conn:
+            return conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
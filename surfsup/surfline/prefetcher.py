@@ -0,0 +1,132 @@
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from surfsup.surfline.forecast_cache import ForecastCache
+from surfsup.surfline.rate_limit import TokenBucket
+
+
+@dataclass
+class Popularity:
+    score: float
+    last_access: float
+
+
+@dataclass
+class PrefetchStats:
+    refreshed: int = 0
+    failed: int = 0
+    over_budget: int = 0
+
+
+class Prefetcher:
+    """Background refresh of the most requested spots shortly before they expire.
+
+    Every access decays the spot's popularity score by half_life before
+    adding one. Each tick the hot_spots most popular spots whose cache
+    entry is missing or expires within lead_time are re-fetched, as long as
+    the requests_per_minute budget allows it. Spots whose score has decayed
+    below min_score are cold: they are forgotten and no longer refreshed,
+    so a single access is refreshed for about two half lives by default.
+    """
+
+    cache: ForecastCache
+    hot_spots: int
+    lead_time: float
+    interval: float
+    half_life: float
+    min_score: float
+    budget: TokenBucket
+    stats: PrefetchStats
+
+    def __init__(
+        self,
+        cache: ForecastCache,
+        fetch: Callable[[str], dict],
+        hot_spots: int = 50,
+        lead_time: float = 60,
+        requests_per_minute: float = 30,
+        interval: float = 15,
+        half_life: float = 60 * 60,
+        min_score: float = 0.25,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.cache = cache
+        self.fetch = fetch
+        self.hot_spots = hot_spots
+        self.lead_time = lead_time
+        self.interval = interval
+        self.half_life = half_life
+        self.min_score = min_score
+        self.clock = clock
+        self.budget = TokenBucket.per_minute(requests_per_minute, clock=clock)
+        self.stats = PrefetchStats()
+        self.popularity: dict[str, Popularity] = {}
+        self.lck = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def record_access(self, name: str) -> None:
+        with self.lck:
+            now = self.clock()
+            pop = self.popularity.get(name)
+            if pop is None:
+                self.popularity[name] = Popularity(1.0, now)
+            else:
+                pop.score = self._decayed(pop, now) + 1.0
+                pop.last_access = now
+
+    def hottest(self, n: int) -> list[str]:
+        """The n most popular spots, forgetting the ones below min_score."""
+        with self.lck:
+            now = self.clock()
+            scores = {
+                name: self._decayed(pop, now) for (name, pop) in self.popularity.items()
+            }
+            for (name, score) in scores.items():
+                if score < self.min_score:
+                    del self.popularity[name]
+            ranked = sorted(self.popularity, key=scores.get, reverse=True)
+        return ranked[:n]
+
+    def tick(self) -> list[str]:
+        """Refresh the hot spots which are about to expire, returning their names."""
+        refreshed = []
+        for name in self.hottest(self.hot_spots):
+            expires_in = self.cache.expires_in(name)
+            if expires_in is not None and expires_in > self.lead_time:
+                continue
+            if not self.budget.try_acquire():
+                self.stats.over_budget += 1
+                break
+
+            try:
+                self.cache.refresh(name, lambda: self.fetch(name))
+                self.stats.refreshed += 1
+                refreshed.append(name)
+            except Exception:
+                self.stats.failed += 1
+                print(traceback.format_exc(limit=1))
+        return refreshed
+
+    def start(self) -> None:
+        if self.thread is not None:
+            return None
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._run, name="Prefetcher", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def _run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.tick()
+
+    def _decayed(self, pop: Popularity, now: float) -> float:
+        return pop.score * 0.5 ** ((now - pop.last_access) / self.half_life)
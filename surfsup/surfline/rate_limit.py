@@ -0,0 +1,302 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at rate tokens per second."""
+
+    rate: float
+    capacity: float
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated_at = clock()
+        self.lck = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, requests: float, **kwargs):
+        """Bucket allowing requests per minute, with at most a minute of burst."""
+        return cls(requests / 60.0, max(1.0, requests), **kwargs)
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        with self.lck:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until tokens can be acquired, 0 if they are available now."""
+        with self.lck:
+            self._refill()
+            return max(0.0, (tokens - self.tokens) / self.rate)
+
+    def _refill(self) -> None:
+        now = self.clock()
+        elapsed = max(0.0, now - self.updated_at)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+
+class SharedTokenBucket(TokenBucket):
+    """TokenBucket whose tokens are kept in a SQLite file, so every process
+    opening the same path draws from one budget: the bot, the collector
+    and the crawler.
+
+    Each call is one short write transaction. Processes sharing a path
+    should use the same rate and capacity, and the clock is wall time, the
+    one clock they all read.
+    """
+
+    path: str
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        path: str,
+        clock: Callable[[], float] = time.time,
+    ):
+        super().__init__(rate, capacity, clock=clock)
+        self.path = path
+        self.conn = sqlite3.connect(
+            path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        with self.lck:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS bucket "
+                + "(id INTEGER PRIMARY KEY CHECK (id = 0), tokens REAL, updated_at REAL)"
+            )
+            self.conn.execute(
+                "INSERT OR IGNORE INTO bucket VALUES (0, ?, ?)", (capacity, clock())
+            )
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        return self._transact(tokens, take=True)[0]
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        return self._transact(tokens, take=False)[1]
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _transact(self, tokens: float, take: bool) -> tuple[bool, float]:
+        """Refill the stored tokens, taking tokens when take and they are
+        there; (taken, seconds until tokens are available).
+        """
+        with self.lck:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                (self.tokens, self.updated_at) = self.conn.execute(
+                    "SELECT tokens, updated_at FROM bucket"
+                ).fetchone()
+                self._refill()
+                taken = take and self.tokens >= tokens
+                if taken:
+                    self.tokens -= tokens
+                self.conn.execute(
+                    "UPDATE bucket SET tokens = ?, updated_at = ?",
+                    (self.tokens, self.updated_at),
+                )
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return (taken, max(0.0, (tokens - self.tokens) / self.rate))
+
+
+class HostThrottle:
+    """Per-host politeness: at most max_per_host requests in flight to a
+    host and at least delay seconds between the starts of its requests.
+    """
+
+    delay: float
+    max_per_host: int
+
+    def __init__(
+        self,
+        delay: float,
+        max_per_host: int,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.delay = delay
+        self.max_per_host = max_per_host
+        self.clock = clock
+        self.sleep = sleep
+        self.slots: dict[str, threading.Semaphore] = {}
+        self.next_start: dict[str, float] = {}
+        self.lck = threading.Lock()
+
+    def acquire(self, host: str) -> None:
+        """Block until a request to host may start."""
+        with self.lck:
+            slots = self.slots.setdefault(host, threading.Semaphore(self.max_per_host))
+        slots.acquire()
+        with self.lck:
+            # reserve the next start time so waiting callers queue up behind it
+            now = self.clock()
+            start = max(now, self.next_start.get(host, now))
+            self.next_start[host] = start + self.delay
+        if start > now:
+            self.sleep(start - now)
+
+    def release(self, host: str) -> None:
+        self.slots[host].release()
+
+
+@dataclass
+class LimiterStats:
+    requests: int = 0
+    congested: int = 0
+    increases: int = 0
+    decreases: int = 0
+    peak_in_flight: int = 0
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit for upstream requests, behind a shared token bucket.
+
+    At most limit requests are in flight. Each answered request that took
+    at most latency_target seconds raises limit by 1 / limit, so about one
+    per window of requests. A 429, a 5xx, a timeout or a connection error
+    multiplies it by backoff, once per window: congestion reported by
+    requests started before the last back-off does not cut it again.
+    With a bucket every request also takes a token from it, which caps the
+    overall rate no matter how high limit grows. It is a TokenBucket of
+    requests_per_minute, or the one given, such as a SharedTokenBucket.
+    By default there is none and only concurrency is limited.
+    """
+
+    limit: float
+    min_limit: float
+    max_limit: float
+    backoff: float
+    latency_target: float
+    bucket: Optional[TokenBucket]
+    stats: LimiterStats
+
+    def __init__(
+        self,
+        initial_limit: float = 8,
+        min_limit: float = 1,
+        max_limit: float = 64,
+        backoff: float = 0.5,
+        latency_target: float = 2.0,
+        requests_per_minute: Optional[float] = None,
+        bucket: Optional[TokenBucket] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_target = latency_target
+        if bucket is None and requests_per_minute is not None:
+            bucket = TokenBucket.per_minute(requests_per_minute, clock=clock)
+        self.bucket = bucket
+        self.clock = clock
+        self.sleep = sleep
+        self.in_flight = 0
+        self.backed_off_at = float("-inf")
+        self.stats = LimiterStats()
+        self.cond = threading.Condition()
+
+    def try_acquire(self) -> Optional[float]:
+        """Start a request if one may start now, returning its start time."""
+        with self.cond:
+            if self.in_flight >= int(self.limit):
+                return None
+            if self.bucket is not None and not self.bucket.try_acquire():
+                return None
+            return self._start()
+
+    def acquire(self) -> float:
+        """Block until a request may start, returning its start time for release."""
+        while True:
+            with self.cond:
+                while self.in_flight >= int(self.limit):
+                    self.cond.wait()
+                if self.bucket is None or self.bucket.try_acquire():
+                    return self._start()
+                wait = self.bucket.wait_time()
+            self.sleep(wait)
+
+    async def aacquire(self) -> float:
+        """Asyncio counterpart of acquire, polling instead of blocking the loop."""
+        while True:
+            started = self.try_acquire()
+            if started is not None:
+                return started
+            wait = self.bucket.wait_time() if self.bucket is not None else 0.0
+            await asyncio.sleep(max(wait, 0.01))
+
+    def release(self, started: float, status: Optional[int]) -> None:
+        """Finish the request started at started; status is None when no
+        response arrived (timeout or connection error).
+        """
+        latency = self.clock() - started
+        congested = not isinstance(status, int) or status == 429 or status >= 500
+        with self.cond:
+            self.in_flight -= 1
+            if congested:
+                self.stats.congested += 1
+                if started >= self.backed_off_at:
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self.backed_off_at = self.clock()
+                    self.stats.decreases += 1
+            elif latency <= self.latency_target and self.limit < self.max_limit:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                self.stats.increases += 1
+            self.cond.notify_all()
+
+    def _start(self) -> float:
+        self.in_flight += 1
+        self.stats.requests += 1
+        self.stats.peak_in_flight = max(self.stats.peak_in_flight, self.in_flight)
+        return self.clock()
+
+
+_shared_limiter: Optional[AdaptiveLimiter] = None
+_shared_lck = threading.Lock()
+
+
+def shared_limiter() -> AdaptiveLimiter:
+    """The AdaptiveLimiter every SurflineAPI in this process uses by default."""
+    global _shared_limiter
+    with _shared_lck:
+        if _shared_limiter is None:
+            _shared_limiter = AdaptiveLimiter()
+        return _shared_limiter
+
+
+# requests per minute of the budget the bot, the collector and the crawler
+# share; its minute of burst covers a radius query's fan-out
+SHARED_REQUESTS_PER_MINUTE = 600
+
+
+def use_shared_budget(
+    path: str, requests_per_minute: float = SHARED_REQUESTS_PER_MINUTE
+) -> SharedTokenBucket:
+    """Have the shared limiter draw from the budget stored in path, which
+    every process calling this with the same path shares.
+    """
+    bucket = SharedTokenBucket.per_minute(requests_per_minute, path=path)
+    limiter = shared_limiter()
+    with limiter.cond:
+        limiter.bucket = bucket
+    return bucket
@@ -0,0 +1,31 @@
+import json
+from typing import Optional
+
+# Surfline assigns the whole page state to this global in a single script tag
+REPORT_DATA_MARKER = b"window.__DATA__"
+SCRIPT_END = b"</script>"
+
+
+def extract_report_data(content: bytes) -> Optional[dict]:
+    """Pull the report data straight out of a raw report page.
+
+    Scans for the page state script by its marker, so it does not depend on
+    the position of the script in the page, and decodes only that payload
+    without building a DOM. Returns None when the payload can not be found or
+    decoded so the caller can fall back to parsing the full page.
+    """
+    marker_idx = content.find(REPORT_DATA_MARKER)
+    if marker_idx < 0:
+        return None
+
+    s_idx = content.find(b"=", marker_idx + len(REPORT_DATA_MARKER))
+    e_idx = content.find(SCRIPT_END, s_idx)
+    if s_idx < 0 or e_idx < 0:
+        return None
+
+    payload = content[s_idx + 1 : e_idx].strip().rstrip(b";")
+    try:
+        all_surf_data = json.loads(payload)
+        return all_surf_data["spot"]["report"]["data"]
+    except (ValueError, KeyError, TypeError):
+        return None
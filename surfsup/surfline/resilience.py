@@ -0,0 +1,279 @@
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from surfsup.excepts import CircuitOpenError
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def backoff_delay(
+    attempt: int, base: float, cap: float, rng: random.Random = random
+) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return rng.uniform(0, min(cap, base * 2**attempt))
+
+
+class RetryBudget:
+    """Caps retries at ratio of the requests made.
+
+    Every first attempt deposits ratio of a token, up to capacity, and
+    every retry withdraws one. While upstream is down and every request
+    fails, retries add at most ratio to the load instead of multiplying it.
+    """
+
+    ratio: float
+    capacity: float
+
+    def __init__(self, ratio: float = 0.2, capacity: float = 10):
+        self.ratio = ratio
+        self.capacity = capacity
+        self.tokens = capacity
+        self.lck = threading.Lock()
+
+    def record_request(self) -> None:
+        with self.lck:
+            self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def try_retry(self) -> bool:
+        with self.lck:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class CircuitBreaker:
+    """Fails fast once a host keeps failing.
+
+    After failure_threshold consecutive failures the circuit opens and
+    requests are refused for reset_timeout seconds. Then a single probe is
+    let through (half open): its success closes the circuit, its failure
+    opens it again. A probe interrupted before it has an outcome reopens
+    the circuit as it was, so the next request probes again.
+    """
+
+    failure_threshold: int
+    reset_timeout: float
+    state: str
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self.lck = threading.Lock()
+
+    def allow(self) -> bool:
+        with self.lck:
+            if self.state == CLOSED:
+                return True
+            if (
+                self.state == OPEN
+                and self.clock() - self.opened_at >= self.reset_timeout
+            ):
+                self.state = HALF_OPEN
+                return True
+            # half open: the probe is already in flight
+            return False
+
+    def record_success(self) -> None:
+        with self.lck:
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self.lck:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opens += 1
+                self.state = OPEN
+                self.opened_at = self.clock()
+
+    def record_abort(self) -> None:
+        """The request was interrupted (cancelled, timed out by the caller)
+        before the host answered; says nothing about the host.
+        """
+        with self.lck:
+            if self.state == HALF_OPEN:
+                self.state = OPEN
+
+
+@dataclass
+class ResilienceStats:
+    requests: int = 0
+    retries: int = 0
+    retries_denied: int = 0
+    short_circuited: int = 0
+    served_stale: int = 0
+
+
+class Resilience:
+    """Retries with jittered exponential backoff, a retry budget and a circuit
+    breaker per upstream host.
+
+    call runs attempt until it succeeds, retrying failures retryable
+    accepts up to max_retries times while the budget allows. Only
+    retryable failures count against the host's breaker; while it is open
+    CircuitOpenError is raised without calling attempt.
+    """
+
+    max_retries: int
+    base_delay: float
+    max_delay: float
+    budget: RetryBudget
+    stats: ResilienceStats
+
+    def __init__(
+        self,
+        max_retries: int = 4,
+        base_delay: float = 0.25,
+        max_delay: float = 8.0,
+        retry_ratio: float = 0.2,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        rng: Optional[random.Random] = None,
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = RetryBudget(retry_ratio)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng if rng is not None else random.Random()
+        self.stats = ResilienceStats()
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self.lck = threading.Lock()
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        with self.lck:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(
+                    self.failure_threshold, self.reset_timeout, self.clock
+                )
+            return self.breakers[host]
+
+    def breaker_states(self) -> dict[str, str]:
+        with self.lck:
+            return {host: b.state for (host, b) in self.breakers.items()}
+
+    def call(
+        self,
+        host: str,
+        attempt: Callable[[], T],
+        retryable: Callable[[Exception], bool],
+    ) -> T:
+        self.budget.record_request()
+        self.count("requests")
+        tries = 0
+        while True:
+            breaker = self._allowed(host)
+            try:
+                result = attempt()
+            except Exception as exc:
+                if not self._retry(breaker, exc, retryable, tries):
+                    raise
+                self.sleep(self._delay(tries))
+                tries += 1
+                continue
+            except BaseException:
+                breaker.record_abort()
+                raise
+            breaker.record_success()
+            return result
+
+    async def acall(
+        self,
+        host: str,
+        attempt: Callable[[], Awaitable[T]],
+        retryable: Callable[[Exception], bool],
+    ) -> T:
+        """Asyncio counterpart of call."""
+        self.budget.record_request()
+        self.count("requests")
+        tries = 0
+        while True:
+            breaker = self._allowed(host)
+            try:
+                result = await attempt()
+            except Exception as exc:
+                if not self._retry(breaker, exc, retryable, tries):
+                    raise
+                await asyncio.sleep(self._delay(tries))
+                tries += 1
+                continue
+            except BaseException:
+                # CancelledError of a hedge loser or wait_for, KeyboardInterrupt
+                breaker.record_abort()
+                raise
+            breaker.record_success()
+            return result
+
+    def _allowed(self, host: str) -> CircuitBreaker:
+        breaker = self.breaker(host)
+        if not breaker.allow():
+            self.count("short_circuited")
+            raise CircuitOpenError(host)
+        return breaker
+
+    def _retry(
+        self,
+        breaker: CircuitBreaker,
+        exc: Exception,
+        retryable: Callable[[Exception], bool],
+        tries: int,
+    ) -> bool:
+        if not retryable(exc):
+            # the host answered, it is not the host that is failing
+            breaker.record_success()
+            return False
+        breaker.record_failure()
+        if tries >= self.max_retries:
+            return False
+        if not self.budget.try_retry():
+            self.count("retries_denied")
+            return False
+        self.count("retries")
+        return True
+
+    def _delay(self, tries: int) -> float:
+        with self.lck:
+            return backoff_delay(tries, self.base_delay, self.max_delay, self.rng)
+
+    def count(self, stat: str) -> None:
+        """Add one to stat of stats."""
+        with self.lck:
+            setattr(self.stats, stat, getattr(self.stats, stat) + 1)
+
+
+_shared_resilience: Optional[Resilience] = None
+_shared_lck = threading.Lock()
+
+
+def shared_resilience() -> Resilience:
+    """The Resilience every SurflineAPI in this process uses by default."""
+    global _shared_resilience
+    with _shared_lck:
+        if _shared_resilience is None:
+            _shared_resilience = Resilience()
+        return _shared_resilience
@@ -0,0 +1,139 @@
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests_html import HTMLSession
+
+
+@dataclass
+class PoolStats:
+    checkouts: int = 0
+    sessions: int = 0
+    overflow: int = 0
+
+
+class SessionPool:
+    """Thread-safe pool of HTTP sessions sharing one keep-alive connection pool.
+
+    A requests session keeps cookies and headers that are not safe to
+    change from several threads, so each request checks out a session of
+    its own. Every session mounts the same HTTPAdapter, whose urllib3 pool
+    keeps up to size connections per host alive, so connections are reused
+    whichever session sends the next request. Idle sessions are handed out
+    most recently used first; when all size are busy an extra one is made
+    and dropped on return.
+
+    Headers set with set_header, such as the auth token, apply to every
+    session.
+    """
+
+    size: int
+    adapter: HTTPAdapter
+    headers: dict[str, str]
+    stats: PoolStats
+
+    def __init__(
+        self,
+        size: int = 16,
+        pool_connections: int = 4,
+        factory: Callable[[], requests.Session] = HTMLSession,
+    ):
+        """size connections per host for each of pool_connections hosts."""
+        self.size = size
+        self.factory = factory
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=size)
+        self.headers = {}
+        # every header name set_header was called with
+        self.managed: set[str] = set()
+        self.stats = PoolStats()
+        self.idle: list[requests.Session] = []
+        # headers version each session was last updated to
+        self.versions: dict[requests.Session, int] = {}
+        self.version = 0
+        self.lck = threading.Lock()
+
+    @contextmanager
+    def session(self) -> Iterator[requests.Session]:
+        """Check out a session for the calling thread."""
+        session = self._checkout()
+        try:
+            yield session
+        finally:
+            self._checkin(session)
+
+    def set_header(self, name: str, value: Optional[str]) -> None:
+        """Set header name on every session, removing it when value is None."""
+        with self.lck:
+            self.managed.add(name)
+            if value is None:
+                self.headers.pop(name, None)
+            else:
+                self.headers[name] = value
+            self.version += 1
+
+    def connection_counts(self) -> tuple[int, int]:
+        """(requests sent, connections opened) over the hosts still pooled."""
+        pools = self.adapter.poolmanager.pools
+        requests_sent = connections = 0
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                requests_sent += pool.num_requests
+                connections += pool.num_connections
+        return (requests_sent, connections)
+
+    @property
+    def reuse_rate(self) -> float:
+        """Fraction of requests sent over an already open connection."""
+        (requests_sent, connections) = self.connection_counts()
+        if requests_sent == 0:
+            return 0.0
+        return max(0.0, 1 - connections / requests_sent)
+
+    def close(self) -> None:
+        with self.lck:
+            for session in self.idle:
+                session.close()
+            self.idle = []
+            self.versions = {}
+        self.adapter.close()
+
+    def _checkout(self) -> requests.Session:
+        with self.lck:
+            self.stats.checkouts += 1
+            if len(self.idle) > 0:
+                session = self.idle.pop()
+            elif len(self.versions) < self.size:
+                session = self._new_session()
+                self.versions[session] = -1
+            else:
+                self.stats.overflow += 1
+                return self._new_session()
+
+            if self.versions[session] != self.version:
+                self._apply_headers(session)
+                self.versions[session] = self.version
+            return session
+
+    def _checkin(self, session: requests.Session) -> None:
+        with self.lck:
+            # overflow sessions are dropped, not closed: that would close
+            # the shared adapter
+            if session in self.versions:
+                self.idle.append(session)
+
+    def _new_session(self) -> requests.Session:
+        session = self.factory()
+        session.mount("https://", self.adapter)
+        session.mount("http://", self.adapter)
+        self.stats.sessions += 1
+        self._apply_headers(session)
+        return session
+
+    def _apply_headers(self, session: requests.Session) -> None:
+        for name in self.managed - self.headers.keys():
+            session.headers.pop(name, None)
+        session.headers.update(self.headers)
@@ -0,0 +1,131 @@
+from math import asin, cos, degrees, floor, pi, radians, sin
+
+import numpy as np
+
+from surfsup.maps import Location, distance_miles_array
+
+EARTH_RADIUS_MILES = 3958
+MILES_PER_DEGREE = EARTH_RADIUS_MILES * pi / 180.0
+
+
+def search_box(loc: Location, miles: float) -> tuple[float, float, float]:
+    """Latitude bounds and longitude half-width of a box around the circle.
+
+    A half-width of 180 means every longitude is in range.
+    """
+    angle = miles / EARTH_RADIUS_MILES
+    # pad the box slightly so rounding never drops a spot on its edge
+    lat_min = loc.latitude - degrees(angle) - 1e-9
+    lat_max = loc.latitude + degrees(angle) + 1e-9
+    if lat_min <= -90 or lat_max >= 90 or angle >= pi / 2:
+        # the circle reaches a pole: every longitude is in range
+        return lat_min, lat_max, 180.0
+    ratio = sin(angle) / cos(radians(loc.latitude))
+    lon_span = degrees(asin(ratio)) + 1e-9 if ratio < 1 else 180.0
+    return lat_min, lat_max, lon_span
+
+
+class SpatialIndex:
+    """Grid index over spot coordinates for radius and nearest-spot lookups.
+
+    Spots are bucketed into cell_deg x cell_deg latitude/longitude cells. A
+    query only visits the cells overlapping the bounding box of its search
+    circle, prefilters the candidates by that box and then computes exact
+    haversine distances for the survivors. Positions returned refer to the
+    order of the coordinates the index was built from.
+    """
+
+    latitudes: np.ndarray
+    longitudes: np.ndarray
+    cell_deg: float
+
+    def __init__(self, latitudes, longitudes, cell_deg: float = 1.0):
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self.cell_deg = cell_deg
+        self.nrows = int(round(180 / cell_deg))
+        self.ncols = int(round(360 / cell_deg))
+
+        valid = np.flatnonzero(
+            np.isfinite(self.latitudes) & np.isfinite(self.longitudes)
+        )
+        self.indexed = len(valid)
+        rows = self._rows(self.latitudes[valid])
+        cols = self._cols(self.longitudes[valid])
+        keys = rows * self.ncols + cols
+        order = np.argsort(keys, kind="stable")
+        keys, positions = keys[order], valid[order]
+        cell_keys, starts = np.unique(keys, return_index=True)
+        self.cells: dict[int, np.ndarray] = {
+            int(key): cell_positions
+            for (key, cell_positions) in zip(cell_keys, np.split(positions, starts[1:]))
+        }
+
+    def __len__(self) -> int:
+        return len(self.latitudes)
+
+    def within_radius(
+        self, loc: Location, miles: float
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Positions and distances of every spot within miles of loc, nearest first."""
+        candidates = self._candidates(loc, miles)
+        distances = distance_miles_array(
+            loc, self.latitudes[candidates], self.longitudes[candidates]
+        )
+        in_range = distances <= miles
+        candidates, distances = candidates[in_range], distances[in_range]
+        order = np.argsort(distances, kind="stable")
+        return candidates[order], distances[order]
+
+    def k_nearest(self, loc: Location, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Positions and distances of the k spots nearest to loc, nearest first."""
+        k = min(k, self.indexed)
+        miles = self.cell_deg * MILES_PER_DEGREE
+        while True:
+            positions, distances = self.within_radius(loc, miles)
+            # every spot closer than the k-th found one is inside the circle
+            if len(positions) >= k or miles >= pi * EARTH_RADIUS_MILES:
+                return positions[:k], distances[:k]
+            miles *= 2
+
+    def _candidates(self, loc: Location, miles: float) -> np.ndarray:
+        lat_min, lat_max, lon_span = search_box(loc, miles)
+        rows = range(int(self._rows(lat_min)), int(self._rows(lat_max)) + 1)
+        if lon_span >= 180.0:
+            cols = range(self.ncols)
+        else:
+            first = floor((loc.longitude - lon_span + 180) / self.cell_deg)
+            last = floor((loc.longitude + lon_span + 180) / self.cell_deg)
+            cols = sorted(set(c % self.ncols for c in range(first, last + 1)))
+        col_set = set(cols)
+
+        if len(rows) * len(cols) > len(self.cells):
+            keys = [
+                key
+                for key in self.cells
+                if rows.start <= key // self.ncols < rows.stop
+                and key % self.ncols in col_set
+            ]
+        else:
+            keys = [row * self.ncols + col for row in rows for col in cols]
+
+        found = [self.cells[key] for key in keys if key in self.cells]
+        if len(found) == 0:
+            return np.empty(0, dtype=np.int64)
+        candidates = np.concatenate(found)
+
+        # bounding-box prefilter before computing exact distances
+        lats = self.latitudes[candidates]
+        lon_delta = np.abs(
+            (self.longitudes[candidates] - loc.longitude + 180) % 360 - 180
+        )
+        in_box = (lats >= lat_min) & (lats <= lat_max) & (lon_delta <= lon_span)
+        return np.sort(candidates[in_box])
+
+    def _rows(self, latitudes):
+        rows = np.floor((np.asarray(latitudes) + 90) / self.cell_deg).astype(np.int64)
+        return np.clip(rows, 0, self.nrows - 1)
+
+    def _cols(self, longitudes):
+        cols = np.floor((np.asarray(longitudes) + 180) / self.cell_deg).astype(np.int64)
+        return cols % self.ncols
@@ -0,0 +1,241 @@
+import os
+import struct
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from surfsup.excepts import InvalidSchemaException, ReadOnlyDatabaseException
+from surfsup.maps import Location
+from surfsup.surfline.database import SpotRecord
+from surfsup.surfline.spatial import SpatialIndex
+
+MAGIC = b"SPOTCAT1"
+HEADER = struct.Struct("<8sQQ")
+
+STRING_FIELDS = ["name", "spot_id", "formal_name", "url"]
+INDEXED_FIELDS = ["name", "spot_id", "url"]
+
+# string id stored for a missing value
+MISSING = np.iinfo(np.uint32).max
+
+
+def _layout(nspots: int, nstrings: int) -> dict[str, tuple[int, str, int]]:
+    """Byte offset, dtype and length of every array after the header."""
+    sections = [("latitude", "<f8", nspots), ("longitude", "<f8", nspots)]
+    sections += [(f"{att}_ids", "<u4", nspots) for att in STRING_FIELDS]
+    for att in INDEXED_FIELDS:
+        sections += [(f"{att}_order", "<u4", nspots), (f"{att}_sorted", "<u4", nspots)]
+    sections += [("string_offsets", "<u8", nstrings + 1)]
+
+    layout = {}
+    offset = HEADER.size
+    for (section, dtype, count) in sections:
+        # keep every array 8 byte aligned
+        offset += -offset % 8
+        layout[section] = (offset, dtype, count)
+        offset += np.dtype(dtype).itemsize * count
+    layout["strings"] = (offset, "u1", -1)
+    return layout
+
+
+def write_catalogue(path: str, records: Iterable[SpotRecord]) -> int:
+    """Compile records into a catalogue file, returning the spots written.
+
+    The file is written next to path and moved into place, so processes
+    which already mapped the old catalogue keep reading a consistent copy.
+    """
+    records = list(records)
+
+    def encoded(val) -> Optional[bytes]:
+        return None if pd.isna(val) else str(val).encode("utf-8")
+
+    columns = {
+        att: [encoded(getattr(r, att)) for r in records] for att in STRING_FIELDS
+    }
+    # the interned strings are sorted so lookups can binary search them
+    strings = sorted({s for col in columns.values() for s in col if s is not None})
+    string_ids = {s: i for (i, s) in enumerate(strings)}
+
+    arrays = {
+        "latitude": np.array([r.latitude for r in records], dtype="<f8"),
+        "longitude": np.array([r.longitude for r in records], dtype="<f8"),
+        "string_offsets": np.cumsum([0] + [len(s) for s in strings], dtype="<u8"),
+    }
+    for att in STRING_FIELDS:
+        ids = [MISSING if s is None else string_ids[s] for s in columns[att]]
+        arrays[f"{att}_ids"] = np.array(ids, dtype="<u4")
+    for att in INDEXED_FIELDS:
+        order = np.argsort(arrays[f"{att}_ids"], kind="stable")
+        arrays[f"{att}_order"] = order.astype("<u4")
+        arrays[f"{att}_sorted"] = arrays[f"{att}_ids"][order]
+
+    tmp_name = path + ".tmp"
+    with open(tmp_name, "wb") as fout:
+        fout.write(HEADER.pack(MAGIC, len(records), len(strings)))
+        for (section, (offset, dtype, _)) in _layout(
+            len(records), len(strings)
+        ).items():
+            fout.write(b"\0" * (offset - fout.tell()))
+            if section == "strings":
+                fout.write(b"".join(strings))
+            else:
+                fout.write(arrays[section].astype(dtype).tobytes())
+    os.replace(tmp_name, path)
+    return len(records)
+
+
+class SpotCatalogue:
+    """Read-only spot catalogue memory-mapped from a compiled file.
+
+    Coordinates are float64 arrays and the string columns are ids into one
+    sorted table of interned strings, so opening a catalogue only maps the
+    file and worker processes share its pages. Values are decoded when a
+    record is selected; name, spot_id and url lookups binary search the
+    string table and a per-column sort order instead of building a dict.
+    """
+
+    name: str
+
+    def __init__(self, database_fname: str):
+        self.name = database_fname
+        self.data = np.memmap(database_fname, dtype="u1", mode="r")
+        if len(self.data) < HEADER.size:
+            raise InvalidSchemaException
+        magic, self.nspots, self.nstrings = HEADER.unpack(
+            self.data[: HEADER.size].tobytes()
+        )
+        if magic != MAGIC:
+            raise InvalidSchemaException
+
+        self.arrays: dict[str, np.ndarray] = {}
+        for (section, (offset, dtype, count)) in _layout(
+            self.nspots, self.nstrings
+        ).items():
+            if count < 0:
+                # slicing a memoryview is much cheaper than slicing the memmap
+                self.strings = memoryview(self.data)[offset:]
+            else:
+                # plain arrays over the mapped pages; memmap views index slowly
+                self.arrays[section] = np.frombuffer(
+                    self.data, dtype=dtype, count=count, offset=offset
+                )
+        self._spatial: Optional[SpatialIndex] = None
+        self._table: Optional[pd.DataFrame] = None
+
+    @property
+    def table(self) -> pd.DataFrame:
+        """Every spot decoded into a DataFrame, built on first use."""
+        if self._table is None:
+            self._table = pd.DataFrame(
+                [r.__dict__ for r in self.records()],
+                columns=SpotRecord.preferred_order(),
+            )
+        return self._table
+
+    def __len__(self) -> int:
+        return self.nspots
+
+    def add_record(self, record: SpotRecord) -> None:
+        raise ReadOnlyDatabaseException
+
+    def bulk_add(self, records: Iterable[SpotRecord]) -> None:
+        raise ReadOnlyDatabaseException
+
+    def del_record(self, record: SpotRecord, by_att: str = "name") -> None:
+        raise ReadOnlyDatabaseException
+
+    def flush(self) -> None:
+        return None
+
+    def select(self, val, by_att: str = "name") -> SpotRecord:
+        return self.select_many([val], by_att)[0]
+
+    def select_many(self, vals, by_att: str = "name") -> list[SpotRecord]:
+        """Records for every value in vals, in the same order."""
+        positions = []
+        for val in vals:
+            position = self.__find(val, by_att)
+            if position is None:
+                raise ValueError(f"{val!r} is not in {by_att}")
+            positions.append(position)
+        return [self.__record(position) for position in positions]
+
+    def records(self) -> list[SpotRecord]:
+        return [self.__record(position) for position in range(self.nspots)]
+
+    def names(self) -> list[Optional[str]]:
+        return [self.__string(i) for i in self.arrays["name_ids"]]
+
+    def contains(self, val, by_att: str = "name") -> bool:
+        return self.__find(val, by_att) is not None
+
+    def spatial_index(self) -> SpatialIndex:
+        if self._spatial is None:
+            self._spatial = SpatialIndex(
+                self.arrays["latitude"], self.arrays["longitude"]
+            )
+        return self._spatial
+
+    def within_radius(self, loc: Location, miles: float) -> pd.DataFrame:
+        """Spots within miles of loc, nearest first, with a distance column."""
+        positions, distances = self.spatial_index().within_radius(loc, miles)
+        return self.__with_distance(positions, distances)
+
+    def k_nearest(self, loc: Location, k: int) -> pd.DataFrame:
+        """The k spots nearest to loc, nearest first, with a distance column."""
+        positions, distances = self.spatial_index().k_nearest(loc, k)
+        return self.__with_distance(positions, distances)
+
+    def __with_distance(self, positions, distances) -> pd.DataFrame:
+        df = pd.DataFrame(
+            [self.__record(position).__dict__ for position in positions],
+            columns=SpotRecord.preferred_order(),
+        )
+        df["distance"] = distances
+        return df
+
+    def __find(self, val, by_att: str) -> Optional[int]:
+        if by_att not in INDEXED_FIELDS:
+            raise KeyError(by_att)
+        string_id = self.__string_id(str(val).encode("utf-8"))
+        if string_id is None:
+            return None
+        sorted_ids = self.arrays[f"{by_att}_sorted"]
+        # order is a stable argsort, so the first match is the first row
+        # a uint32 key keeps numpy from casting the whole column
+        first = np.searchsorted(sorted_ids, np.uint32(string_id))
+        if first < self.nspots and sorted_ids[first] == string_id:
+            return int(self.arrays[f"{by_att}_order"][first])
+        return None
+
+    def __string_id(self, encoded: bytes) -> Optional[int]:
+        low, high = 0, self.nstrings
+        while low < high:
+            mid = (low + high) // 2
+            if self.__bytes(mid) < encoded:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self.nstrings and self.__bytes(low) == encoded:
+            return low
+        return None
+
+    def __bytes(self, string_id: int) -> bytes:
+        offsets = self.arrays["string_offsets"]
+        return bytes(self.strings[offsets[string_id] : offsets[string_id + 1]])
+
+    def __string(self, string_id) -> Optional[str]:
+        if string_id == MISSING:
+            return None
+        return self.__bytes(int(string_id)).decode("utf-8")
+
+    def __record(self, position: int) -> SpotRecord:
+        return SpotRecord(
+            name=self.__string(self.arrays["name_ids"][position]),
+            spot_id=self.__string(self.arrays["spot_id_ids"][position]),
+            latitude=float(self.arrays["latitude"][position]),
+            longitude=float(self.arrays["longitude"][position]),
+            formal_name=self.__string(self.arrays["formal_name_ids"][position]),
+            url=self.__string(self.arrays["url_ids"][position]),
+        )
@@ -0,0 +1,251 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from math import pi
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from surfsup.maps import Location, distance_miles_array
+from surfsup.surfline.database import SpotRecord
+from surfsup.surfline.spatial import EARTH_RADIUS_MILES, MILES_PER_DEGREE, search_box
+
+COLUMNS = SpotRecord.preferred_order()
+
+
+class SQLiteSpotDB:
+    """SurflineSpotDB backend stored in a SQLite file.
+
+    Rows live on disk and are queried on demand, so several processes can
+    share one catalogue without each loading it. name, spot_id and url are
+    indexed; radius lookups use an R*-tree over the coordinates when the
+    SQLite build has it, or a (latitude, longitude) index otherwise. Every
+    write is committed straight away.
+    """
+
+    name: str
+    rtree: bool
+
+    def __init__(self, database_fname: str):
+        self.name = database_fname
+        self.lck = threading.RLock()
+        self.conn = sqlite3.connect(database_fname, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._depth = 0
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS spots (id INTEGER PRIMARY KEY, "
+                + "name TEXT, spot_id TEXT, latitude REAL, longitude REAL, "
+                + "formal_name TEXT, url TEXT)"
+            )
+            for att in ["name", "spot_id", "url"]:
+                self.conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS spots_{att} ON spots ({att})"
+                )
+            self.rtree = self.__create_rtree()
+
+    @property
+    def table(self) -> pd.DataFrame:
+        with self.lck:
+            return pd.read_sql_query(
+                f"SELECT {', '.join(COLUMNS)} FROM spots ORDER BY id", self.conn
+            )
+
+    def __len__(self) -> int:
+        with self.lck:
+            return self.conn.execute("SELECT COUNT(*) FROM spots").fetchone()[0]
+
+    def add_record(self, record: SpotRecord) -> None:
+        self.bulk_add([record])
+
+    def bulk_add(self, records: Iterable[SpotRecord]) -> None:
+        """Add many records in one transaction.
+
+        A record whose url is already in the catalogue is skipped, as the
+        CSV backend does. The check is part of the insert rather than a
+        UNIQUE constraint, which existing files holding duplicates could
+        not be given.
+        """
+        rows = [
+            [getattr(record, att) for att in COLUMNS] + [record.url]
+            for record in records
+        ]
+        with self.transaction():
+            self.conn.executemany(
+                f"INSERT INTO spots ({', '.join(COLUMNS)}) "
+                + f"SELECT {', '.join('?' * len(COLUMNS))} "
+                + "WHERE NOT EXISTS (SELECT 1 FROM spots WHERE url = ?)",
+                rows,
+            )
+
+    def del_record(self, record: SpotRecord, by_att: str = "name") -> None:
+        self.__check_column(by_att)
+        val = getattr(record, by_att)
+        with self.transaction():
+            row = self.conn.execute(
+                f"SELECT id FROM spots WHERE {by_att} = ? ORDER BY id LIMIT 1",
+                (val,),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"{val!r} is not in {by_att}")
+            self.conn.execute("DELETE FROM spots WHERE id = ?", row)
+
+    @contextmanager
+    def transaction(self):
+        """Commit the writes in the block together, or none if it raises."""
+        with self.lck:
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.conn.rollback()
+                raise
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.conn.commit()
+
+    def select(self, val, by_att: str = "name") -> SpotRecord:
+        return self.select_many([val], by_att)[0]
+
+    def select_many(self, vals, by_att: str = "name") -> list[SpotRecord]:
+        """Records for every value in vals, in the same order."""
+        self.__check_column(by_att)
+        vals = list(vals)
+        found: dict = {}
+        with self.lck:
+            # stay well under SQLite's bound parameter limit
+            for start in range(0, len(vals), 500):
+                chunk = vals[start : start + 500]
+                rows = self.conn.execute(
+                    f"SELECT {', '.join(COLUMNS)} FROM spots "
+                    + f"WHERE {by_att} IN ({', '.join('?' * len(chunk))}) ORDER BY id",
+                    chunk,
+                )
+                for row in rows:
+                    found.setdefault(row[COLUMNS.index(by_att)], SpotRecord(*row))
+        missing = [val for val in vals if val not in found]
+        if len(missing) > 0:
+            raise ValueError(f"{missing[0]!r} is not in {by_att}")
+        return [found[val] for val in vals]
+
+    def records(self) -> list[SpotRecord]:
+        with self.lck:
+            rows = self.conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM spots ORDER BY id"
+            )
+            return [SpotRecord(*row) for row in rows]
+
+    def names(self) -> list[str]:
+        with self.lck:
+            rows = self.conn.execute("SELECT name FROM spots ORDER BY id")
+            return [name for (name,) in rows]
+
+    def contains(self, val, by_att: str = "name") -> bool:
+        self.__check_column(by_att)
+        with self.lck:
+            row = self.conn.execute(
+                f"SELECT 1 FROM spots WHERE {by_att} = ? LIMIT 1", (val,)
+            ).fetchone()
+        return row is not None
+
+    def within_radius(self, loc: Location, miles: float) -> pd.DataFrame:
+        """Spots within miles of loc, nearest first, with a distance column."""
+        rows = self.__in_box(loc, miles)
+        df = pd.DataFrame(rows, columns=["id"] + COLUMNS)
+        distances = distance_miles_array(
+            loc,
+            df["latitude"].to_numpy(dtype=np.float64),
+            df["longitude"].to_numpy(dtype=np.float64),
+        )
+        df["distance"] = distances
+        df = df[distances <= miles]
+        # ties keep insertion order, like the CSV backend
+        df = df.sort_values(by=["distance", "id"], kind="stable")
+        return df.drop(columns="id").reset_index(drop=True)
+
+    def k_nearest(self, loc: Location, k: int) -> pd.DataFrame:
+        """The k spots nearest to loc, nearest first, with a distance column."""
+        miles = MILES_PER_DEGREE
+        while True:
+            df = self.within_radius(loc, miles)
+            if len(df) >= k or miles >= pi * EARTH_RADIUS_MILES:
+                return df.head(k)
+            miles *= 2
+
+    def flush(self) -> None:
+        """Writes are committed as they happen; kept for SurflineSpotDB parity."""
+        return None
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __in_box(self, loc: Location, miles: float) -> list[tuple]:
+        lat_min, lat_max, lon_span = search_box(loc, miles)
+        if lon_span >= 180.0:
+            lon_ranges = [(-180.0, 180.0)]
+        else:
+            west, east = loc.longitude - lon_span, loc.longitude + lon_span
+            # a box crossing the antimeridian is split in two
+            lon_ranges = [(max(west, -180.0), min(east, 180.0))]
+            if west < -180.0:
+                lon_ranges.append((west + 360.0, 180.0))
+            if east > 180.0:
+                lon_ranges.append((-180.0, east - 360.0))
+
+        select = (
+            f"SELECT spots.id, {', '.join('spots.' + c for c in COLUMNS)} FROM spots"
+        )
+        if self.rtree:
+            query = (
+                select
+                + " JOIN spots_rtree ON spots_rtree.id = spots.id"
+                + " WHERE spots_rtree.max_lat >= ? AND spots_rtree.min_lat <= ?"
+                + " AND spots_rtree.max_lon >= ? AND spots_rtree.min_lon <= ?"
+            )
+        else:
+            query = (
+                select + " WHERE latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?"
+            )
+
+        rows = []
+        with self.lck:
+            for (west, east) in lon_ranges:
+                rows.extend(self.conn.execute(query, (lat_min, lat_max, west, east)))
+        return rows
+
+    def __create_rtree(self) -> bool:
+        try:
+            self.conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS spots_rtree "
+                + "USING rtree(id, min_lat, max_lat, min_lon, max_lon)"
+            )
+        except sqlite3.OperationalError:
+            # SQLite built without the R*-tree module
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS spots_location "
+                + "ON spots (latitude, longitude)"
+            )
+            return False
+
+        # the triggers keep the tree in step with every write to spots
+        self.conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS spots_rtree_insert AFTER INSERT ON spots "
+            + "WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN "
+            + "INSERT INTO spots_rtree VALUES (new.id, new.latitude, new.latitude, "
+            + "new.longitude, new.longitude); END"
+        )
+        self.conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS spots_rtree_delete AFTER DELETE ON spots "
+            + "BEGIN DELETE FROM spots_rtree WHERE id = old.id; END"
+        )
+        return True
+
+    @staticmethod
+    def __check_column(by_att: str) -> None:
+        # column names are interpolated into the SQL, so only allow real ones
+        if by_att not in COLUMNS:
+            raise KeyError(by_att)
@@ -0,0 +1,8 @@
+import os
+
+from surfsup.utils import joinpath
+
+
+def fixture_path(fname: str) -> str:
+    """Path of fname in test/testfiles."""
+    return joinpath(os.getcwd(), "test", "testfiles", fname)
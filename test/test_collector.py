@@ -0,0 +1,139 @@
+import os
+import random
+import shutil
+import unittest
+
+from surfsup.dto.forecast_history import ForecastHistory
+from surfsup.surfline.collector import Collector
+from surfsup.surfline.forecast_cache import ForecastCache
+from surfsup.surfline.rate_limit import TokenBucket
+from surfsup.utils import joinpath
+from test.helpers import fixture_path
+
+
+class FakeClock:
+    def __init__(self):
+        # 2022-06-01 00:00 UTC
+        self.now = 1654041600.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def spot_data(height: float) -> dict:
+    wave = {
+        "human": True,
+        "min": height,
+        "max": height + 1,
+        "occasional": None,
+        "humanRelation": "",
+        "plus": False,
+    }
+    return {"forecast": {"note": "", "waveHeight": wave}}
+
+
+class TestCollector(unittest.TestCase):
+    TEST_ROOT = "tmp_collector_history"
+    SPOTS = ["Blacks", "Blackies", "La Jolla Shores", "Swamis"]
+
+    def setUp(self) -> None:
+        self.root = fixture_path(self.TEST_ROOT)
+        self.clock = FakeClock()
+        self.history = ForecastHistory(self.root)
+        self.requests: list[tuple[str, float]] = []
+        self.budget = None
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def fetch(self, name: str) -> dict:
+        # the token is taken by the request, as the limiter of SurflineAPI does
+        if self.budget is not None:
+            self.assertTrue(self.budget.try_acquire())
+        self.requests.append((name, self.clock.now))
+        if name == "Swamis":
+            raise ValueError("status 500")
+        return spot_data(3)
+
+    def collector(self, **kwargs) -> Collector:
+        return Collector(
+            self.fetch,
+            lambda: self.SPOTS,
+            self.history,
+            clock=self.clock,
+            sleep=self.clock.sleep,
+            rng=random.Random(7),
+            **kwargs,
+        )
+
+    def test_spreads_requests(self):
+        collector = self.collector(interval=400, jitter=0.5)
+        stats = collector.run_cycle()
+        self.assertEqual(stats.planned, 4)
+        self.assertEqual(stats.fetched, 3)
+        self.assertEqual(stats.failed, 1)
+
+        # one request per 100s slot, never before the slot starts
+        offsets = [at - 1654041600.0 for (_, at) in self.requests]
+        for (i, offset) in enumerate(offsets):
+            self.assertGreaterEqual(offset, 100 * i)
+            self.assertLess(offset, 100 * i + 50)
+        self.assertEqual(stats.max_lag, 0)
+        self.assertEqual(len(self.history.read()), 3)
+
+    def test_budget_stretches_cycle(self):
+        self.budget = TokenBucket.per_minute(1, clock=self.clock)
+        collector = self.collector(interval=4, budget=self.budget, jitter=0)
+        # the bucket starts with a minute of burst, spend it first
+        self.budget.try_acquire()
+        stats = collector.run_cycle()
+        gaps = [b - a for ((_, a), (_, b)) in zip(self.requests, self.requests[1:])]
+        for gap in gaps:
+            self.assertAlmostEqual(gap, 60)
+        self.assertGreater(stats.max_lag, 100)
+        self.assertGreater(stats.elapsed, 4)
+
+    def test_stop_while_waiting_for_budget(self):
+        self.budget = TokenBucket.per_minute(1, clock=self.clock)
+        collector = self.collector(interval=4, budget=self.budget, jitter=0)
+        self.budget.try_acquire()
+
+        def stop_on_sleep(seconds: float) -> None:
+            collector.stopped.set()
+
+        collector.sleep = stop_on_sleep
+        stats = collector.run_cycle()
+        self.assertEqual(self.requests, [])
+        self.assertEqual(stats.fetched + stats.failed, 0)
+
+    def test_skips_fresh_spots(self):
+        cache = ForecastCache(ttl=300, clock=self.clock)
+        cache.put("Blackies", spot_data(5))
+        collector = self.collector(interval=400, max_age=1000, cache=cache)
+        stats = collector.run_cycle()
+        self.assertEqual(stats.from_cache, 1)
+        self.assertNotIn("Blackies", [name for (name, _) in self.requests])
+
+        # within max_age nothing but the failed spot is fetched again
+        self.requests.clear()
+        stats = collector.run_cycle()
+        self.assertEqual(stats.skipped_fresh, 3)
+        self.assertEqual([name for (name, _) in self.requests], ["Swamis"])
+
+        # a restarted collector picks up what the history already holds
+        self.requests.clear()
+        restarted = self.collector(interval=400, max_age=1000)
+        restarted.run_cycle()
+        self.assertEqual([name for (name, _) in self.requests], ["Swamis"])
+
+    def test_run_compacts_past_days(self):
+        collector = self.collector(interval=60 * 60 * 12, max_age=0)
+        collector.run(cycles=3)
+        days = self.history.days()
+        self.assertEqual(len(days), 2)
+        day_dir = joinpath(self.root, f"day={days[0].isoformat()}")
+        self.assertEqual(len(os.listdir(day_dir)), 1)
+        self.assertEqual(len(self.history.read()), 9)
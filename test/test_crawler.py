@@ -0,0 +1,175 @@
+import os
+import threading
+import time
+import unittest
+from collections import Counter
+
+from genericpath import exists
+from surfsup.surfline.crawler import Crawler, Page, canonicalize_url, gather_links
+from surfsup.surfline.page_store import PageStore
+from surfsup.surfline.rate_limit import HostThrottle
+from test.helpers import fixture_path
+
+
+def page_html(*hrefs: str) -> bytes:
+    return "".join(f'<a href="{href}">link</a>' for href in hrefs).encode()
+
+
+BASE = "https://www.surfline.com"
+SITE = {
+    f"{BASE}/surf-reports-forecasts-cams": page_html(
+        "/surf-reports-forecasts-cams/us", "/surf-report/blacks/1#cams"
+    ),
+    f"{BASE}/surf-reports-forecasts-cams/us": page_html(
+        "/surf-report/blacks/1/",
+        "https://WWW.surfline.com/surf-report/pipeline/2?view=full",
+        "/surf-report/broken/3",
+        "https://example.com/elsewhere",
+    ),
+    f"{BASE}/surf-report/blacks/1": page_html("/surf-reports-forecasts-cams/us"),
+    f"{BASE}/surf-report/pipeline/2": page_html("/surf-report/blacks/1"),
+}
+
+
+class TestCrawler(unittest.TestCase):
+    TEST_CHECKPOINT = "tmp_crawl_checkpoint.json"
+    TEST_PAGE_STORE = "tmp_crawl_pages.sqlite3"
+
+    def setUp(self) -> None:
+        self.fetched = Counter()
+        self.reports = []
+        self.checkpoint_path = fixture_path(self.TEST_CHECKPOINT)
+        self.site = dict(SITE)
+        self.etags = {}
+        self.conditional = []
+
+    def fake_fetch(self, url: str, headers: dict) -> Page:
+        self.fetched[url] += 1
+        if url not in self.site:
+            return Page(url, 404, b"")
+        etag = self.etags.get(url)
+        if etag is not None and headers.get("If-None-Match") == etag:
+            self.conditional.append(url)
+            return Page(url, 304, b"")
+        return Page(url, 200, self.site[url], {"etag": etag} if etag else {})
+
+    def crawler(self, **kwargs) -> Crawler:
+        return Crawler.resume(
+            self.checkpoint_path,
+            is_report=lambda url: "/surf-report/" in url,
+            follow=lambda url: url.startswith(BASE),
+            on_report=lambda page: self.reports.append(page.url),
+            fetch=self.fake_fetch,
+            delay=0.0,
+            **kwargs,
+        )
+
+    def test_canonicalize_url(self):
+        self.assertEqual(
+            canonicalize_url("HTTPS://WWW.Surfline.com:443/surf-report/a/1/?x=1#y"),
+            f"{BASE}/surf-report/a/1",
+        )
+        self.assertEqual(canonicalize_url("b", f"{BASE}/a/"), f"{BASE}/a/b")
+        self.assertIsNone(canonicalize_url("mailto:someone@surfline.com"))
+        self.assertEqual(
+            gather_links(page_html("../x", "javascript:void(0)"), f"{BASE}/a/b"),
+            [f"{BASE}/x"],
+        )
+
+    def test_crawl_fetches_each_page_once(self):
+        crawler = self.crawler(max_workers=4)
+        crawler.state.enqueue(f"{BASE}/surf-reports-forecasts-cams")
+        state = crawler.run()
+
+        self.assertEqual(set(self.fetched.values()), {1})
+        self.assertEqual(len(self.fetched), 5)
+        self.assertEqual(
+            sorted(self.reports),
+            [f"{BASE}/surf-report/blacks/1", f"{BASE}/surf-report/pipeline/2"],
+        )
+        self.assertEqual(state.errors, [f"{BASE}/surf-report/broken/3"])
+
+    def test_resume_from_checkpoint(self):
+        crawler = self.crawler(max_workers=1, checkpoint_every=1)
+        crawler.state.enqueue(f"{BASE}/surf-reports-forecasts-cams")
+        crawler.run(max_pages=2)
+        self.assertTrue(exists(self.checkpoint_path))
+        self.assertEqual(len(self.fetched), 2)
+
+        resumed = self.crawler(max_workers=2)
+        self.assertEqual(resumed.state.pages, 2)
+        resumed.run()
+
+        self.assertEqual(set(self.fetched.values()), {1})
+        self.assertEqual(len(self.fetched), 5)
+        self.assertEqual(len(self.reports), 2)
+
+    def test_host_throttle(self):
+        throttle = HostThrottle(delay=0.0, max_per_host=2)
+        active = Counter()
+        peak = Counter()
+        lck = threading.Lock()
+
+        def request(host: str):
+            throttle.acquire(host)
+            with lck:
+                active[host] += 1
+                peak[host] = max(peak[host], active[host])
+            time.sleep(0.01)
+            with lck:
+                active[host] -= 1
+            throttle.release(host)
+
+        threads = [
+            threading.Thread(target=request, args=(host,)) for host in ["a", "b"] * 6
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(peak, Counter({"a": 2, "b": 2}))
+
+        # starts to one host are spaced by delay
+        slept = []
+        spaced = HostThrottle(delay=1.0, max_per_host=5, clock=lambda: 0.0)
+        spaced.sleep = slept.append
+        for _ in range(3):
+            spaced.acquire("a")
+        spaced.acquire("b")
+        self.assertEqual(slept, [1.0, 2.0])
+
+    def test_incremental_crawl(self):
+        start = f"{BASE}/surf-reports-forecasts-cams"
+        store = PageStore(fixture_path(self.TEST_PAGE_STORE))
+        self.etags = {f"{BASE}/surf-reports-forecasts-cams/us": '"v1"'}
+        crawler = self.crawler(page_store=store)
+        crawler.state.enqueue(start)
+        crawler.run()
+        self.assertEqual(len(store), 4)
+        self.assertIn(start, store.urls())
+        self.assertEqual(len(self.reports), 2)
+        self.assertEqual(self.conditional, [])
+
+        # pipeline changes, the region page answers 304, the rest are unchanged
+        self.site[f"{BASE}/surf-report/pipeline/2"] = page_html("/surf-report/new/4")
+        self.site[f"{BASE}/surf-report/new/4"] = page_html()
+        self.reports.clear()
+        os.remove(self.checkpoint_path)
+        crawler = self.crawler(page_store=store, incremental=True)
+        crawler.state.enqueue(start)
+        state = crawler.run()
+
+        self.assertEqual(self.conditional, [f"{BASE}/surf-reports-forecasts-cams/us"])
+        self.assertEqual(
+            sorted(self.reports),
+            [f"{BASE}/surf-report/new/4", f"{BASE}/surf-report/pipeline/2"],
+        )
+        self.assertEqual(state.unchanged, 3)
+        self.assertEqual(len(store), 5)
+
+    def tearDown(self) -> None:
+        for fname in [self.TEST_CHECKPOINT, self.TEST_PAGE_STORE]:
+            if exists(fixture_path(fname)):
+                os.remove(fixture_path(fname))
+
+        return super().tearDown()
@@ -0,0 +1,104 @@
+import unittest
+
+import pandas as pd
+
+from surfsup.dto.forecast_batch import ForecastBatch
+from surfsup.dto.forecast_frame import forecast_frame
+from surfsup.dto.forecast_dto import (
+    ConditionRecord,
+    ForecastRecord,
+    SwellRecord,
+    TideCollectionRecord,
+    TideRecord,
+    WaveHeightRecord,
+    WeatherRecord,
+    WindRecord,
+)
+
+
+def make_forecast(height: float, nswells: int = 2) -> ForecastRecord:
+    return ForecastRecord(
+        "Minimal surf",
+        ConditionRecord(True, "FAIR", False),
+        WindRecord(5, 270.5),
+        [SwellRecord(height + i, 12, 260.0, 250.0) for i in range(nswells)],
+        WaveHeightRecord(True, height, height + 1, None, "waist", True),
+        TideCollectionRecord(
+            TideRecord("LOW", 0.5, 1650000000, -7),
+            TideRecord("NORMAL", 2.5, 1650003600, -7),
+            TideRecord("HIGH", 4.1, 1650020000, -7),
+        ),
+        WeatherRecord(60, 62, 70, "CLEAR"),
+    )
+
+
+class TestForecastBatch(unittest.TestCase):
+    def test_slots(self):
+        fcst = make_forecast(3)
+        self.assertFalse(hasattr(fcst, "__dict__"))
+        self.assertFalse(hasattr(fcst.wind, "__dict__"))
+        with self.assertRaises(AttributeError):
+            fcst.wind.gusts = 10
+
+    def test_round_trip(self):
+        forecasts = {
+            "Blacks": make_forecast(3.1),
+            "Blackies": make_forecast(1, nswells=0),
+            "Swamis": make_forecast(2, nswells=1),
+        }
+        batch = ForecastBatch.from_records(forecasts)
+        self.assertEqual(len(batch), 3)
+        self.assertEqual(batch.columns["wave_height.min"].tolist(), [3.1, 1.0, 2.0])
+        self.assertEqual(batch.swell_offsets.tolist(), [0, 2, 2, 3])
+        self.assertEqual(batch.to_records(), forecasts)
+
+    def test_missing_parts(self):
+        partial = ForecastRecord("", None, None, None, None, None, None)
+        forecasts = {"Blacks": partial, "Swamis": make_forecast(2)}
+        batch = ForecastBatch.from_records(forecasts)
+        self.assertEqual(batch.columns["wind"].tolist(), [False, True])
+        self.assertEqual(batch.to_records(), forecasts)
+
+        self.assertEqual(ForecastBatch.from_records({}).to_records(), {})
+
+    def test_round_trip_keeps_nones_and_ints(self):
+        fcst = make_forecast(2)
+        fcst.note = None
+        fcst.conditions.value = None
+        fcst.wave_height.human = None
+        fcst.tide.previous.timestamp = None
+        fcst.tide.current = None
+        no_next = make_forecast(3.5)
+        no_next.tide.next = None
+        forecasts = {"Blacks": fcst, "Swamis": no_next}
+
+        back = ForecastBatch.from_records(forecasts).to_records()
+        self.assertEqual(back, forecasts)
+        self.assertIsNone(back["Blacks"].note)
+        self.assertIsNone(back["Blacks"].conditions.value)
+        self.assertIsNone(back["Blacks"].wave_height.human)
+        self.assertIsNone(back["Blacks"].tide.previous.timestamp)
+        self.assertIsNone(back["Blacks"].tide.current)
+        self.assertIsNone(back["Swamis"].tide.next)
+        self.assertEqual(back["Swamis"].note, "Minimal surf")
+
+        # == would not tell 12 from 12.0
+        swamis = back["Swamis"]
+        self.assertIs(type(swamis.wind.speed), int)
+        self.assertIs(type(swamis.wind.direction), float)
+        self.assertIs(type(swamis.swells[0].period), int)
+        self.assertIs(type(swamis.wave_height.max), float)
+        self.assertIs(type(swamis.tide.previous.timestamp), int)
+        self.assertIs(type(swamis.weather.temperature), int)
+
+    def test_to_frame(self):
+        forecasts = {
+            "Blacks": make_forecast(3.1),
+            "Blackies": make_forecast(1, nswells=0),
+            "Swamis": ForecastRecord("", None, None, None, None, None, None),
+        }
+        expected = forecast_frame(forecasts)
+        pd.testing.assert_frame_equal(
+            ForecastBatch.from_records(forecasts).to_frame(), expected
+        )
+        self.assertEqual(expected["swell_ht"].isna().tolist(), [False, True, True])
@@ -0,0 +1,196 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from surfsup.surfline.forecast_cache import ForecastCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestForecastCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.cache = ForecastCache(
+            ttl=60, stale_ttl=120, negative_ttl=10, clock=self.clock
+        )
+        self.calls = 0
+
+    def fetch(self):
+        self.calls += 1
+        return {"calls": self.calls}
+
+    def wait_for_refresh(self, key):
+        while key in self.cache.inflight:
+            time.sleep(0.001)
+
+    def test_hit_and_miss(self):
+        self.assertEqual({"calls": 1}, self.cache.get("Blacks", self.fetch))
+        self.assertEqual({"calls": 1}, self.cache.get("Blacks", self.fetch))
+        self.assertEqual(1, self.calls)
+        self.assertEqual(1, self.cache.stats.misses)
+        self.assertEqual(1, self.cache.stats.hits)
+
+    def test_serves_stale_while_refreshing(self):
+        self.cache.get("Blacks", self.fetch)
+        self.clock.now += 90
+
+        # expired: the stale value is served while a refresh runs
+        self.assertEqual({"calls": 1}, self.cache.get("Blacks", self.fetch))
+        self.wait_for_refresh("Blacks")
+        self.assertEqual(1, self.cache.stats.stale)
+        self.assertEqual(1, self.cache.stats.refreshes)
+        self.assertEqual({"calls": 2}, self.cache.get("Blacks", self.fetch))
+
+    def test_too_stale_is_a_miss(self):
+        self.cache.get("Blacks", self.fetch)
+        self.clock.now += 60 + 120
+        self.assertEqual({"calls": 2}, self.cache.get("Blacks", self.fetch))
+        self.assertEqual(2, self.cache.stats.misses)
+
+    def test_failed_refresh_keeps_stale_value(self):
+        self.cache.get("Blacks", self.fetch)
+        self.clock.now += 90
+
+        def broken():
+            raise ConnectionError("surfline is down")
+
+        self.assertEqual({"calls": 1}, self.cache.get("Blacks", broken))
+        self.wait_for_refresh("Blacks")
+        self.assertEqual({"calls": 1}, self.cache.get("Blacks", broken))
+        self.assertEqual(1, self.cache.stats.refreshes)
+
+    def test_coalesces_concurrent_misses(self):
+        release = threading.Event()
+
+        def slow_fetch():
+            release.wait()
+            return self.fetch()
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(self.cache.get("Blacks", slow_fetch))
+            )
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        while self.cache.stats.misses + self.cache.stats.coalesced < 8:
+            time.sleep(0.001)
+        release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(1, self.calls)
+        self.assertEqual([{"calls": 1}] * 8, results)
+        self.assertEqual(7, self.cache.stats.coalesced)
+
+    def test_negative_caching(self):
+        def broken():
+            self.calls += 1
+            raise ConnectionError("surfline is down")
+
+        for _ in range(3):
+            with self.assertRaises(ConnectionError):
+                self.cache.get("Blacks", broken)
+        self.assertEqual(1, self.calls)
+        self.assertEqual(2, self.cache.stats.negative_hits)
+
+        self.clock.now += 10
+        self.assertEqual({"calls": 2}, self.cache.get("Blacks", self.fetch))
+
+    def test_interrupted_fetch_releases_waiters(self):
+        errors = []
+
+        def waiter():
+            try:
+                self.cache.get("Blacks", self.fetch)
+            except RuntimeError as exc:
+                errors.append(exc)
+
+        thread = threading.Thread(target=waiter)
+
+        def interrupted():
+            thread.start()
+            while self.cache.stats.coalesced < 1:
+                time.sleep(0.001)
+            raise KeyboardInterrupt()
+
+        with self.assertRaises(KeyboardInterrupt):
+            self.cache.get("Blacks", interrupted)
+        thread.join(5)
+        self.assertEqual(1, len(errors))
+        self.assertNotIn("Blacks", self.cache.inflight)
+        self.assertNotIn("Blacks", self.cache)
+
+    def test_async_coalesces_with_misses(self):
+        async def afetch():
+            await asyncio.sleep(0.01)
+            return self.fetch()
+
+        async def run():
+            return await asyncio.gather(
+                *[self.cache.aget("Blacks", afetch) for _ in range(8)]
+            )
+
+        self.assertEqual([{"calls": 1}] * 8, asyncio.run(run()))
+        self.assertEqual(1, self.calls)
+        self.assertEqual(7, self.cache.stats.coalesced)
+
+    def test_async_stale_and_negative(self):
+        async def afetch():
+            return self.fetch()
+
+        async def broken():
+            self.calls += 1
+            raise ConnectionError("surfline is down")
+
+        async def run():
+            await self.cache.aget("Blacks", afetch)
+            self.clock.now += 90
+            stale = await self.cache.aget("Blacks", afetch)
+            await self.cache.drain_refreshes()
+            fresh = await self.cache.aget("Blacks", afetch)
+            return (stale, fresh)
+
+        self.assertEqual(({"calls": 1}, {"calls": 2}), asyncio.run(run()))
+        self.assertEqual(1, self.cache.stats.refreshes)
+
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                asyncio.run(self.cache.aget("Kelly Slater", broken))
+        self.assertEqual(3, self.calls)
+        self.assertEqual(1, self.cache.stats.negative_hits)
+
+    def test_cancelled_async_refresh_backs_off(self):
+        async def afetch():
+            await asyncio.sleep(10)
+            return self.fetch()
+
+        self.cache.put("Blacks", {"calls": 0})
+        self.clock.now += 90
+
+        async def run():
+            return await self.cache.aget("Blacks", afetch)
+
+        # the loop ends with the refresh still running and cancels it
+        self.assertEqual({"calls": 0}, asyncio.run(run()))
+        self.assertNotIn("Blacks", self.cache.inflight)
+        self.assertEqual({"calls": 0}, asyncio.run(run()))
+        self.assertEqual(1, self.cache.stats.refreshes)
+
+    def test_evicts_least_recently_used(self):
+        cache = ForecastCache(maxsize=2, clock=self.clock)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a", self.fetch)
+        cache.put("c", 3)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
@@ -0,0 +1,103 @@
+import gzip
+import os
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+from surfsup.dto.forecast_dto import (
+    ConditionRecord,
+    ForecastRecord,
+    WaveHeightRecord,
+    WindRecord,
+)
+from surfsup.dto.forecast_export import ForecastCSVWriter, csv_value
+from surfsup.dto.forecast_parser import ForecastFetcher
+from surfsup.dto.forecast_schema import FORECAST_COLUMNS
+from test.helpers import fixture_path
+
+
+def make_forecast(height: float) -> ForecastRecord:
+    return ForecastRecord(
+        "",
+        ConditionRecord(True, "FAIR", False),
+        WindRecord(5, 270.5),
+        [],
+        WaveHeightRecord(True, height, height + 1, None, "waist", False),
+        None,
+        None,
+    )
+
+
+class TestForecastExport(unittest.TestCase):
+    TEST_CSV = fixture_path("tmp_export.csv")
+    TEST_GZ = fixture_path("tmp_export.csv.gz")
+
+    def tearDown(self) -> None:
+        for path in [self.TEST_CSV, self.TEST_GZ]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_csv_value(self):
+        self.assertEqual(csv_value(float("nan")), "")
+        self.assertEqual(csv_value(None, "NULL"), "NULL")
+        self.assertEqual(csv_value(1650000000.0), "1650000000")
+        self.assertEqual(csv_value(3.1), "3.1")
+
+    def test_header_once(self):
+        partial = ForecastRecord("", None, None, None, None, None, None)
+        for _ in range(2):
+            with ForecastCSVWriter(self.TEST_CSV, batch_size=2) as out:
+                out.write_all([("Blacks", make_forecast(3)), ("Swamis", partial)])
+
+        with open(self.TEST_CSV) as fin:
+            lines = fin.read().splitlines()
+        self.assertEqual(lines[0], ",".join(FORECAST_COLUMNS))
+        self.assertEqual(len(lines), 5)
+        # every row has every column, even when the forecast is empty
+        self.assertTrue(all(l.count(",") == len(FORECAST_COLUMNS) - 1 for l in lines))
+
+        df = pd.read_csv(self.TEST_CSV)
+        self.assertEqual(list(df.columns), FORECAST_COLUMNS)
+        self.assertEqual(df["wave_max"][0], 4.0)
+        self.assertTrue(df["wave_max"].isna()[1])
+
+    def test_batches(self):
+        out = ForecastCSVWriter(self.TEST_CSV, append=False, batch_size=3)
+        for i in range(7):
+            out.write(f"spot-{i}", make_forecast(i))
+        self.assertEqual(out.written, 6)
+        out.close()
+        self.assertEqual(out.written, 7)
+        self.assertEqual(len(pd.read_csv(self.TEST_CSV)), 7)
+
+    def test_gzip_append(self):
+        for i in range(2):
+            with ForecastCSVWriter(self.TEST_GZ) as out:
+                out.write(f"spot-{i}", make_forecast(i))
+        with gzip.open(self.TEST_GZ, "rt") as fin:
+            self.assertEqual(len(fin.read().splitlines()), 3)
+        self.assertEqual(
+            pd.read_csv(self.TEST_GZ)["name"].tolist(), ["spot-0", "spot-1"]
+        )
+
+    def test_stream_export(self):
+        fetcher = ForecastFetcher(fixture_path("init_fake_db.csv"), nthreads=2)
+        calls = []
+        data = {"forecast": {"note": "", "wind": {"speed": 5, "direction": 270}}}
+
+        def spot_check(name: str) -> dict:
+            calls.append(name)
+            return data if len(calls) > 1 else {}
+
+        with patch("surfsup.surfline.api.SurflineAPI.spot_check") as mock_obj:
+            mock_obj.side_effect = spot_check
+            rows = fetcher.export(self.TEST_CSV, ["Blacks"] * 9)
+
+        self.assertEqual(rows, 8)
+        self.assertEqual(len(calls), 9)
+        self.assertEqual(fetcher.last_report.requested, 9)
+        df = pd.read_csv(self.TEST_CSV)
+        self.assertEqual(df["name"].tolist(), ["Blacks"] * 8)
+        self.assertEqual(df["wind_speed"].tolist(), [5] * 8)
+        self.assertTrue(df["wave_max"].isna().all())
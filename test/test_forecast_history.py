@@ -0,0 +1,99 @@
+import math
+import os
+import shutil
+import unittest
+from datetime import date, datetime, timezone
+
+import numpy as np
+
+from surfsup.dto.forecast_dto import (
+    ConditionRecord,
+    ForecastRecord,
+    SwellRecord,
+    TideCollectionRecord,
+    TideRecord,
+    WaveHeightRecord,
+    WeatherRecord,
+    WindRecord,
+)
+from surfsup.dto.forecast_history import ForecastHistory
+from surfsup.dto.forecast_schema import FORECAST_COLUMNS, flatten_forecast
+from surfsup.excepts import InvalidSchemaException
+from surfsup.utils import joinpath
+from test.helpers import fixture_path
+
+
+def make_forecast(height: float) -> ForecastRecord:
+    tide = TideRecord("NORMAL", 2.5, 1650000000, -7)
+    return ForecastRecord(
+        "",
+        ConditionRecord(True, "FAIR", False),
+        WindRecord(5, 270.0),
+        [SwellRecord(height, 12, 260.0, 250.0)],
+        WaveHeightRecord(True, height, height + 1, None, "waist", False),
+        TideCollectionRecord(tide, tide, tide),
+        WeatherRecord(60, 62, 70, "CLEAR"),
+    )
+
+
+def timestamp(day: int, hour: int = 12) -> float:
+    return datetime(2022, 6, day, hour, tzinfo=timezone.utc).timestamp()
+
+
+class TestForecastHistory(unittest.TestCase):
+    TEST_ROOT = "tmp_forecast_history"
+
+    def setUp(self) -> None:
+        self.root = fixture_path(self.TEST_ROOT)
+        self.history = ForecastHistory(self.root)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_flatten_missing(self):
+        fcst = ForecastRecord("", None, None, [], None, None, None)
+        row = flatten_forecast("Blacks", fcst, timestamp(1))
+        self.assertEqual(list(row.keys()), FORECAST_COLUMNS)
+        self.assertEqual(row["conditions"], "")
+        self.assertTrue(math.isnan(row["wave_max"]))
+        self.assertTrue(math.isnan(row["ntide_ts"]))
+
+    def test_append_read(self):
+        self.history.append(
+            {"Blacks": make_forecast(3), "Swamis": make_forecast(2)}, timestamp(1)
+        )
+        self.history.append({"Blacks": make_forecast(4)}, timestamp(2))
+        self.assertEqual(self.history.days(), [date(2022, 6, 1), date(2022, 6, 2)])
+
+        full = self.history.read()
+        self.assertEqual(list(full.columns), FORECAST_COLUMNS)
+        self.assertEqual(len(full), 3)
+        self.assertEqual(full["wave_max"].dtype, np.float32)
+
+        day = self.history.read(date(2022, 6, 2), date(2022, 6, 2))
+        self.assertEqual(day["name"].tolist(), ["Blacks"])
+        self.assertEqual(day["wave_min"].tolist(), [4.0])
+
+        blacks = self.history.read(spots=["Blacks"], columns=["name", "swell_ht"])
+        self.assertEqual(list(blacks.columns), ["name", "swell_ht"])
+        self.assertEqual(blacks["swell_ht"].tolist(), [3.0, 4.0])
+
+        self.assertEqual(len(self.history.read(spots=["Pipeline"])), 0)
+        self.assertEqual(len(self.history.read(start=date(2022, 7, 1))), 0)
+
+    def test_compact(self):
+        for hour in range(3):
+            self.history.append({"Blacks": make_forecast(hour)}, timestamp(1, hour))
+        day_dir = joinpath(self.root, "day=2022-06-01")
+        self.assertEqual(len(os.listdir(day_dir)), 3)
+
+        self.history.compact(date(2022, 6, 1))
+        self.assertEqual(len(os.listdir(day_dir)), 1)
+        self.assertEqual(self.history.read()["wave_min"].tolist(), [0.0, 1.0, 2.0])
+
+    def test_invalid_schema(self):
+        day_dir = joinpath(self.root, "day=2022-06-01")
+        os.makedirs(day_dir)
+        np.savez_compressed(joinpath(day_dir, "part-0.npz"), name=np.array(["x"]))
+        with self.assertRaises(InvalidSchemaException):
+            self.history.read()
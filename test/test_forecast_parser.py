@@ -1,10 +1,21 @@
+import asyncio
 from genericpath import exists
 import os
+import time
 import unittest
 from pprint import PrettyPrinter
 from unittest.mock import patch
 
-from surfsup.dto.forecast_parser import ForecastFetcher, or_none
+import numpy as np
+import pandas as pd
+
+from surfsup.dto.fetch_report import FetchProgress, FetchReport
+from surfsup.dto.forecast_batch import ForecastBatch
+from surfsup.dto.forecast_parser import (
+    ForecastFetcher,
+    or_none,
+    parse_forecast_info,
+)
 from surfsup.dto.forecast_dto import *
 from surfsup.utils import joinpath
 
@@ -34,14 +45,100 @@ class TestForecastParser(unittest.TestCase):
             forecasts = self.forecast_fetcher.runner()
             self.assertEqual(
                 len(self.forecast_fetcher.surfline.get_spot_names()),
-                len(forecasts) + len(self.forecast_fetcher.err_tracker),
+                len(forecasts) + self.forecast_fetcher.last_report.failed,
             )
 
+    def test_runner_report(self):
+        fetcher = ForecastFetcher(test_joinpath("init_fake_db.csv"))
+        progress = []
+        with patch("surfsup.surfline.api.SurflineAPI.spot_check") as mock_obj:
+            mock_obj.side_effect = ConnectionError("surfline is down")
+            forecasts = fetcher.runner(["Blacks"], on_progress=progress.append)
+            self.assertEqual({}, forecasts)
+            self.assertEqual(1, fetcher.last_report.failed)
+            self.assertIn("Blacks", fetcher.last_report.errors)
+            self.assertEqual([FetchProgress(0, 1, 0)], progress)
+
+            # a new run starts from a fresh report
+            mock_obj.side_effect = None
+            mock_obj.return_value = self.fake_spot_check_response()
+            forecasts = fetcher.runner(["Blacks"], on_progress=progress.append)
+            self.assertEqual(["Blacks"], list(forecasts.keys()))
+            self.assertEqual(0, fetcher.last_report.failed)
+            self.assertEqual(FetchProgress(1, 0, 0), progress[-1])
+            self.assertIn("Blacks", fetcher.last_report.latencies)
+
+    def test_top_sorted(self):
+        fcst = parse_forecast_info(self.fake_spot_check_response()["forecast"])
+        forecasts = {"Blackies": fcst, "Blacks": fcst, "La Jolla Shores": fcst}
+        best = self.forecast_fetcher.top_sorted(forecasts, 6, n=2)
+        self.assertEqual(["Blackies", "Blacks"], list(best["name"]))
+        self.assertIn("sortable", best.columns)
+
+        batch = ForecastBatch.from_records(forecasts)
+        from_batch = self.forecast_fetcher.top_sorted(batch, 6, n=2)
+        pd.testing.assert_frame_equal(best, from_batch)
+
+    def test_snapshot(self):
+        fetcher = ForecastFetcher(test_joinpath("init_fake_db.csv"))
+        with patch("surfsup.surfline.api.SurflineAPI.spot_check") as mock_obj:
+            mock_obj.return_value = self.fake_spot_check_response()
+            batch = fetcher.snapshot(["Blacks"])
+        self.assertIsInstance(batch, ForecastBatch)
+        self.assertEqual(["Blacks"], batch.names.tolist())
+        expected = parse_forecast_info(self.fake_spot_check_response()["forecast"])
+        self.assertEqual({"Blacks": expected}, batch.to_records())
+
+    def test_to_df(self):
+        fcst = parse_forecast_info(self.fake_spot_check_response()["forecast"])
+        partial = ForecastRecord("", None, None, [], None, None, None)
+        df = self.forecast_fetcher.to_df({"Blacks": fcst, "Swamis": partial})
+        self.assertEqual(["Blacks", "Swamis"], list(df["name"]))
+        self.assertEqual("category", df["conditions"].dtype.name)
+        self.assertEqual(np.float64, df["wave_max"].dtype)
+        self.assertEqual(fcst.wave_height.max, df["wave_max"][0])
+        self.assertTrue(df.iloc[1][["wind_dir", "wave_min", "swell_ht"]].isna().all())
+        self.assertTrue(pd.isna(df["conditions"][1]))
+
+    def test_report_percentile(self):
+        report = FetchReport(100)
+        for i in range(100):
+            report.record_latency(f"spot-{i}", float(i + 1))
+        self.assertEqual(50.0, report.percentile(50))
+        self.assertEqual(99.0, report.percentile(99))
+        self.assertEqual(0.0, FetchReport(0).percentile(99))
+
     def test_small_runner(self):
         names: list[str] = ["Blackies", "Blacks", "La Jolla Shores"]
         forecasts = self.forecast_fetcher.runner(names)
         self.assertEqual(3, len(forecasts))
 
+    def test_async_runner(self):
+        fetcher = ForecastFetcher(test_joinpath("init_fake_db.csv"))
+        with patch("surfsup.surfline.api.SurflineAPI.async_spot_check") as mock_obj:
+            mock_obj.return_value = self.fake_spot_check_response()
+            forecasts = asyncio.run(fetcher.arunner(["Blacks"]))
+            self.assertEqual(["Blacks"], list(forecasts.keys()))
+            self.assertIsInstance(forecasts["Blacks"], ForecastRecord)
+
+    def test_async_runner_finishes_stale_refreshes(self):
+        fetcher = ForecastFetcher(test_joinpath("init_fake_db.csv"))
+        cache = fetcher.surfline.cache
+        cache.put(
+            "Blacks", self.fake_spot_check_response(), time.time() - cache.ttl - 1
+        )
+        fresh = self.fake_spot_check_response()
+        fresh["forecast"]["note"] = "refreshed"
+
+        async def afetch(session, name):
+            await asyncio.sleep(0.01)
+            self.assertFalse(session.closed)
+            return fresh
+
+        with patch.object(fetcher.surfline, "_afetch_spot", afetch):
+            asyncio.run(fetcher.arunner(["Blacks"]))
+        self.assertIs(fresh, cache.fresh("Blacks"))
+
     def test_csv_export(self):
         csv_name = test_joinpath(self.TMP_CSV_NAME)
 
@@ -0,0 +1,208 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from surfsup.surfline.api import SurflineAPI
+from surfsup.surfline.hedging import Hedger, LatencyTracker, shared_hedge_pool
+from surfsup.surfline.rate_limit import AdaptiveLimiter
+from test.helpers import fixture_path
+
+
+def warmed(latency: float = 0.01, **kwargs) -> Hedger:
+    """Hedger that has seen enough requests answered in latency seconds."""
+    hedger = Hedger(min_samples=10, **kwargs)
+    for _ in range(10):
+        hedger.latencies.record(latency)
+    hedger.stats.requests = 100
+    return hedger
+
+
+class TestLatencyTracker(unittest.TestCase):
+    def test_quantile_over_window(self):
+        tracker = LatencyTracker(window=100)
+        self.assertIsNone(tracker.quantile(0.95))
+        for ms in range(200):
+            tracker.record(ms / 1000)
+        # only the last 100 count
+        self.assertEqual(100, len(tracker))
+        self.assertAlmostEqual(0.195, tracker.quantile(0.95))
+        self.assertAlmostEqual(0.1, tracker.quantile(0))
+        self.assertAlmostEqual(0.199, tracker.quantile(1))
+
+
+class TestHedger(unittest.TestCase):
+    def test_no_hedge_without_samples(self):
+        hedger = Hedger(min_samples=5)
+        self.assertIsNone(hedger.delay())
+        self.assertEqual("ok", hedger.run(lambda: "ok"))
+        self.assertEqual(0, hedger.stats.hedged)
+        self.assertEqual(1, len(hedger.latencies))
+
+    def test_hedge_wins_over_stalled_request(self):
+        hedger = warmed()
+        stalled = threading.Event()
+        calls = []
+
+        def request() -> str:
+            calls.append(1)
+            if len(calls) == 1:
+                stalled.wait(5)
+                return "primary"
+            return "hedge"
+
+        try:
+            self.assertEqual("hedge", hedger.run(request))
+        finally:
+            stalled.set()
+        self.assertEqual(1, hedger.stats.hedged)
+        self.assertEqual(1, hedger.stats.hedge_wins)
+
+    def test_fast_request_is_not_hedged(self):
+        hedger = warmed(latency=5)
+        calls = []
+        self.assertEqual("ok", hedger.run(lambda: calls.append(1) or "ok"))
+        self.assertEqual(1, len(calls))
+        self.assertEqual(0, hedger.stats.hedged)
+
+    def test_hedges_capped_by_ratio(self):
+        hedger = warmed(latency=0.001, max_ratio=0.05, window=1000)
+        hedger.stats.requests = 0
+        # enough samples that the slow ones below leave the p95 alone
+        for _ in range(990):
+            hedger.latencies.record(0.001)
+
+        def slow() -> str:
+            time.sleep(0.005)
+            return "ok"
+
+        for _ in range(40):
+            hedger.run(slow)
+        self.assertEqual(40, hedger.stats.requests)
+        self.assertLessEqual(hedger.stats.hedged, 2)
+        self.assertGreater(hedger.stats.denied, 0)
+
+    def test_failed_request_falls_back_to_other(self):
+        hedger = warmed()
+        stalled = threading.Event()
+        calls = []
+
+        def request() -> str:
+            calls.append(1)
+            if len(calls) == 1:
+                stalled.wait(0.1)
+                return "primary"
+            raise ConnectionError("hedge failed")
+
+        self.assertEqual("primary", hedger.run(request))
+        self.assertEqual(0, hedger.stats.hedge_wins)
+
+    def test_async_hedge_cancels_loser(self):
+        hedger = warmed()
+        cancelled = []
+
+        async def run() -> str:
+            calls = []
+
+            async def request() -> str:
+                calls.append(1)
+                if len(calls) == 1:
+                    try:
+                        await asyncio.sleep(5)
+                    except asyncio.CancelledError:
+                        cancelled.append(1)
+                        raise
+                    return "primary"
+                return "hedge"
+
+            return await hedger.arun(request)
+
+        self.assertEqual("hedge", asyncio.run(run()))
+        self.assertEqual([1], cancelled)
+        self.assertEqual(1, hedger.stats.hedge_wins)
+
+    def test_hedges_in_flight_capped(self):
+        hedger = warmed(max_ratio=1, max_in_flight=1)
+        stalled = threading.Event()
+        calls = []
+
+        def request() -> str:
+            calls.append(1)
+            stalled.wait(5)
+            return "ok"
+
+        first = threading.Thread(target=hedger.run, args=(request,))
+        first.start()
+        # the primary and its hedge
+        while len(calls) < 2:
+            time.sleep(0.001)
+        second = threading.Thread(target=hedger.run, args=(request,))
+        second.start()
+        while hedger.stats.denied == 0:
+            time.sleep(0.001)
+        stalled.set()
+        first.join()
+        second.join()
+        self.assertEqual(3, len(calls))
+        self.assertEqual(1, hedger.stats.hedged)
+        self.assertEqual(0, hedger.in_flight)
+
+    def test_hedge_not_admitted(self):
+        hedger = warmed(max_ratio=1)
+
+        def slow() -> str:
+            time.sleep(0.05)
+            return "ok"
+
+        self.assertEqual("ok", hedger.run(slow, admit=lambda: False))
+        self.assertEqual(0, hedger.stats.hedged)
+        self.assertEqual(1, hedger.stats.denied)
+        self.assertEqual(0, hedger.in_flight)
+
+    def test_hedgers_share_one_pool(self):
+        self.assertIs(Hedger().pool, Hedger().pool)
+        self.assertIs(shared_hedge_pool(), Hedger().pool)
+
+
+class TestRequestDeadlines(unittest.TestCase):
+    TEST_DB_NAME = "init_fake_db.csv"
+
+    def test_get_has_connect_and_read_timeout(self):
+        surfline = SurflineAPI(
+            fixture_path(self.TEST_DB_NAME),
+            limiter=AdaptiveLimiter(requests_per_minute=None),
+            connect_timeout=2,
+            read_timeout=7,
+        )
+        with patch("surfsup.surfline.api.HTMLSession.get") as mock_get, patch(
+            "surfsup.surfline.api.SurflineAPI.format_report_response_data"
+        ) as mock_format:
+            mock_get.return_value = MagicMock(ok=True, status_code=200)
+            mock_format.return_value = {"forecast": {}}
+            surfline.refresh_spot("Blacks")
+        self.assertEqual((2, 7), mock_get.call_args.kwargs["timeout"])
+
+    def test_hedger_times_upstream_only(self):
+        hedger = Hedger(min_samples=100)
+        surfline = SurflineAPI(
+            fixture_path(self.TEST_DB_NAME),
+            limiter=AdaptiveLimiter(requests_per_minute=None),
+            hedger=hedger,
+        )
+        acquire = surfline.limiter.acquire
+
+        def queued() -> float:
+            time.sleep(0.1)
+            return acquire()
+
+        with patch("surfsup.surfline.api.HTMLSession.get") as mock_get, patch(
+            "surfsup.surfline.api.SurflineAPI.format_report_response_data"
+        ) as mock_format, patch.object(surfline.limiter, "acquire", queued):
+            mock_get.return_value = MagicMock(ok=True, status_code=200)
+            mock_format.return_value = {"forecast": {}}
+            surfline.refresh_spot("Blacks")
+        # the wait for the limiter is not upstream latency
+        self.assertEqual(1, len(hedger.latencies))
+        self.assertLess(hedger.latencies.quantile(1), 0.1)
+        self.assertEqual(0, surfline.limiter.in_flight)
@@ -2,6 +2,14 @@ import unittest
 from unittest.mock import patch
 
 from surfsup.comm.message_builder import MessageBuilder
+from surfsup.dto.forecast_dto import (
+    ConditionRecord,
+    ForecastRecord,
+    SwellRecord,
+    WaveHeightRecord,
+    WindRecord,
+)
+from surfsup.dto.forecast_frame import forecast_frame
 
 
 class TestMessageBuilder(unittest.TestCase):
@@ -28,6 +36,26 @@ class TestMessageBuilder(unittest.TestCase):
             self.messenger.clean(ex_obj),
         )
 
+    def test_spot_message_fmt(self):
+        fcst = ForecastRecord(
+            "",
+            ConditionRecord(True, "FAIR", False),
+            WindRecord(5, 270.5),
+            [SwellRecord(2.25, 12, 260, 250.0)],
+            WaveHeightRecord(True, 2, 3.5, None, "waist", False),
+            None,
+            None,
+        )
+        row = forecast_frame({"Blacks": fcst}).iloc[0].to_dict()
+        row.update(sortable=0.5, distance=1.5, url="https://surfline.com", max_height=6)
+        msg = self.messenger.spot_message_fmt(row)
+        self.assertIn("Wave size: ", msg)
+        self.assertIn(" 2\\-3\\.5\n", msg)
+        self.assertIn("Wind: 5mph ", msg)
+        self.assertIn(" 270\\.5\n", msg)
+        self.assertIn("Swell: 2\\.25ft at 12s ", msg)
+        self.assertIn(" 260\n", msg)
+
     def test_build_report_message_bad(self):
         msg = self.messenger.build_report_message("Blcks")
         self.assertEqual(
@@ -35,6 +63,10 @@ class TestMessageBuilder(unittest.TestCase):
             msg,
         )
 
+    def test_possible_corrections_completes_prefix(self):
+        self.assertIn("Blacks", self.messenger.possible_corrections("Blac"))
+        self.assertIn("Blacks", self.messenger.possible_corrections("Blcks"))
+
     def test_build_report_message_good(self):
         ex_obj = {
             "conditions": {"value": "FAIR"},
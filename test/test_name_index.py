@@ -0,0 +1,53 @@
+import unittest
+
+from surfsup.surfline.name_index import NameIndex, edit_distance, normalize_name
+
+
+class TestNameIndex(unittest.TestCase):
+    NAMES = [
+        "Blacks",
+        "Blackies",
+        "La Jolla Shores",
+        "Windansea",
+        "Swami's",
+        "Pipeline",
+        "Backdoor",
+        "Lower Trestles",
+        "Upper Trestles",
+        "Ocean Beach",
+        "Ocean Beach",
+    ]
+
+    def setUp(self) -> None:
+        self.index = NameIndex(self.NAMES)
+
+    def test_normalize_name(self):
+        self.assertEqual(normalize_name("  Swami’s "), "swamis")
+        self.assertEqual(normalize_name("La  Jolla\tShores"), "la jolla shores")
+        self.assertEqual(normalize_name("Peñíche"), "peniche")
+
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance("blcks", "blacks", 2), 1)
+        self.assertEqual(edit_distance("pipe", "pipeline", 2), 3)
+        self.assertEqual(edit_distance("kitten", "sitting", 5), 3)
+
+    def test_suggest(self):
+        self.assertEqual(self.index.suggest("Blcks"), ["Blacks"])
+        self.assertEqual(self.index.suggest("La Jola Shors"), ["La Jolla Shores"])
+        self.assertEqual(self.index.suggest("lower trestle"), ["Lower Trestles"])
+        self.assertEqual(self.index.suggest("swamis"), ["Swami's"])
+        self.assertEqual(self.index.suggest("nowhere at all"), [])
+        self.assertEqual(
+            self.index.suggest("Trestles", k=2, max_distance=6),
+            ["Lower Trestles", "Upper Trestles"],
+        )
+
+    def test_complete(self):
+        self.assertEqual(self.index.complete("bla"), ["Blackies", "Blacks"])
+        self.assertEqual(self.index.complete("jol"), ["La Jolla Shores"])
+        self.assertEqual(
+            self.index.complete("tre", k=1),
+            ["Lower Trestles"],
+        )
+        self.assertEqual(self.index.complete("ocean"), ["Ocean Beach"])
+        self.assertEqual(self.index.complete(""), [])
@@ -0,0 +1,114 @@
+import unittest
+
+from surfsup.surfline.forecast_cache import ForecastCache
+from surfsup.surfline.prefetcher import Prefetcher
+from surfsup.surfline.rate_limit import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_refills_over_time(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1.0, capacity=2.0, clock=clock)
+        self.assertTrue(bucket.try_acquire())
+        self.assertTrue(bucket.try_acquire())
+        self.assertFalse(bucket.try_acquire())
+
+        clock.now += 1.5
+        self.assertTrue(bucket.try_acquire())
+        self.assertFalse(bucket.try_acquire())
+
+        # never refills past its capacity
+        clock.now += 100
+        self.assertTrue(bucket.try_acquire(2))
+        self.assertFalse(bucket.try_acquire())
+
+
+class TestPrefetcher(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.cache = ForecastCache(ttl=300, clock=self.clock)
+        self.fetched = []
+        self.prefetcher = Prefetcher(
+            self.cache,
+            self.fetch,
+            hot_spots=2,
+            lead_time=60,
+            requests_per_minute=60,
+            clock=self.clock,
+        )
+
+    def fetch(self, name: str) -> dict:
+        self.fetched.append(name)
+        return {"name": name, "at": self.clock.now}
+
+    def access(self, name: str, times: int) -> None:
+        for _ in range(times):
+            self.prefetcher.record_access(name)
+            self.cache.get(name, lambda: self.fetch(name))
+
+    def test_hottest(self):
+        self.access("Blacks", 3)
+        self.access("Blackies", 1)
+        self.access("La Jolla Shores", 2)
+        self.assertEqual(["Blacks", "La Jolla Shores"], self.prefetcher.hottest(2))
+
+        # popularity decays, so recent accesses win over old ones
+        self.clock.now += 4 * self.prefetcher.half_life
+        self.access("Blackies", 1)
+        self.assertEqual("Blackies", self.prefetcher.hottest(1)[0])
+
+    def test_cold_spots_are_forgotten(self):
+        self.access("Blacks", 1)
+        self.clock.now += self.prefetcher.half_life
+        self.access("Blackies", 2)
+        self.assertEqual(["Blackies", "Blacks"], self.prefetcher.hottest(2))
+
+        # fewer spots than hot_spots, but Blacks has gone cold
+        self.clock.now += 2 * self.prefetcher.half_life
+        self.assertEqual(["Blackies"], self.prefetcher.hottest(2))
+        self.assertNotIn("Blacks", self.prefetcher.popularity)
+
+        self.clock.now += 300
+        self.fetched.clear()
+        self.assertEqual(["Blackies"], self.prefetcher.tick())
+        self.clock.now += 2 * self.prefetcher.half_life
+        self.assertEqual([], self.prefetcher.tick())
+        self.assertEqual({}, self.prefetcher.popularity)
+
+    def test_refreshes_hot_spots_before_expiry(self):
+        self.access("Blacks", 3)
+        self.access("La Jolla Shores", 2)
+        self.access("Blackies", 1)
+        self.fetched.clear()
+
+        # nothing is close to expiring yet
+        self.assertEqual([], self.prefetcher.tick())
+
+        self.clock.now += 250
+        self.assertEqual(["Blacks", "La Jolla Shores"], self.prefetcher.tick())
+        self.assertEqual(["Blacks", "La Jolla Shores"], self.fetched)
+        self.assertEqual(300, self.cache.expires_in("Blacks"))
+        # the cold spot is left to expire
+        self.assertEqual(50, self.cache.expires_in("Blackies"))
+
+    def test_respects_request_budget(self):
+        prefetcher = Prefetcher(
+            self.cache,
+            self.fetch,
+            hot_spots=10,
+            requests_per_minute=1,
+            clock=self.clock,
+        )
+        for name in ["Blacks", "Blackies", "La Jolla Shores"]:
+            prefetcher.record_access(name)
+
+        self.assertEqual(1, len(prefetcher.tick()))
+        self.assertEqual(1, prefetcher.stats.over_budget)
@@ -0,0 +1,183 @@
+import asyncio
+import os
+import threading
+import unittest
+
+from surfsup.surfline.rate_limit import (
+    AdaptiveLimiter,
+    SharedTokenBucket,
+    shared_limiter,
+    use_shared_budget,
+)
+from test.helpers import fixture_path
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+
+    def limiter(self, **kwargs) -> AdaptiveLimiter:
+        return AdaptiveLimiter(clock=self.clock, sleep=self.clock.sleep, **kwargs)
+
+    def test_additive_increase(self):
+        limiter = self.limiter(initial_limit=2, max_limit=4, requests_per_minute=None)
+        for _ in range(2):
+            limiter.release(limiter.acquire(), 200)
+        # about one more slot per window of healthy requests
+        self.assertAlmostEqual(limiter.limit, 2 + 1 / 2 + 1 / 2.5)
+
+        for _ in range(100):
+            limiter.release(limiter.acquire(), 200)
+        self.assertEqual(limiter.limit, 4)
+
+        # slow answers hold the limit where it is
+        limiter.limit = 3
+        started = limiter.acquire()
+        self.clock.now += 10
+        limiter.release(started, 200)
+        self.assertEqual(limiter.limit, 3)
+
+    def test_multiplicative_decrease_once_per_window(self):
+        limiter = self.limiter(initial_limit=8, requests_per_minute=None)
+        window = [limiter.acquire() for _ in range(8)]
+        self.assertIsNone(limiter.try_acquire())
+
+        self.clock.now += 1
+        for started in window[:4]:
+            limiter.release(started, 429)
+        # the whole window saw the same congestion, it only cuts once
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.stats.decreases, 1)
+        self.assertEqual(limiter.stats.congested, 4)
+
+        limiter.release(window[4], 200)
+        limiter.release(window[5], None)
+        limiter.release(window[6], 503)
+        limiter.release(window[7], 200)
+        self.assertEqual(limiter.in_flight, 0)
+
+        # a request started after the back-off cuts again
+        self.clock.now += 1
+        limiter.release(limiter.acquire(), 500)
+        self.assertLess(limiter.limit, 2.5)
+        self.assertEqual(limiter.stats.decreases, 2)
+
+        for _ in range(10):
+            self.clock.now += 1
+            limiter.release(limiter.acquire(), None)
+        self.assertEqual(limiter.limit, limiter.min_limit)
+
+    def test_token_bucket(self):
+        limiter = self.limiter(initial_limit=64, requests_per_minute=60)
+        for _ in range(60):
+            limiter.release(limiter.acquire(), 200)
+        self.assertIsNone(limiter.try_acquire())
+
+        # the next request waits a second for its token
+        before = self.clock.now
+        limiter.release(limiter.acquire(), 200)
+        self.assertAlmostEqual(self.clock.now - before, 1)
+
+    def test_concurrency_blocks(self):
+        limiter = AdaptiveLimiter(initial_limit=1, requests_per_minute=None)
+        started = limiter.acquire()
+        acquired = threading.Event()
+
+        def second():
+            limiter.release(limiter.acquire(), 200)
+            acquired.set()
+
+        thread = threading.Thread(target=second)
+        thread.start()
+        self.assertFalse(acquired.wait(0.05))
+        limiter.release(started, 200)
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+        self.assertEqual(limiter.stats.peak_in_flight, 1)
+
+    def test_async_acquire(self):
+        limiter = AdaptiveLimiter(initial_limit=2, requests_per_minute=None)
+
+        async def request(i: int) -> None:
+            started = await limiter.aacquire()
+            await asyncio.sleep(0.01)
+            limiter.release(started, 200)
+
+        async def run():
+            await asyncio.gather(*[request(i) for i in range(6)])
+
+        asyncio.run(run())
+        self.assertEqual(limiter.stats.requests, 6)
+        self.assertLessEqual(limiter.stats.peak_in_flight, 3)
+
+    def test_shared(self):
+        self.assertIs(shared_limiter(), shared_limiter())
+
+    def test_unlimited_by_default(self):
+        self.assertIsNone(AdaptiveLimiter().bucket)
+
+
+class TestSharedTokenBucket(unittest.TestCase):
+    TEST_BUDGET = "test_budget.sqlite3"
+
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.path = fixture_path(self.TEST_BUDGET)
+        self.buckets: list[SharedTokenBucket] = []
+
+    def tearDown(self) -> None:
+        for bucket in self.buckets:
+            bucket.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def bucket(self) -> SharedTokenBucket:
+        bucket = SharedTokenBucket.per_minute(60, path=self.path, clock=self.clock)
+        self.buckets.append(bucket)
+        return bucket
+
+    def test_shared_between_buckets(self):
+        # one bucket per process, all on the same file
+        bot = self.bucket()
+        collector = self.bucket()
+        for _ in range(30):
+            self.assertTrue(bot.try_acquire())
+            self.assertTrue(collector.try_acquire())
+        self.assertFalse(bot.try_acquire())
+        self.assertFalse(collector.try_acquire())
+        self.assertAlmostEqual(collector.wait_time(), 1)
+
+        # a new process finds the budget spent
+        self.assertFalse(self.bucket().try_acquire())
+
+        self.clock.now += 2
+        self.assertEqual(bot.wait_time(), 0)
+        self.assertTrue(collector.try_acquire())
+        self.assertTrue(bot.try_acquire())
+        self.assertFalse(bot.try_acquire())
+
+    def test_use_shared_budget(self):
+        limiter = shared_limiter()
+        try:
+            bucket = use_shared_budget(self.path, 120)
+            self.buckets.append(bucket)
+            self.assertIs(limiter.bucket, bucket)
+            self.assertEqual(bucket.capacity, 120)
+
+            # requests through the shared limiter spend the stored tokens
+            limiter.release(limiter.acquire(), 200)
+            self.assertEqual(bucket.wait_time(), 0)
+            self.assertLess(bucket.tokens, 120)
+        finally:
+            limiter.bucket = None
@@ -0,0 +1,246 @@
+import asyncio
+import random
+import unittest
+from unittest.mock import MagicMock, patch
+
+import requests
+from surfsup.excepts import CircuitOpenError
+from surfsup.surfline.api import SurflineAPI, is_retryable
+from surfsup.surfline.resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    Resilience,
+    RetryBudget,
+    backoff_delay,
+)
+from test.helpers import fixture_path
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def http_error(status: int) -> requests.HTTPError:
+    return requests.HTTPError(response=MagicMock(status_code=status))
+
+
+class Flaky:
+    """Attempt failing with each of errors in turn, then returning "ok"."""
+
+    def __init__(self, *errors: Exception):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self) -> str:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+class TestBackoff(unittest.TestCase):
+    def test_full_jitter_bounds(self):
+        rng = random.Random(7)
+        for attempt in range(8):
+            ceiling = min(2.0, 0.25 * 2**attempt)
+            for _ in range(50):
+                delay = backoff_delay(attempt, 0.25, 2.0, rng)
+                self.assertGreaterEqual(delay, 0)
+                self.assertLessEqual(delay, ceiling)
+
+    def test_retry_budget_ratio(self):
+        budget = RetryBudget(ratio=0.2, capacity=2)
+        self.assertTrue(budget.try_retry())
+        self.assertTrue(budget.try_retry())
+        self.assertFalse(budget.try_retry())
+        # five requests earn one retry
+        for _ in range(5):
+            budget.record_request()
+        self.assertTrue(budget.try_retry())
+        self.assertFalse(budget.try_retry())
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_open_half_open_close(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock)
+        for _ in range(2):
+            breaker.record_failure()
+        self.assertEqual(CLOSED, breaker.state)
+        breaker.record_failure()
+        self.assertEqual(OPEN, breaker.state)
+        self.assertFalse(breaker.allow())
+
+        clock.now += 30
+        self.assertTrue(breaker.allow())
+        self.assertEqual(HALF_OPEN, breaker.state)
+        # only the one probe goes through
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(OPEN, breaker.state)
+        self.assertEqual(2, breaker.opens)
+
+        clock.now += 30
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(CLOSED, breaker.state)
+        self.assertTrue(breaker.allow())
+
+
+class TestResilience(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+
+    def resilience(self, **kwargs) -> Resilience:
+        return Resilience(
+            clock=self.clock, sleep=self.clock.sleep, rng=random.Random(1), **kwargs
+        )
+
+    def test_retries_server_errors(self):
+        resilience = self.resilience()
+        attempt = Flaky(http_error(503), requests.ConnectionError())
+        self.assertEqual("ok", resilience.call("surfline", attempt, is_retryable))
+        self.assertEqual(3, attempt.calls)
+        self.assertEqual(2, resilience.stats.retries)
+        self.assertEqual(2, len(self.clock.slept))
+        self.assertEqual(CLOSED, resilience.breaker_states()["surfline"])
+
+    def test_no_retry_on_client_errors(self):
+        resilience = self.resilience()
+        attempt = Flaky(http_error(404))
+        with self.assertRaises(requests.HTTPError):
+            resilience.call("surfline", attempt, is_retryable)
+        self.assertEqual(1, attempt.calls)
+        self.assertEqual(0, resilience.breaker("surfline").failures)
+
+    def test_gives_up_after_max_retries(self):
+        resilience = self.resilience(max_retries=2, failure_threshold=10)
+        attempt = Flaky(*[http_error(500)] * 5)
+        with self.assertRaises(requests.HTTPError):
+            resilience.call("surfline", attempt, is_retryable)
+        self.assertEqual(3, attempt.calls)
+
+    def test_budget_caps_retries(self):
+        resilience = self.resilience(failure_threshold=100)
+        calls = 0
+        for _ in range(50):
+            attempt = Flaky(*[http_error(502)] * 10)
+            with self.assertRaises(requests.HTTPError):
+                resilience.call("surfline", attempt, is_retryable)
+            calls += attempt.calls
+        # the initial budget, then a fifth of a retry per request
+        self.assertLessEqual(resilience.stats.retries, 10 + 50 * 0.2)
+        self.assertEqual(50 + resilience.stats.retries, calls)
+        self.assertGreater(resilience.stats.retries_denied, 0)
+
+    def test_open_circuit_fails_fast(self):
+        resilience = self.resilience(
+            max_retries=0, failure_threshold=2, reset_timeout=30
+        )
+        for _ in range(2):
+            with self.assertRaises(requests.HTTPError):
+                resilience.call("surfline", Flaky(http_error(503)), is_retryable)
+        attempt = Flaky()
+        with self.assertRaises(CircuitOpenError):
+            resilience.call("surfline", attempt, is_retryable)
+        self.assertEqual(0, attempt.calls)
+        self.assertEqual(1, resilience.stats.short_circuited)
+        # other hosts are not affected
+        self.assertEqual("ok", resilience.call("other", Flaky(), is_retryable))
+
+        self.clock.now += 30
+        self.assertEqual("ok", resilience.call("surfline", attempt, is_retryable))
+        self.assertEqual(CLOSED, resilience.breaker_states()["surfline"])
+
+    def test_async_call(self):
+        resilience = self.resilience(base_delay=0)
+        attempt = Flaky(http_error(429))
+
+        async def aattempt() -> str:
+            return attempt()
+
+        result = asyncio.run(resilience.acall("surfline", aattempt, is_retryable))
+        self.assertEqual("ok", result)
+        self.assertEqual(2, attempt.calls)
+        self.assertEqual(1, resilience.stats.retries)
+
+    def open_circuit(self, resilience: Resilience) -> None:
+        for _ in range(2):
+            with self.assertRaises(requests.HTTPError):
+                resilience.call("surfline", Flaky(http_error(503)), is_retryable)
+        self.clock.now += 30
+
+    def test_interrupted_probe_reopens(self):
+        resilience = self.resilience(
+            max_retries=0, failure_threshold=2, reset_timeout=30
+        )
+        self.open_circuit(resilience)
+        with self.assertRaises(KeyboardInterrupt):
+            resilience.call("surfline", Flaky(KeyboardInterrupt()), is_retryable)
+        self.assertEqual(OPEN, resilience.breaker_states()["surfline"])
+        # the next request probes again instead of being refused for good
+        self.assertEqual("ok", resilience.call("surfline", Flaky(), is_retryable))
+        self.assertEqual(CLOSED, resilience.breaker_states()["surfline"])
+
+    def test_cancelled_async_probe_reopens(self):
+        resilience = self.resilience(
+            max_retries=0, failure_threshold=2, reset_timeout=30
+        )
+        self.open_circuit(resilience)
+
+        async def hang() -> str:
+            await asyncio.sleep(10)
+            return "late"
+
+        async def ok() -> str:
+            return "ok"
+
+        async def run() -> str:
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    resilience.acall("surfline", hang, is_retryable), 0.01
+                )
+            self.assertEqual(OPEN, resilience.breaker_states()["surfline"])
+            return await resilience.acall("surfline", ok, is_retryable)
+
+        self.assertEqual("ok", asyncio.run(run()))
+        self.assertEqual(CLOSED, resilience.breaker_states()["surfline"])
+
+
+class TestSpotCheckResilience(unittest.TestCase):
+    TEST_DB_NAME = "init_fake_db.csv"
+
+    def test_serves_stale_while_open(self):
+        clock = FakeClock()
+        resilience = Resilience(
+            max_retries=0, failure_threshold=1, clock=clock, sleep=clock.sleep
+        )
+        surfline = SurflineAPI(fixture_path(self.TEST_DB_NAME), resilience=resilience)
+        surfline.cache.put("Blacks", {"forecast": {"note": "old"}}, fetched_at=0)
+
+        with patch("surfsup.surfline.api.HTMLSession.get") as mock_get:
+            mock_get.return_value = MagicMock(ok=False, status_code=503)
+            with self.assertRaises(requests.HTTPError):
+                surfline.refresh_spot("Blacks")
+            self.assertEqual(OPEN, resilience.breaker_states()["www.surfline.com"])
+
+            surfline.cache.invalidate("Blacks")
+            with self.assertRaises(CircuitOpenError):
+                surfline.spot_check("Blacks")
+
+            surfline.cache.put("Blacks", {"forecast": {"note": "old"}}, fetched_at=0)
+            data = surfline.spot_check("Blacks")
+        self.assertEqual({"forecast": {"note": "old"}}, data)
+        self.assertEqual(1, mock_get.call_count)
+        self.assertEqual(1, resilience.stats.served_stale)
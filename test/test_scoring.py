@@ -0,0 +1,54 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from surfsup.dto.scoring import CONDITIONS_ORDER, score_forecasts, score_row, top_k
+
+
+def random_forecasts(nspots: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    wave_min = rng.integers(0, 8, nspots).astype(float)
+    occ = rng.integers(0, 14, nspots).astype(float)
+    return pd.DataFrame(
+        {
+            "name": [f"spot-{i}" for i in range(nspots)],
+            "conditions": rng.choice(CONDITIONS_ORDER, nspots),
+            "wind_speed": rng.integers(0, 40, nspots),
+            "wind_dir": rng.uniform(0, 360, nspots),
+            "wave_min": wave_min,
+            "wave_max": wave_min + rng.integers(0, 5, nspots),
+            "wave_occ": np.where(rng.random(nspots) < 0.7, np.nan, occ),
+            "swell_dir": rng.uniform(0, 360, nspots),
+            "swell_ht": rng.uniform(0, 6, nspots),
+            "swell_pd": rng.integers(4, 20, nspots),
+        }
+    )
+
+
+class TestScoring(unittest.TestCase):
+    def test_matches_row_scores(self):
+        df = random_forecasts(500)
+        for max_height in [3, 6, 8]:
+            expected = df.apply(lambda row: score_row(row, max_height), axis=1)
+            np.testing.assert_allclose(
+                score_forecasts(df, max_height), expected.to_numpy()
+            )
+
+    def test_missing_occasional_column(self):
+        df = random_forecasts(20)
+        df["wave_occ"] = None
+        expected = df.apply(lambda row: score_row(row, 6), axis=1)
+        np.testing.assert_allclose(score_forecasts(df, 6), expected.to_numpy())
+
+    def test_top_k_matches_sort(self):
+        df = random_forecasts(1000, seed=3)
+        scores = score_forecasts(df, 6)
+        expected = np.argsort(-scores, kind="stable")[:5]
+        self.assertEqual(expected.tolist(), top_k(scores, 5).tolist())
+
+    def test_top_k_ties_and_missing(self):
+        scores = np.array([0.5, np.nan, 0.9, 0.5, 0.5, 0.1])
+        self.assertEqual([2, 0, 3], top_k(scores, 3).tolist())
+        self.assertEqual([2, 0, 3, 4, 5, 1], top_k(scores, 10).tolist())
+        self.assertEqual([], top_k(scores, 0).tolist())
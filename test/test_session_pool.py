@@ -0,0 +1,121 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import requests
+from surfsup.login_info import LoginInfo
+from surfsup.surfline.api import SurflineAPI
+from surfsup.surfline.crawler import Crawler
+from surfsup.surfline.session_pool import SessionPool
+from test.helpers import fixture_path
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = self.headers.get("Authorization", "anonymous").encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class TestSessionPool(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+        self.server.daemon_threads = True
+        threading.Thread(
+            target=self.server.serve_forever, args=[0.05], daemon=True
+        ).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+        self.pool = SessionPool(size=4, factory=requests.Session)
+
+    def get(self) -> str:
+        with self.pool.session() as session:
+            return session.get(self.url, timeout=5).text
+
+    def test_connections_are_reused(self):
+        for _ in range(10):
+            self.get()
+        self.assertEqual((10, 1), self.pool.connection_counts())
+        self.assertAlmostEqual(0.9, self.pool.reuse_rate)
+        self.assertEqual(1, self.pool.stats.sessions)
+
+    def test_threads_get_their_own_session(self):
+        barrier = threading.Barrier(4)
+        seen = []
+
+        def work() -> None:
+            with self.pool.session() as session:
+                seen.append(session)
+                barrier.wait(5)
+                session.get(self.url, timeout=5)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(4, len(set(map(id, seen))))
+        self.assertEqual(4, self.pool.stats.sessions)
+        # every connection stays in the shared pool for the next requests
+        for _ in range(8):
+            self.get()
+        (requests_sent, connections) = self.pool.connection_counts()
+        self.assertEqual(12, requests_sent)
+        self.assertLessEqual(connections, 4)
+
+    def test_crawler_fetches_through_the_pool(self):
+        crawler = Crawler(
+            lambda url: False, lambda url: False, lambda page: None, sessions=self.pool
+        )
+        for _ in range(3):
+            self.assertEqual(200, crawler.http_fetch(self.url, {}).status)
+        self.assertEqual((3, 1), self.pool.connection_counts())
+        self.assertEqual(3, self.pool.stats.checkouts)
+
+    def test_overflow_sessions_are_dropped(self):
+        pool = SessionPool(size=1, factory=requests.Session)
+        with pool.session() as first:
+            with pool.session() as second:
+                self.assertIsNot(first, second)
+        self.assertEqual(1, pool.stats.overflow)
+        self.assertEqual([first], pool.idle)
+
+    def test_headers_reach_every_session(self):
+        self.assertEqual("anonymous", self.get())
+        self.pool.set_header("Authorization", "Bearer abc")
+        self.assertEqual("Bearer abc", self.get())
+        self.pool.set_header("Authorization", None)
+        self.assertEqual("anonymous", self.get())
+
+    def tearDown(self) -> None:
+        self.pool.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestSharedToken(unittest.TestCase):
+    TEST_DB_NAME = "init_fake_db.csv"
+
+    def test_token_cached_and_shared(self):
+        surfline = SurflineAPI(fixture_path(self.TEST_DB_NAME), pool_size=2)
+        login = LoginInfo("foo", "foobar")
+        with patch("surfsup.surfline.api.HTMLSession.post") as mock_post:
+            mock_post.return_value.status_code = 200
+            mock_post.return_value.text = (
+                '{"access_token":"123","expires_in":60,"token_type":"Bearer"}'
+            )
+            token = surfline.authenticate_user(login)
+            self.assertEqual(token, surfline.authenticate_user(login))
+        self.assertEqual(1, mock_post.call_count)
+
+        with surfline.sessions.session() as first:
+            with surfline.sessions.session() as second:
+                for session in (first, second):
+                    self.assertEqual("Bearer 123", session.headers["Authorization"])
@@ -0,0 +1,68 @@
+import unittest
+
+import numpy as np
+
+from surfsup.maps import Location, distance_miles
+from surfsup.surfline.database import SurflineSpotDB
+from surfsup.surfline.spatial import SpatialIndex
+from test.helpers import fixture_path
+
+
+class TestSpatialIndex(unittest.TestCase):
+    QUERIES = [
+        Location(32.877231, -117.25303),  # Blacks
+        Location(-21.1, 179.9),  # next to the antimeridian
+        Location(84.5, 10.0),  # circle reaching the pole
+    ]
+
+    def setUp(self) -> None:
+        rng = np.random.default_rng(42)
+        self.lats = rng.uniform(-85, 85, 2000)
+        self.lons = rng.uniform(-180, 180, 2000)
+        self.index = SpatialIndex(self.lats, self.lons)
+
+    def brute_force(self, loc: Location) -> list[tuple[float, int]]:
+        return sorted(
+            (distance_miles(loc, Location(lat, lon)), i)
+            for (i, (lat, lon)) in enumerate(zip(self.lats, self.lons))
+        )
+
+    def test_within_radius_matches_brute_force(self):
+        for loc in self.QUERIES:
+            expected = self.brute_force(loc)
+            for miles in [25, 300, 2500]:
+                positions, distances = self.index.within_radius(loc, miles)
+                in_range = [i for (d, i) in expected if d <= miles]
+                self.assertEqual(sorted(in_range), sorted(positions.tolist()))
+                self.assertTrue(np.all(np.diff(distances) >= 0))
+
+    def test_k_nearest_matches_brute_force(self):
+        for loc in self.QUERIES:
+            expected = [i for (_, i) in self.brute_force(loc)[:5]]
+            positions, _ = self.index.k_nearest(loc, 5)
+            self.assertEqual(expected, positions.tolist())
+
+    def test_k_larger_than_index(self):
+        index = SpatialIndex([32.8, 33.6], [-117.2, -117.9])
+        positions, _ = index.k_nearest(Location(0.0, 0.0), 5)
+        self.assertEqual([0, 1], positions.tolist())
+
+    def test_skips_missing_coordinates(self):
+        index = SpatialIndex([32.8, np.nan], [-117.2, -117.2])
+        positions, _ = index.within_radius(Location(32.8, -117.2), 10)
+        self.assertEqual([0], positions.tolist())
+
+
+class TestSpotDBRadius(unittest.TestCase):
+    def test_within_radius(self):
+        database = SurflineSpotDB(fixture_path("init_fake_db.csv"))
+        la_jolla = Location(32.863, -117.257)
+
+        nearby = database.within_radius(la_jolla, 5)
+        self.assertEqual(["Blacks"], list(nearby["name"]))
+        self.assertAlmostEqual(nearby["distance"].iloc[0], 1.009704105)
+
+        self.assertEqual(0, len(database.within_radius(Location(0.0, 0.0), 5)))
+        self.assertEqual(
+            ["Blacks"], list(database.k_nearest(Location(0.0, 0.0), 5)["name"])
+        )
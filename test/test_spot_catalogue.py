@@ -0,0 +1,90 @@
+import os
+import unittest
+
+import numpy as np
+
+from genericpath import exists
+from surfsup.excepts import InvalidSchemaException, ReadOnlyDatabaseException
+from surfsup.maps import Location
+from surfsup.surfline.api import SurflineAPI
+from surfsup.surfline.backends import compile_catalogue
+from surfsup.surfline.database import SpotRecord, SurflineSpotDB
+from surfsup.surfline.spot_catalogue import SpotCatalogue, write_catalogue
+from test.helpers import fixture_path
+
+
+class TestSpotCatalogue(unittest.TestCase):
+    TEST_DB_NAME = "init_fake_db.csv"
+    TEST_CATALOGUE = "tmp_catalogue.spotcat"
+    TEST_CSV = "tmp_catalogue.csv"
+
+    def setUp(self) -> None:
+        self.catalogue_name = fixture_path(self.TEST_CATALOGUE)
+
+    def random_records(self, nspots: int) -> list[SpotRecord]:
+        rng = np.random.default_rng(3)
+        lats = rng.uniform(-85, 85, nspots)
+        lons = rng.uniform(-180, 180, nspots)
+        return [
+            # names repeat so the first row of a duplicate must win
+            SpotRecord(f"spot{i % 700}", f"id{i}", lat, lon, f"Spot {i}", f"url{i}")
+            for (i, (lat, lon)) in enumerate(zip(lats, lons))
+        ]
+
+    def test_round_trip(self):
+        records = self.random_records(1000)
+        records[5].formal_name = None
+        self.assertEqual(write_catalogue(self.catalogue_name, records), 1000)
+
+        catalogue = SpotCatalogue(self.catalogue_name)
+        self.assertEqual(len(catalogue), 1000)
+        self.assertEqual(catalogue.records(), records)
+        self.assertEqual(catalogue.select("spot3"), records[3])
+        self.assertEqual(catalogue.select("id703", by_att="spot_id"), records[703])
+        self.assertEqual(
+            catalogue.select_many(["url9", "url1"], by_att="url"),
+            [records[9], records[1]],
+        )
+        self.assertFalse(catalogue.contains("spot700"))
+        with self.assertRaises(ValueError):
+            catalogue.select("nowhere")
+
+    def test_lookups_match_csv_backend(self):
+        records = self.random_records(1000)
+        csv_db = SurflineSpotDB(fixture_path(self.TEST_CSV))
+        csv_db.bulk_add(records)
+        write_catalogue(self.catalogue_name, records)
+        catalogue = SpotCatalogue(self.catalogue_name)
+
+        loc = Location(-21.1, 179.9)
+        for miles in [300, 2500]:
+            expected = csv_db.within_radius(loc, miles)
+            actual = catalogue.within_radius(loc, miles)
+            self.assertEqual(list(actual["url"]), list(expected["url"]))
+            np.testing.assert_allclose(actual["distance"], expected["distance"])
+        self.assertEqual(
+            list(catalogue.k_nearest(loc, 5)["url"]),
+            list(csv_db.k_nearest(loc, 5)["url"]),
+        )
+
+    def test_compile_and_open(self):
+        compile_catalogue(fixture_path(self.TEST_DB_NAME), self.catalogue_name)
+
+        surfline = SurflineAPI(self.catalogue_name)
+        self.assertIsInstance(surfline.database, SpotCatalogue)
+        self.assertTrue(surfline.valid_name("Blacks"))
+        self.assertEqual(surfline.get_spot_names(), ["Blacks"])
+        self.assertIn("/surf-report/blacks/", surfline._build_spot_url("Blacks"))
+        with self.assertRaises(ReadOnlyDatabaseException):
+            surfline.database.add_record(surfline.database.select("Blacks"))
+
+    def test_invalid_catalogue(self):
+        with self.assertRaises(InvalidSchemaException):
+            SpotCatalogue(fixture_path(self.TEST_DB_NAME))
+
+    def tearDown(self) -> None:
+        for fname in [self.TEST_CATALOGUE, self.TEST_CSV, self.TEST_CSV + ".journal"]:
+            if exists(fixture_path(fname)):
+                os.remove(fixture_path(fname))
+
+        return super().tearDown()
@@ -0,0 +1,151 @@
+import os
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from genericpath import exists
+from surfsup.maps import Location
+from surfsup.surfline.api import SurflineAPI
+from surfsup.surfline.backends import migrate_to_sqlite, open_spot_db
+from surfsup.surfline.database import SpotRecord, SurflineSpotDB
+from surfsup.surfline.sqlite_spot_db import SQLiteSpotDB
+from test.helpers import fixture_path
+
+
+class TestSQLiteSpotDB(unittest.TestCase):
+    TEST_DB_NAME = "init_fake_db.csv"
+    TEST_SQLITE = "tmp_spot_db.sqlite3"
+    TEST_CSV = "tmp_spot_db.csv"
+
+    QUERIES = [
+        Location(32.877231, -117.25303),  # Blacks
+        Location(-21.1, 179.9),  # next to the antimeridian
+        Location(84.5, 10.0),  # circle reaching the pole
+    ]
+
+    def setUp(self) -> None:
+        self.sqlite_name = fixture_path(self.TEST_SQLITE)
+        self.database = SQLiteSpotDB(self.sqlite_name)
+
+    def random_records(self, nspots: int) -> list[SpotRecord]:
+        rng = np.random.default_rng(42)
+        lats = rng.uniform(-85, 85, nspots)
+        lons = rng.uniform(-180, 180, nspots)
+        return [
+            SpotRecord(f"spot{i}", f"id{i}", lat, lon, f"Spot {i}", f"url{i}")
+            for (i, (lat, lon)) in enumerate(zip(lats, lons))
+        ]
+
+    def test_add_select_delete(self):
+        records = self.random_records(3)
+        self.database.bulk_add(records)
+
+        self.assertEqual(len(self.database), 3)
+        self.assertEqual(self.database.select("id1", by_att="spot_id"), records[1])
+        self.assertEqual(
+            self.database.select_many(["url2", "url0"], by_att="url"),
+            [records[2], records[0]],
+        )
+        self.assertEqual(self.database.names(), ["spot0", "spot1", "spot2"])
+
+        self.database.del_record(records[1])
+        self.assertFalse(self.database.contains("spot1"))
+        with self.assertRaises(ValueError):
+            self.database.select("spot1")
+
+        # another connection sees the committed writes
+        self.assertEqual(SQLiteSpotDB(self.sqlite_name).records(), records[::2])
+
+    def test_transaction_rollback(self):
+        records = self.random_records(2)
+        with self.assertRaises(RuntimeError):
+            with self.database.transaction():
+                self.database.bulk_add(records)
+                raise RuntimeError("abort")
+
+        self.assertEqual(len(self.database), 0)
+
+    def test_lookups_match_csv_backend(self):
+        records = self.random_records(2000)
+        csv_db = SurflineSpotDB(fixture_path(self.TEST_CSV))
+        csv_db.bulk_add(records)
+        self.database.bulk_add(records)
+
+        # the plain latitude/longitude query backs builds without the R*-tree
+        for rtree in [True, False]:
+            self.database.rtree = rtree
+            for loc in self.QUERIES:
+                for miles in [25, 300, 2500]:
+                    expected = csv_db.within_radius(loc, miles)
+                    actual = self.database.within_radius(loc, miles)
+                    self.assertEqual(list(actual["name"]), list(expected["name"]))
+                    np.testing.assert_allclose(actual["distance"], expected["distance"])
+
+                expected = csv_db.k_nearest(loc, 5)
+                actual = self.database.k_nearest(loc, 5)
+                self.assertEqual(list(actual["name"]), list(expected["name"]))
+
+    def test_writes_match_csv_backend(self):
+        csv_db = SurflineSpotDB(fixture_path(self.TEST_CSV))
+        (a, b, c) = self.random_records(3)
+        same_url = SpotRecord("other", "id9", 1.0, 2.0, "Other", a.url)
+
+        def script(database) -> list[SpotRecord]:
+            database.bulk_add([a, b, same_url])
+            database.add_record(a)
+            database.add_record(c)
+            database.del_record(b)
+            database.add_record(b)
+            return database.records()
+
+        expected = script(csv_db)
+        self.assertEqual(expected, [a, c, b])
+        self.assertEqual(script(self.database), expected)
+
+    def test_delete_by_url_with_duplicate_names(self):
+        csv_db = SurflineSpotDB(fixture_path(self.TEST_CSV))
+        (a, b) = self.random_records(2)
+        b.name = a.name
+        updated = SpotRecord(b.name, b.spot_id, 1.0, 2.0, "Updated", b.url)
+
+        for database in [csv_db, self.database]:
+            database.bulk_add([a, b])
+            with database.transaction():
+                database.del_record(b, by_att="url")
+                database.add_record(updated)
+            self.assertEqual(database.records(), [a, updated])
+
+        # the journal replays the delete by url too
+        reloaded = SurflineSpotDB(fixture_path(self.TEST_CSV))
+        self.assertEqual(reloaded.records(), [a, updated])
+
+    def test_migrate_and_open(self):
+        copied = migrate_to_sqlite(fixture_path(self.TEST_DB_NAME), self.sqlite_name)
+
+        self.assertEqual(copied, 1)
+        surfline = SurflineAPI(self.sqlite_name)
+        self.assertIsInstance(surfline.database, SQLiteSpotDB)
+        self.assertTrue(surfline.valid_name("Blacks"))
+        self.assertIn("/surf-report/blacks/", surfline._build_spot_url("Blacks"))
+        pd.testing.assert_frame_equal(
+            surfline.database.table,
+            SurflineSpotDB(fixture_path(self.TEST_DB_NAME)).table[
+                SpotRecord.preferred_order()
+            ],
+        )
+
+        self.assertIsInstance(
+            open_spot_db(fixture_path(self.TEST_DB_NAME)), SurflineSpotDB
+        )
+        with self.assertRaises(ValueError):
+            migrate_to_sqlite(fixture_path(self.TEST_DB_NAME), self.sqlite_name)
+
+    def tearDown(self) -> None:
+        self.database.close()
+        for fname in [self.TEST_SQLITE, self.TEST_CSV]:
+            for suffix in ["", "-wal", "-shm", ".journal"]:
+                if exists(fixture_path(fname + suffix)):
+                    os.remove(fixture_path(fname + suffix))
+
+        return super().tearDown()
@@ -1,12 +1,20 @@
+import asyncio
 import os
+import threading
+import time
 import unittest
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 from genericpath import exists
+from requests_html import HTML
 from surfsup.excepts import InvalidSchemaException
 from surfsup.login_info import LoginInfo
 from surfsup.surfline.api import SurflineAPI
+from surfsup.surfline.cache_store import CacheStore
+from surfsup.surfline.rate_limit import AdaptiveLimiter
 from surfsup.surfline.database import SpotRecord, SurflineSpotDB
+from surfsup.surfline.report_extract import extract_report_data
+from surfsup.surfline.resilience import Resilience
 from surfsup.utils import joinpath
 
 
@@ -68,6 +76,7 @@ class TestSurflineSpotDB(unittest.TestCase):
     def test_add_record(self):
         rec = self.TEST_RECORD_ENTRY
         self.database.add_record(rec)
+        self.database.flush()
 
         f1 = open(self.fake_db)
         recently_added = f1.readlines()[-1]
@@ -78,6 +87,7 @@ class TestSurflineSpotDB(unittest.TestCase):
         rec = self.TEST_RECORD_ENTRY
         self.database.add_record(rec)
         self.database.del_record(rec)
+        self.database.flush()
 
         f1 = open(self.fake_db)
         recently_added = f1.readlines()[-1]
@@ -109,8 +119,116 @@ class TestSurflineSpotDB(unittest.TestCase):
         self.assertEqual(lookup_rec2_by_att, rec2)
         self.assertNotEqual(lookup_rec, lookup_rec2_by_att)
 
+    def test_select_many(self):
+        rec = self.TEST_RECORD_ENTRY
+        self.database.add_record(rec)
+        first = self.database.select("Blacks")
+
+        records = self.database.select_many([rec.url, first.url], by_att="url")
+        self.assertEqual(records, [rec, first])
+        with self.assertRaises(ValueError):
+            self.database.select_many(["Blacks", "nowhere"])
+
+    def test_index_after_delete(self):
+        rec = self.TEST_RECORD_ENTRY
+        first = self.database.select("Blacks")
+        self.database.add_record(rec)
+        self.assertTrue(self.database.contains(rec.spot_id, by_att="spot_id"))
+
+        self.database.del_record(first)
+        self.assertFalse(self.database.contains("Blacks"))
+        self.assertEqual(self.database.select("blackies"), rec)
+
+    def test_journal_replay(self):
+        rec = self.TEST_RECORD_ENTRY
+        first = self.database.select("Blacks")
+        self.database.flush()
+        self.database.add_record(rec)
+        self.database.del_record(first)
+        self.assertTrue(exists(self.database.journal_name))
+
+        reloaded = SurflineSpotDB(self.fake_db)
+        self.assertEqual(len(reloaded.table), 1)
+        self.assertEqual(reloaded.select("blackies"), rec)
+
+        # compacting removes the journal and keeps the records
+        reloaded.flush()
+        self.assertFalse(exists(reloaded.journal_name))
+        self.assertEqual(SurflineSpotDB(self.fake_db).select("blackies"), rec)
+
+    def test_transaction_rollback(self):
+        rec = self.TEST_RECORD_ENTRY
+        with self.assertRaises(RuntimeError):
+            with self.database.transaction():
+                self.database.add_record(rec)
+                raise RuntimeError("abort")
+
+        self.assertEqual(len(self.database.table), 1)
+        self.assertFalse(self.database.contains("blackies"))
+        self.assertFalse(exists(self.database.journal_name))
+
+    def test_bulk_add_compaction(self):
+        self.database.compact_every = 3
+        records = [
+            SpotRecord(f"spot{i}", f"id{i}", 30.0 + i, -117.0, f"Spot {i}", f"url{i}")
+            for i in range(4)
+        ]
+        self.database.bulk_add(records[:2])
+        self.assertTrue(exists(self.database.journal_name))
+
+        self.database.bulk_add(records[2:])
+        self.assertFalse(exists(self.database.journal_name))
+        self.assertEqual(
+            SurflineSpotDB(self.fake_db).select_many(["spot3", "spot0"]),
+            [records[3], records[0]],
+        )
+
+    def test_journal_replay_matches_live(self):
+        rec = self.TEST_RECORD_ENTRY
+        renamed = SpotRecord(
+            "blackies2", "otherhash", 32.0, 3.0, "Blackies Again", rec.url
+        )
+        self.database.flush()
+        self.database.add_record(rec)
+        self.database.add_record(renamed)
+        self.database.add_record(rec)
+        self.assertEqual(len(self.database.table), 2)
+        self.assertFalse(self.database.contains("blackies2"))
+
+        replayed = SurflineSpotDB(self.fake_db)
+        self.assertEqual(self.database.records(), replayed.records())
+
+    def test_concurrent_first_select(self):
+        records = [
+            SpotRecord(f"spot{i}", f"id{i}", 30.0, -117.0, f"Spot {i}", f"url{i}")
+            for i in range(500)
+        ]
+        self.database.compact_every = 10000
+        self.database.bulk_add(records)
+        # invalidate the indexes so the threads race to rebuild them
+        self.database.del_record(records[0])
+        barrier = threading.Barrier(8)
+        found = []
+
+        def select(i: int) -> None:
+            barrier.wait(5)
+            names = [f"spot{j}" for j in range(i + 1, 500, 8)]
+            found.extend(self.database.select_many(names))
+
+        threads = [threading.Thread(target=select, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(499, len(found))
+        self.assertEqual(len(self.database.table), 1 + 499)
+
     def tearDown(self) -> None:
-        fnames = [self.TEST_TMP_DB, self.TEST_DB_OUTPUT]
+        fnames = [
+            self.TEST_TMP_DB,
+            self.TEST_DB_OUTPUT,
+            self.TEST_DB_OUTPUT + ".journal",
+        ]
         to_remove = [test_joinpath(x) for x in fnames]
         for fname in to_remove:
             if exists(fname):
@@ -183,3 +301,118 @@ class TestSurflineAPI(unittest.TestCase):
                 os.remove(fname)
 
         return super().tearDown()
+
+
+class TestCacheStore(unittest.TestCase):
+    TEST_DB_NAME = "init_fake_db.csv"
+    TEST_CACHE_NAME = "tmp_forecast_cache.sqlite3"
+
+    def test_warm_restart(self):
+        cache_fname = test_joinpath(self.TEST_CACHE_NAME)
+        surfline = SurflineAPI(test_joinpath(self.TEST_DB_NAME), cache_path=cache_fname)
+        surfline.cache.put("Blacks", {"forecast": {"note": "cached"}})
+        surfline.checkpoint()
+
+        restarted = SurflineAPI(
+            test_joinpath(self.TEST_DB_NAME), cache_path=cache_fname
+        )
+        with patch("surfsup.surfline.api.SurflineAPI._fetch_spot") as mock_fetch:
+            mock_fetch.side_effect = ConnectionError("surfline is down")
+            data = restarted.spot_check("Blacks")
+        self.assertEqual({"forecast": {"note": "cached"}}, data)
+
+    def test_async_lookups_share_one_fetch(self):
+        surfline = SurflineAPI(test_joinpath(self.TEST_DB_NAME))
+        calls = []
+
+        async def afetch(session, name):
+            calls.append(name)
+            await asyncio.sleep(0.01)
+            return {"forecast": {}}
+
+        async def run():
+            return await asyncio.gather(
+                *[surfline.async_spot_check(None, "Blacks") for _ in range(5)]
+            )
+
+        with patch.object(surfline, "_afetch_spot", afetch):
+            self.assertEqual([{"forecast": {}}] * 5, asyncio.run(run()))
+        self.assertEqual(["Blacks"], calls)
+
+    def test_requests_go_through_limiter(self):
+        limiter = AdaptiveLimiter(initial_limit=4, requests_per_minute=None)
+        surfline = SurflineAPI(
+            test_joinpath(self.TEST_DB_NAME),
+            limiter=limiter,
+            resilience=Resilience(sleep=lambda seconds: None),
+        )
+        with patch("surfsup.surfline.api.HTMLSession.get") as mock_get, patch(
+            "surfsup.surfline.api.SurflineAPI.format_report_response_data"
+        ) as mock_format:
+            busy, ok = MagicMock(ok=False, status_code=503), MagicMock(ok=True)
+            ok.status_code = 200
+            mock_get.side_effect = [busy, ok]
+            mock_format.return_value = {"forecast": {}}
+            self.assertEqual({"forecast": {}}, surfline.refresh_spot("Blacks"))
+
+        self.assertEqual(2, limiter.stats.requests)
+        self.assertEqual(1, limiter.stats.congested)
+        # halved by the 503, then raised by the answer
+        self.assertEqual(2.5, limiter.limit)
+        self.assertEqual(0, limiter.in_flight)
+
+    def test_expired_entries_not_restored(self):
+        cache_fname = test_joinpath(self.TEST_CACHE_NAME)
+        store = CacheStore(cache_fname)
+        store.save([("Blacks", {"forecast": {}}, time.time() - 60 * 60 * 24)])
+
+        surfline = SurflineAPI(test_joinpath(self.TEST_DB_NAME), cache_path=cache_fname)
+        self.assertNotIn("Blacks", surfline.cache)
+
+    def tearDown(self) -> None:
+        fname = test_joinpath(self.TEST_CACHE_NAME)
+        if exists(fname):
+            os.remove(fname)
+
+        return super().tearDown()
+
+
+class TestReportExtract(unittest.TestCase):
+    """The report_page*.html fixtures are synthetic pages generated with
+    scripts/fake_surfline.py build_report_page, laid out like surfline.com
+    report pages, not pages captured from the site.
+    """
+
+    TEST_DB_NAME = "init_fake_db.csv"
+
+    def read_page(self, fname: str) -> bytes:
+        with open(test_joinpath(fname), "rb") as f:
+            return f.read()
+
+    def test_extract_report_data(self):
+        data = extract_report_data(self.read_page("report_page.html"))
+        self.assertSetEqual(set(data.keys()), set(["spot", "report", "forecast"]))
+        self.assertEqual(data["spot"]["name"], "Blacks")
+
+    def test_extract_matches_dom_parse(self):
+        surfline = SurflineAPI(test_joinpath(self.TEST_DB_NAME))
+        content = self.read_page("report_page.html")
+        dom_data = surfline.format_report_html(HTML(html=content))
+        self.assertEqual(extract_report_data(content), dom_data)
+
+    def test_extract_ignores_script_position(self):
+        data = extract_report_data(self.read_page("report_page_moved_script.html"))
+        self.assertEqual(data["spot"]["name"], "Blacks")
+
+    def test_extract_missing_marker(self):
+        self.assertIsNone(extract_report_data(b"<html><script>a = 1</script></html>"))
+        self.assertIsNone(extract_report_data(b"<script>window.__DATA__ = {</script>"))
+
+    def test_falls_back_to_dom(self):
+        surfline = SurflineAPI(test_joinpath(self.TEST_DB_NAME))
+        content = self.read_page("report_page.html").replace(
+            b"window.__DATA__", b"window.__STATE__"
+        )
+        self.assertIsNone(extract_report_data(content))
+        data = surfline.format_report_content(content)
+        self.assertEqual(data["spot"]["name"], "Blacks")